@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+
+"""
+Add the `ScoreRank` leaderboard sort key to submissions scored without one.
+
+The `QuizID-Score-index` is sorted by `ScoreRank` (see quiz_common/leaderboard.py)
+and only holds items that have it. Scans the UserSubmissions table and sets
+`ScoreRank` on every scored submission that lacks it. Submissions deleted
+during the scan, e.g. by their TTL, are left deleted.
+
+Usage:
+    bin/backfill_score_rank.py [--dry-run]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import boto3
+from botocore.exceptions import ClientError
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lambdas", "common", "python"))
+
+from quiz_common.leaderboard import score_rank  # noqa: E402
+from quiz_common.storage.dynamodb import SUBMISSIONS_TABLE  # noqa: E402
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "test")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
+
+
+def scan(table):
+    kwargs = {"ProjectionExpression": "SubmissionID, Score, ScoreRank"}
+    while True:
+        response = table.scan(**kwargs)
+        yield from response["Items"]
+        if "LastEvaluatedKey" not in response:
+            return
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def set_score_rank(table, item):
+    """Set the item's `ScoreRank` unless the submission was deleted since the scan."""
+    try:
+        table.update_item(
+            Key={"SubmissionID": item["SubmissionID"]},
+            UpdateExpression="SET ScoreRank = :rank",
+            ConditionExpression="attribute_exists(SubmissionID)",
+            ExpressionAttributeValues={":rank": score_rank(item["Score"], item["SubmissionID"])},
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        return False
+    return True
+
+
+def backfill(table, dry_run):
+    scanned = updated = skipped = 0
+    for item in scan(table):
+        scanned += 1
+        if "Score" not in item or "ScoreRank" in item:
+            continue
+        if dry_run or set_score_rank(table, item):
+            updated += 1
+        else:
+            skipped += 1
+    return scanned, updated, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add ScoreRank to submissions scored without one")
+    parser.add_argument("--dry-run", action="store_true", help="only count the items that would be updated")
+    parser.add_argument("--endpoint-url", default=os.environ.get("AWS_ENDPOINT_URL", "http://localhost:4566"))
+    args = parser.parse_args()
+
+    table = boto3.resource("dynamodb", endpoint_url=args.endpoint_url).Table(SUBMISSIONS_TABLE)
+    start = time.monotonic()
+    scanned, updated, skipped = backfill(table, args.dry_run)
+    print(
+        f"{SUBMISSIONS_TABLE}: {scanned} items scanned, {updated} {'to update' if args.dry_run else 'updated'}, "
+        f"{skipped} deleted concurrently in {time.monotonic() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+
+"""
+Backfill the running scores of an aggregated tournament.
+
+The scoring functions add every newly scored submission to the aggregated
+tournaments of its quiz, so a tournament created over quizzes that already
+have submissions starts out without them. This tool reads the leaderboard
+of each of the tournament's quizzes, including archived entries, and records
+every player's best score. Recording a score is idempotent, so it is safe to
+run while submissions are being scored, and to run again.
+
+Usage:
+    bin/backfill_tournament.py --tournament-id <id> [--page-size 100]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lambdas", "common", "python"))
+
+from quiz_common.storage import create_storage  # noqa: E402
+from quiz_common.tournament import PAGE_SIZE, quiz_entries  # noqa: E402
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "test")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill the running scores of an aggregated tournament")
+    parser.add_argument("--tournament-id", required=True)
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    parser.add_argument("--endpoint-url", default=os.environ.get("AWS_ENDPOINT_URL", "http://localhost:4566"))
+    args = parser.parse_args()
+
+    # read by the boto3 clients of the storage layer
+    os.environ["AWS_ENDPOINT_URL"] = args.endpoint_url
+    storage = create_storage()
+    tournament = storage.tournaments.get_tournament(args.tournament_id)
+    if tournament is None:
+        sys.exit(f"Tournament {args.tournament_id} does not exist")
+    if not tournament.get("Aggregated"):
+        sys.exit(f"Tournament {args.tournament_id} is ranked on read and keeps no running scores")
+
+    for quiz_id in tournament["QuizIDs"]:
+        start = time.monotonic()
+        players = 0
+        snapshot = storage.snapshots.get_snapshot(quiz_id)
+        for entry in quiz_entries(storage, quiz_id, snapshot, page_size=args.page_size):
+            storage.tournaments.record_score(tournament, entry["Username"], quiz_id, entry["Score"])
+            players += 1
+        print(f"{quiz_id}: recorded {players} players in {time.monotonic() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
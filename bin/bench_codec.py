@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+
+"""
+Compare the JSON codecs in quiz_common.codec on the app's largest documents.
+
+Encodes and decodes a quiz at the validation limits (100 questions, 10
+options each, maximum string lengths), a leaderboard and a page of user
+submissions as they come out of DynamoDB (numbers as `Decimal`), and a
+scoring batch of SQS message bodies. The stdlib codec is measured as well as
+the previous approach of converting Decimals with a recursive walk before
+`json.dumps`. orjson is skipped if it is not installed.
+
+Usage:
+    bin/bench_codec.py [--leaderboard-size 1000] [--repeat 200]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lambdas", "common", "python"))
+
+from quiz_common.codec import StdlibCodec, create_codec  # noqa: E402
+from quiz_common.validation import (  # noqa: E402
+    MAX_OPTION_LENGTH,
+    MAX_OPTIONS,
+    MAX_QUESTION_TEXT_LENGTH,
+    MAX_QUESTIONS,
+    MAX_TRIVIA_LENGTH,
+)
+
+
+def convert_decimal(obj):
+    if isinstance(obj, list):
+        return [convert_decimal(item) for item in obj]
+    if isinstance(obj, dict):
+        return {k: convert_decimal(v) for k, v in obj.items()}
+    if isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    return obj
+
+
+class ConvertThenDumps:
+    """The handlers' approach before the shared codec."""
+
+    name = "convert+json"
+
+    def dumps(self, obj):
+        return json.dumps(convert_decimal(obj))
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+def largest_quiz():
+    return {
+        "QuizID": "adorable-aardvarks-ambled",
+        "Title": "T" * 200,
+        "Version": Decimal(3),
+        "QuestionCount": Decimal(MAX_QUESTIONS),
+        "Visibility": "Public",
+        "EnableTimer": True,
+        "TimerSeconds": Decimal(30),
+        "Questions": [
+            {
+                "QuestionText": f"{idx} " + "q" * (MAX_QUESTION_TEXT_LENGTH - 4),
+                "Options": [f"{chr(65 + option)}. " + "o" * (MAX_OPTION_LENGTH - 3) for option in range(MAX_OPTIONS)],
+                "Trivia": "t" * MAX_TRIVIA_LENGTH,
+            }
+            for idx in range(MAX_QUESTIONS)
+        ],
+    }
+
+
+def leaderboard(size):
+    return [
+        {"Username": f"player{idx}", "Score": float(Decimal("987.654") - idx), "SubmissionID": f"{idx:032x}"}
+        for idx in range(size)
+    ]
+
+
+def submissions_page(size):
+    return {
+        "Submissions": [
+            {
+                "SubmissionID": f"{idx:032x}",
+                "Username": "player",
+                "SubmittedAt": "2026-01-01T12:00:00.000+00:00",
+                "QuizID": "adorable-aardvarks-ambled",
+                "QuizVersion": Decimal(3),
+                "Score": Decimal("912.345"),
+                "TotalQuestions": Decimal(MAX_QUESTIONS),
+            }
+            for idx in range(size)
+        ],
+        "NextToken": None,
+    }
+
+
+def scoring_batch():
+    message = {
+        "SubmissionID": "0" * 36,
+        "Username": "player",
+        "QuizID": "adorable-aardvarks-ambled",
+        "Version": 3,
+        "SubmittedAt": "2026-01-01T12:00:00.000+00:00",
+        "Answers": {str(idx): {"Answer": "A. " + "o" * 40, "TimeTaken": 12.5} for idx in range(MAX_QUESTIONS)},
+    }
+    return [json.dumps(message)] * 10
+
+
+def best(function, repeat):
+    return min(timeit.repeat(function, number=repeat, repeat=3)) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the JSON codecs")
+    parser.add_argument("--leaderboard-size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    codecs = [ConvertThenDumps(), StdlibCodec()]
+    try:
+        codecs.append(create_codec("orjson"))
+    except ImportError:
+        print("orjson is not installed, only the standard library is measured")
+
+    documents = {
+        "quiz (get_quiz)": largest_quiz(),
+        f"leaderboard of {args.leaderboard_size} (get_leaderboard)": leaderboard(args.leaderboard_size),
+        "100 submissions (get_user_submissions)": submissions_page(100),
+    }
+    for label, document in documents.items():
+        size = len(StdlibCodec().dumps(document))
+        print(f"{label}, {size / 1024:.0f} KiB:")
+        for codec in codecs:
+            body = codec.dumps(document)
+            encode = best(lambda: codec.dumps(document), args.repeat)
+            decode = best(lambda: codec.loads(body), args.repeat)
+            print(f"  {codec.name:>12}: dumps {encode * 1e6:8.1f} us, loads {decode * 1e6:8.1f} us")
+
+    batch = scoring_batch()
+    print(f"scoring batch of {len(batch)} messages with {MAX_QUESTIONS} answers (loads only):")
+    for codec in codecs[1:]:
+        decode = best(lambda: [codec.loads(body) for body in batch], args.repeat)
+        print(f"  {codec.name:>12}: {decode * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
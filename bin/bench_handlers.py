@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+
+"""
+Run the quiz app's handlers in-process against a local storage backend.
+
+Creates a quiz, submits answers through the submit handler, drains the
+submission queue into the scoring handler in batches of 10 (the SQS event
+source batch size), and reads the leaderboard and submissions back. No AWS
+services or LocalStack are needed, which makes this usable for
+microbenchmarks of the handler code itself.
+
+Usage:
+    bin/bench_handlers.py --backend memory --submissions 1000
+    bin/bench_handlers.py --backend sqlite --sqlite-path /tmp/quiz.sqlite3
+    bin/bench_handlers.py --inline-scoring
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+LAMBDAS_ROOT = os.path.join(ROOT, "lambdas")
+sys.path.insert(0, os.path.join(LAMBDAS_ROOT, "common", "python"))
+
+from quiz_common.handlers import import_handler  # noqa: E402
+from quiz_common.storage import create_storage, set_storage  # noqa: E402
+from quiz_common.tracing import sqs_record  # noqa: E402
+
+SCORING_BATCH_SIZE = 10
+
+
+def load_handler(package):
+    return import_handler(LAMBDAS_ROOT, package).lambda_handler
+
+
+class Timings:
+    def __init__(self):
+        self.samples = {}
+
+    def call(self, name, handler, event):
+        start = time.perf_counter()
+        response = handler(event, None)
+        self.samples.setdefault(name, []).append(time.perf_counter() - start)
+        return response
+
+    def report(self):
+        for name, samples in self.samples.items():
+            samples = sorted(samples)
+            p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+            print(
+                f"{name}: {len(samples)} calls, "
+                f"median {statistics.median(samples) * 1e6:.0f} us, "
+                f"p95 {p95 * 1e6:.0f} us, total {sum(samples) * 1000:.1f} ms"
+            )
+
+
+def run(storage, submissions, questions):
+    handlers = {
+        package: load_handler(package)
+        for package in ("create_quiz", "get_quiz", "submit_quiz", "scoring", "get_submission", "get_leaderboard")
+    }
+    timings = Timings()
+
+    quiz = {
+        "Title": "Benchmark Quiz",
+        "Visibility": "Public",
+        "EnableTimer": True,
+        "TimerSeconds": 10,
+        "Questions": [
+            {
+                "QuestionText": f"Question {idx}",
+                "Options": ["A. 1", "B. 2", "C. 3", "D. 4"],
+                "CorrectAnswer": "A. 1",
+                "Trivia": "",
+            }
+            for idx in range(questions)
+        ],
+    }
+    response = timings.call("create_quiz", handlers["create_quiz"], {"body": json.dumps(quiz)})
+    quiz_id = json.loads(response["body"])["QuizID"]
+
+    for _ in range(submissions):
+        timings.call("get_quiz", handlers["get_quiz"], {"queryStringParameters": {"quiz_id": quiz_id}})
+
+    submission_ids = []
+    for idx in range(submissions):
+        answers = {
+            str(question): {"Answer": random.choice(["A. 1", "B. 2"]), "TimeTaken": random.randint(0, 10)}
+            for question in range(questions)
+        }
+        body = {"Username": f"user{idx}", "QuizID": quiz_id, "Answers": answers}
+        response = timings.call("submit_quiz", handlers["submit_quiz"], {"body": json.dumps(body)})
+        submission_ids.append(json.loads(response["body"])["SubmissionID"])
+
+    messages = storage.publisher.drain_submissions(with_attributes=True)
+    for start in range(0, len(messages), SCORING_BATCH_SIZE):
+        records = [sqs_record(*message) for message in messages[start:start + SCORING_BATCH_SIZE]]
+        timings.call("scoring (batch)", handlers["scoring"], {"Records": records})
+
+    for submission_id in submission_ids:
+        timings.call("get_submission", handlers["get_submission"],
+                     {"queryStringParameters": {"submission_id": submission_id}})
+    response = timings.call("get_leaderboard", handlers["get_leaderboard"],
+                            {"queryStringParameters": {"quiz_id": quiz_id, "top": "10"}})
+    leaderboard = json.loads(response["body"])
+
+    timings.report()
+    print(f"leaderboard top score: {leaderboard[0]['Score'] if leaderboard else 'n/a'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the quiz handlers in-process against a local storage backend")
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--sqlite-path", default=":memory:",
+                        help="database file for the sqlite backend")
+    parser.add_argument("--submissions", type=int, default=200)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--inline-scoring", action="store_true",
+                        help="score submissions inside submit_quiz (the backlog stays empty here)")
+    args = parser.parse_args()
+
+    if args.inline_scoring:
+        os.environ["INLINE_SCORING_ENABLED"] = "true"
+
+    storage = create_storage(args.backend, sqlite_path=args.sqlite_path)
+    # handlers bind the process-wide storage at import time, so set it first
+    set_storage(storage)
+    run(storage, args.submissions, args.questions)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+
+"""
+Compare the quiz storage formats in quiz_common.quizzes: item size and read cost.
+
+For quizzes of several sizes, built from English-like text so that they
+compress realistically, prints each format's DynamoDB item size (computed with
+DynamoDB's sizing rules) and the capacity units a read and a write of it
+consume. It also times the read path of the scoring functions, which build an
+answer key from the item: deserializing the item from the DynamoDB wire
+format (when boto3 is installed) and decoding its questions. With `--live`,
+both variants are written to the Quizzes table of a deployment and read back
+with GetItem, and the items are deleted afterwards.
+
+Usage:
+    bin/bench_quiz_format.py [--questions 10,50,100] [--live --reads 50]
+"""
+
+import argparse
+import math
+import os
+import random
+import statistics
+import sys
+import time
+import timeit
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lambdas", "common", "python"))
+
+from quiz_common.quizzes import stored_quiz, with_public_body  # noqa: E402
+from quiz_common.scoring import answer_key  # noqa: E402
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "test")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
+
+WORDS = (
+    "the of and a to in is was that for on as with by he at from his an were are which this be "
+    "or has had first one their its new after who they have her she two been other when there all "
+    "during into school time may years more most only over city some world would where later up "
+    "such used many can state about national out known university united then made river capital "
+    "war music largest planet element century ocean king empire animal painter novel mountain"
+).split()
+
+
+def sentence(rng, length):
+    words = []
+    while sum(len(word) + 1 for word in words) < length:
+        words.append(rng.choice(WORDS))
+    return " ".join(words)[:length].capitalize()
+
+
+def sample_quiz(question_count, seed=1):
+    rng = random.Random(seed)
+    questions = []
+    for _ in range(question_count):
+        options = [f"{chr(65 + idx)}. {sentence(rng, 30)}" for idx in range(4)]
+        questions.append({
+            "QuestionText": sentence(rng, 120) + "?",
+            "Options": options,
+            "CorrectAnswer": rng.choice(options),
+            "Trivia": sentence(rng, 300) + ".",
+        })
+    quiz = {
+        "QuizID": f"bench-format-{question_count}",
+        "Title": sentence(rng, 40),
+        "Visibility": "Private",
+        "EnableTimer": True,
+        "TimerSeconds": Decimal(30),
+        "Version": Decimal(1),
+        "QuestionCount": Decimal(question_count),
+        "Questions": questions,
+    }
+    return with_public_body(quiz)
+
+
+def attribute_size(value):
+    """The size DynamoDB accounts for an attribute value."""
+    if isinstance(value, str):
+        return len(value.encode())
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, bool) or value is None:
+        return 1
+    if isinstance(value, (int, Decimal)):
+        digits = len(str(abs(value)).replace(".", "").strip("0")) or 1
+        return math.ceil(digits / 2) + 1
+    if isinstance(value, list):
+        return 3 + sum(attribute_size(element) + 1 for element in value)
+    if isinstance(value, dict):
+        return 3 + sum(len(name.encode()) + attribute_size(element) + 1 for name, element in value.items())
+    raise TypeError(f"Unsupported attribute type {type(value).__name__}")
+
+
+def item_size(item):
+    return sum(len(name.encode()) + attribute_size(value) for name, value in item.items())
+
+
+def best(function, repeat):
+    return min(timeit.repeat(function, number=repeat, repeat=3)) / repeat
+
+
+def wire_codec():
+    try:
+        from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+    except ImportError:
+        print("boto3 is not installed, the DynamoDB wire format is not measured")
+        return None, None
+    serializer, deserializer = TypeSerializer(), TypeDeserializer()
+
+    def to_wire(item):
+        return {name: serializer.serialize(value) for name, value in item.items()}
+
+    def from_wire(wire):
+        return {name: deserializer.deserialize(value) for name, value in wire.items()}
+    return to_wire, from_wire
+
+
+def measure_live(endpoint_url, items, reads):
+    import boto3
+
+    table = boto3.resource("dynamodb", endpoint_url=endpoint_url).Table("Quizzes")
+    timings = {}
+    for label, item in items.items():
+        item = dict(item, QuizID=f"{item['QuizID']}-{label}")
+        table.put_item(Item=item)
+        try:
+            samples = []
+            for _ in range(reads):
+                start = time.perf_counter()
+                answer_key(table.get_item(Key={"QuizID": item["QuizID"]})["Item"])
+                samples.append(time.perf_counter() - start)
+        finally:
+            table.delete_item(Key={"QuizID": item["QuizID"]})
+        timings[label] = statistics.median(samples)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the quiz storage formats")
+    parser.add_argument("--questions", default="10,50,100", help="comma-separated question counts")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--live", action="store_true", help="also time GetItem against a deployment")
+    parser.add_argument("--reads", type=int, default=50, help="GetItem calls per item with --live")
+    parser.add_argument("--endpoint-url", default=os.environ.get("AWS_ENDPOINT_URL", "http://localhost:4566"))
+    args = parser.parse_args()
+
+    to_wire, from_wire = wire_codec()
+    for question_count in [int(count) for count in args.questions.split(",") if count]:
+        quiz = sample_quiz(question_count)
+        items = {storage_format: stored_quiz(quiz, storage_format) for storage_format in ("map", "compressed")}
+        live = measure_live(args.endpoint_url, items, args.reads) if args.live else {}
+        print(f"quiz with {question_count} questions:")
+        for label, item in items.items():
+            size = item_size(item)
+            # strongly consistent reads cost 1 RCU per 4 KB, writes 1 WCU per 1 KB
+            line = (
+                f"  {label:>10}: {size / 1024:6.1f} KiB, {math.ceil(size / 4096):3d} RCU per read, "
+                f"{math.ceil(size / 1024):3d} WCU per write, answer key "
+            )
+            if from_wire is not None:
+                wire = to_wire(item)
+                line += f"{best(lambda: answer_key(from_wire(wire)), args.repeat) * 1e6:7.1f} us from the wire"
+            else:
+                line += f"{best(lambda: answer_key(item), args.repeat) * 1e6:7.1f} us from the item"
+            if label in live:
+                line += f", GetItem median {live[label] * 1000:.1f} ms"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
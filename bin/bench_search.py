@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+"""
+Measure the quiz search index at a given number of public quizzes.
+
+Builds an index of synthetic quizzes whose titles draw words from a skewed
+vocabulary, so that some words match a large share of the quizzes and most
+match few, then reports the blob size, how long a cold SearchQuizzesFunction
+takes to load it, and per-query latencies for single words, prefixes and
+multi-word queries.
+
+Usage:
+    bin/bench_search.py [--quizzes 100000] [--questions] [--queries 2000]
+"""
+
+import argparse
+import gc
+import itertools
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lambdas", "common", "python"))
+
+from quiz_common.search import SearchIndex  # noqa: E402
+
+SYLLABLES = ["ka", "lo", "mi", "ter", "sa", "ven", "ro", "qui", "zen", "dor", "pa", "lu", "nex", "ti", "bra"]
+
+
+def vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def synthetic_quizzes(count, words, rng, include_questions):
+    # a few words appear in many titles, like "quiz" or "history" would
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+    for idx in range(count):
+        quiz = {
+            "QuizID": f"quiz-{idx}",
+            "Title": " ".join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(2, 6))),
+            "Visibility": "Public",
+        }
+        if include_questions:
+            quiz["Questions"] = [
+                {"QuestionText": " ".join(rng.choices(words, cum_weights=cum_weights, k=8))} for _ in range(10)
+            ]
+        yield quiz
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the quiz search index")
+    parser.add_argument("--quizzes", type=int, default=100000)
+    parser.add_argument("--vocabulary", type=int, default=20000)
+    parser.add_argument("--questions", action="store_true", help="index and search question texts as well")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    words = vocabulary(args.vocabulary, rng)
+
+    start = time.perf_counter()
+    index = SearchIndex()
+    for quiz in synthetic_quizzes(args.quizzes, words, rng, args.questions):
+        index.add(quiz, include_questions=args.questions)
+    print(f"indexed {len(index)} quizzes in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    blob = index.to_blob()
+    print(f"blob: {len(blob) / 1024:.0f} KiB, written in {(time.perf_counter() - start) * 1e3:.0f} ms")
+    start = time.perf_counter()
+    index = SearchIndex.from_blob(blob)
+    print(f"cold load: {(time.perf_counter() - start) * 1e3:.0f} ms")
+    del blob
+    # as in SearchQuizzesFunction, keep the garbage collector from rescanning the index
+    gc.freeze()
+
+    common, rare = words[:50], words[50:]
+    queries = {
+        "common word": lambda: rng.choice(common) + " ",
+        "rare word": lambda: rng.choice(rare) + " ",
+        "2-letter prefix": lambda: rng.choice(words)[:2],
+        "4-letter prefix": lambda: rng.choice(words)[:4],
+        "common word + prefix": lambda: f"{rng.choice(common)} {rng.choice(words)[:3]}",
+        "two common words": lambda: f"{rng.choice(common)} {rng.choice(common)} ",
+    }
+    for label, make_query in queries.items():
+        latencies = []
+        for _ in range(args.queries):
+            query = make_query()
+            start = time.perf_counter()
+            index.search(query, 20, args.questions)
+            latencies.append((time.perf_counter() - start) * 1e3)
+        print(f"{label:>22}: p50 {statistics.median(latencies):6.3f} ms, "
+              f"p99 {percentile(latencies, 0.99):6.3f} ms, max {max(latencies):6.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+"""
+Measure the per-request cost of validating /createquiz and /submitquiz bodies.
+
+Times `quiz_common.validation` on valid payloads of increasing size and on a
+few typical rejections, next to `json.loads` of the same body for scale.
+
+Usage:
+    bin/bench_validation.py [--questions 10,50,100] [--repeat 2000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lambdas", "common", "python"))
+
+from quiz_common.validation import ValidationError, validate_quiz, validate_submission  # noqa: E402
+
+
+def quiz_body(questions):
+    return {
+        "Title": "Benchmark Quiz",
+        "Visibility": "Public",
+        "EnableTimer": True,
+        "TimerSeconds": 10,
+        "Questions": [
+            {
+                "QuestionText": f"Question {idx}?",
+                "Options": ["A. 1", "B. 2", "C. 3", "D. 4"],
+                "CorrectAnswer": "A. 1",
+                "Trivia": "",
+            }
+            for idx in range(questions)
+        ],
+    }
+
+
+def submission_body(questions):
+    return {
+        "Username": "player",
+        "QuizID": "benchmark-quiz",
+        "Version": 1,
+        "IdempotencyKey": "8f14e45f-ceea-467f-a0e6-8c1e2b9c9a3e",
+        "Answers": {str(idx): {"Answer": "A. 1", "TimeTaken": 4.2} for idx in range(questions)},
+    }
+
+
+def invalid_submissions(questions):
+    body = submission_body(questions)
+    yield "answer index out of range", {**body, "Answers": {**body["Answers"], "100000": body["Answers"]["0"]}}
+    yield "negative TimeTaken", {**body, "Answers": {**body["Answers"], "0": {"Answer": "A. 1", "TimeTaken": -1}}}
+    yield "oversized Username", {**body, "Username": "x" * 10_000}
+
+
+def measure(validate, payload, repeat):
+    def call():
+        try:
+            validate(payload)
+        except ValidationError:
+            pass
+    return min(timeit.repeat(call, number=repeat, repeat=3)) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark request validation")
+    parser.add_argument("--questions", default="10,50,100", help="comma-separated question counts")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    for questions in [int(count) for count in args.questions.split(",")]:
+        for name, validate, payload in (
+            ("createquiz", validate_quiz, quiz_body(questions)),
+            ("submitquiz", validate_submission, submission_body(questions)),
+        ):
+            body = json.dumps(payload)
+            validation = measure(validate, payload, args.repeat)
+            parsing = min(timeit.repeat(lambda: json.loads(body), number=args.repeat, repeat=3)) / args.repeat
+            print(f"{name} ({questions} questions, {len(body)} bytes): "
+                  f"validate {validation * 1e6:.1f} us, json.loads {parsing * 1e6:.1f} us")
+
+    for reason, payload in invalid_submissions(10):
+        print(f"submitquiz rejected ({reason}): {measure(validate_submission, payload, args.repeat) * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
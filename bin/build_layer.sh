@@ -0,0 +1,24 @@
+#!/usr/bin/env bash
+
+# Assemble the QuizCommonLayer contents in build/quiz_common_layer: the
+# quiz_common package plus the optional packages listed in
+# lambdas/common/requirements.txt, built for the Lambda runtime.
+
+set -euo pipefail
+
+PYTHON_VERSION=${PYTHON_VERSION:-3.11}
+# x86_64 or aarch64, matching the architecture of the functions
+LAYER_ARCH=${LAYER_ARCH:-x86_64}
+OUTPUT=build/quiz_common_layer
+
+rm -rf "$OUTPUT"
+mkdir -p "$OUTPUT"
+cp -r lambdas/common/python "$OUTPUT/"
+find "$OUTPUT" -name __pycache__ -type d -prune -exec rm -rf {} +
+
+if ! pip3 install --quiet --target "$OUTPUT/python" \
+    --platform "manylinux2014_${LAYER_ARCH}" --implementation cp \
+    --python-version "$PYTHON_VERSION" --only-binary=:all: \
+    -r lambdas/common/requirements.txt; then
+    echo "Could not install lambdas/common/requirements.txt, the layer falls back to the standard library" >&2
+fi
@@ -4,6 +4,27 @@ set -e
 set -o pipefail
 
 AWS_ENDPOINT_URL=${AWS_ENDPOINT_URL:-"http://localhost:4566"}
+# Score small submissions inside SubmitQuizFunction while the queue is idle
+INLINE_SCORING=${INLINE_SCORING:-false}
+# Days until scored submissions expire and are archived to S3 (0 keeps them in DynamoDB)
+SUBMISSION_RETENTION_DAYS=${SUBMISSION_RETENTION_DAYS:-0}
+# Index question texts for /searchquizzes as well as titles
+SEARCH_INDEX_QUESTIONS=${SEARCH_INDEX_QUESTIONS:-false}
+# Store quiz questions as lists of maps ("map") or as compressed binary ("compressed")
+QUIZ_STORAGE_FORMAT=${QUIZ_STORAGE_FORMAT:-map}
+# Scoring event source settings (see bin/sweep_scoring.py); 0 concurrency leaves it unlimited
+SCORING_BATCH_SIZE=${SCORING_BATCH_SIZE:-10}
+SCORING_BATCHING_WINDOW=${SCORING_BATCHING_WINDOW:-0}
+SCORING_MAX_CONCURRENCY=${SCORING_MAX_CONCURRENCY:-0}
+# Records of a batch that ScoringFunction scores at the same time (1 scores them in turn)
+SCORING_RECORD_CONCURRENCY=${SCORING_RECORD_CONCURRENCY:-10}
+# Admission control of /submitquiz: queue backlog and submissions per second per player and per quiz (0 disables)
+ADMISSION_MAX_BACKLOG=${ADMISSION_MAX_BACKLOG:-0}
+ADMISSION_USER_RATE=${ADMISSION_USER_RATE:-0}
+ADMISSION_QUIZ_RATE=${ADMISSION_QUIZ_RATE:-0}
+# tokens a player's and a quiz's bucket hold, taken at once before the rates apply
+ADMISSION_USER_BURST=${ADMISSION_USER_BURST:-5}
+ADMISSION_QUIZ_BURST=${ADMISSION_QUIZ_BURST:-100}
 
 # Colors for logging
 GREEN='\033[0;32m'
@@ -31,6 +52,17 @@ awslocal dynamodb create-table \
     --attribute-definitions AttributeName=QuizID,AttributeType=S \
     --key-schema AttributeName=QuizID,KeyType=HASH \
     --provisioned-throughput ReadCapacityUnits=5,WriteCapacityUnits=5 \
+    --stream-specification StreamEnabled=true,StreamViewType=NEW_IMAGE \
+    --output text >/dev/null
+
+log "Creating 'QuizVersions' table..."
+awslocal dynamodb create-table \
+    --table-name QuizVersions \
+    --attribute-definitions \
+        AttributeName=QuizID,AttributeType=S \
+        AttributeName=Version,AttributeType=N \
+    --key-schema AttributeName=QuizID,KeyType=HASH AttributeName=Version,KeyType=RANGE \
+    --provisioned-throughput ReadCapacityUnits=5,WriteCapacityUnits=5 \
     --output text >/dev/null
 
 log "Creating 'UserSubmissions' table..."
@@ -39,7 +71,9 @@ awslocal dynamodb create-table \
     --attribute-definitions \
         AttributeName=SubmissionID,AttributeType=S \
         AttributeName=QuizID,AttributeType=S \
-        AttributeName=Score,AttributeType=N \
+        AttributeName=ScoreRank,AttributeType=S \
+        AttributeName=Username,AttributeType=S \
+        AttributeName=SubmittedAt,AttributeType=S \
     --key-schema AttributeName=SubmissionID,KeyType=HASH \
     --global-secondary-indexes \
         '[
@@ -47,15 +81,99 @@ awslocal dynamodb create-table \
                 "IndexName": "QuizID-Score-index",
                 "KeySchema": [
                     {"AttributeName": "QuizID", "KeyType": "HASH"},
+                    {"AttributeName": "ScoreRank", "KeyType": "RANGE"}
+                ],
+                "Projection": {"ProjectionType": "INCLUDE", "NonKeyAttributes": ["Username", "Score"]},
+                "ProvisionedThroughput": {"ReadCapacityUnits": 5, "WriteCapacityUnits": 5}
+            },
+            {
+                "IndexName": "Username-SubmittedAt-index",
+                "KeySchema": [
+                    {"AttributeName": "Username", "KeyType": "HASH"},
+                    {"AttributeName": "SubmittedAt", "KeyType": "RANGE"}
+                ],
+                "Projection": {
+                    "ProjectionType": "INCLUDE",
+                    "NonKeyAttributes": ["QuizID", "QuizVersion", "Score", "TotalQuestions"]
+                },
+                "ProvisionedThroughput": {"ReadCapacityUnits": 5, "WriteCapacityUnits": 5}
+            }
+        ]' \
+    --provisioned-throughput ReadCapacityUnits=5,WriteCapacityUnits=5 \
+    --stream-specification StreamEnabled=true,StreamViewType=OLD_IMAGE \
+    --output text >/dev/null
+
+# expired submissions are archived from the stream
+awslocal dynamodb update-time-to-live \
+    --table-name UserSubmissions \
+    --time-to-live-specification Enabled=true,AttributeName=ExpiresAt \
+    --output text >/dev/null
+
+log "Creating 'LeaderboardSnapshots' table..."
+awslocal dynamodb create-table \
+    --table-name LeaderboardSnapshots \
+    --attribute-definitions AttributeName=QuizID,AttributeType=S \
+    --key-schema AttributeName=QuizID,KeyType=HASH \
+    --provisioned-throughput ReadCapacityUnits=5,WriteCapacityUnits=5 \
+    --output text >/dev/null
+
+log "Creating 'Tournaments' table..."
+awslocal dynamodb create-table \
+    --table-name Tournaments \
+    --attribute-definitions AttributeName=TournamentID,AttributeType=S \
+    --key-schema AttributeName=TournamentID,KeyType=HASH \
+    --provisioned-throughput ReadCapacityUnits=5,WriteCapacityUnits=5 \
+    --output text >/dev/null
+
+log "Creating 'TournamentScores' table..."
+awslocal dynamodb create-table \
+    --table-name TournamentScores \
+    --attribute-definitions \
+        AttributeName=TournamentID,AttributeType=S \
+        AttributeName=Username,AttributeType=S \
+        AttributeName=Score,AttributeType=N \
+    --key-schema AttributeName=TournamentID,KeyType=HASH AttributeName=Username,KeyType=RANGE \
+    --global-secondary-indexes \
+        '[
+            {
+                "IndexName": "TournamentID-Score-index",
+                "KeySchema": [
+                    {"AttributeName": "TournamentID", "KeyType": "HASH"},
                     {"AttributeName": "Score", "KeyType": "RANGE"}
                 ],
-                "Projection": {"ProjectionType": "ALL"},
+                "Projection": {"ProjectionType": "KEYS_ONLY"},
                 "ProvisionedThroughput": {"ReadCapacityUnits": 5, "WriteCapacityUnits": 5}
             }
         ]' \
     --provisioned-throughput ReadCapacityUnits=5,WriteCapacityUnits=5 \
     --output text >/dev/null
 
+log "Creating 'SubmissionIdempotency' table..."
+awslocal dynamodb create-table \
+    --table-name SubmissionIdempotency \
+    --attribute-definitions AttributeName=IdempotencyKey,AttributeType=S \
+    --key-schema AttributeName=IdempotencyKey,KeyType=HASH \
+    --provisioned-throughput ReadCapacityUnits=5,WriteCapacityUnits=5 \
+    --output text >/dev/null
+
+awslocal dynamodb update-time-to-live \
+    --table-name SubmissionIdempotency \
+    --time-to-live-specification Enabled=true,AttributeName=ExpiresAt \
+    --output text >/dev/null
+
+log "Creating 'SubmissionRateLimits' table..."
+awslocal dynamodb create-table \
+    --table-name SubmissionRateLimits \
+    --attribute-definitions AttributeName=BucketKey,AttributeType=S \
+    --key-schema AttributeName=BucketKey,KeyType=HASH \
+    --billing-mode PAY_PER_REQUEST \
+    --output text >/dev/null
+
+awslocal dynamodb update-time-to-live \
+    --table-name SubmissionRateLimits \
+    --time-to-live-specification Enabled=true,AttributeName=ExpiresAt \
+    --output text >/dev/null
+
 log "DynamoDB tables created successfully."
 
 # Create SQS queue
@@ -67,24 +185,49 @@ log "SQS queue 'QuizSubmissionQueue' created successfully."
 log "Zipping Lambda functions..."
 zip -j get_quiz_function.zip lambdas/get_quiz/handler.py >/dev/null
 zip -j create_quiz_function.zip lambdas/create_quiz/handler.py >/dev/null
+zip -j update_quiz_function.zip lambdas/update_quiz/handler.py >/dev/null
 zip -j submit_quiz_function.zip lambdas/submit_quiz/handler.py >/dev/null
 zip -j scoring_function.zip lambdas/scoring/handler.py >/dev/null
 zip -j get_submission_function.zip lambdas/get_submission/handler.py >/dev/null
 zip -j get_leaderboard_function.zip lambdas/get_leaderboard/handler.py >/dev/null
+zip -j get_user_submissions_function.zip lambdas/get_user_submissions/handler.py >/dev/null
 zip -j list_quizzes_function.zip lambdas/list_quizzes/handler.py >/dev/null
 zip -j retry_quizzes_writes_function.zip lambdas/retry_quizzes_writes/handler.py >/dev/null
+zip -j archive_submissions_function.zip lambdas/archive_submissions/handler.py >/dev/null
+zip -j search_quizzes_function.zip lambdas/search_quizzes/handler.py >/dev/null
+zip -j index_quizzes_function.zip lambdas/index_quizzes/handler.py >/dev/null
+zip -j create_tournament_function.zip lambdas/create_tournament/handler.py >/dev/null
+zip -j get_tournament_leaderboard_function.zip lambdas/get_tournament_leaderboard/handler.py >/dev/null
 log "Lambda functions zipped successfully."
 
+# Shared storage layer
+log "Publishing Lambda layer 'QuizCommonLayer'..."
+PYTHON_VERSION=3.10 bin/build_layer.sh
+(cd build/quiz_common_layer && zip -r ../../quiz_common_layer.zip python >/dev/null)
+LAYER_ARN=$(awslocal lambda publish-layer-version \
+    --layer-name QuizCommonLayer \
+    --zip-file fileb://quiz_common_layer.zip \
+    --compatible-runtimes python3.10 \
+    --query 'LayerVersionArn' --output text)
+log "Lambda layer published: $LAYER_ARN"
+
 # Function names and their policy files
 FUNCTIONS=(
   "CreateQuizFunction configurations/create_quiz_policy.json CreateQuizRole"
   "GetQuizFunction configurations/get_quiz_policy.json GetQuizRole"
+  "UpdateQuizFunction configurations/update_quiz_policy.json UpdateQuizRole"
   "SubmitQuizFunction configurations/submit_quiz_policy.json SubmitQuizRole"
   "ScoringFunction configurations/scoring_policy.json ScoringRole"
   "GetSubmissionFunction configurations/get_submission_policy.json GetSubmissionRole"
   "GetLeaderboardFunction configurations/get_leaderboard_policy.json GetLeaderboardRole"
+  "GetUserSubmissionsFunction configurations/get_user_submissions_policy.json GetUserSubmissionsRole"
   "ListPublicQuizzesFunction configurations/list_quizzes_policy.json ListQuizzesRole"
   "RetryQuizzesWritesFunction configurations/retry_quizzes_writes_policy.json RetryQuizzesWritesRole"
+  "ArchiveSubmissionsFunction configurations/archive_submissions_policy.json ArchiveSubmissionsRole"
+  "SearchQuizzesFunction configurations/search_quizzes_policy.json SearchQuizzesRole"
+  "IndexQuizzesFunction configurations/index_quizzes_policy.json IndexQuizzesRole"
+  "CreateTournamentFunction configurations/create_tournament_policy.json CreateTournamentRole"
+  "GetTournamentLeaderboardFunction configurations/get_tournament_leaderboard_policy.json GetTournamentLeaderboardRole"
 )
 
 # Create IAM policies and roles
@@ -131,12 +274,19 @@ log "Deploying Lambda functions..."
 LAMBDAS=(
   "CreateQuizFunction create_quiz_function.zip CreateQuizRole"
   "GetQuizFunction get_quiz_function.zip GetQuizRole"
+  "UpdateQuizFunction update_quiz_function.zip UpdateQuizRole"
   "SubmitQuizFunction submit_quiz_function.zip SubmitQuizRole"
   "ScoringFunction scoring_function.zip ScoringRole"
   "GetSubmissionFunction get_submission_function.zip GetSubmissionRole"
   "GetLeaderboardFunction get_leaderboard_function.zip GetLeaderboardRole"
+  "GetUserSubmissionsFunction get_user_submissions_function.zip GetUserSubmissionsRole"
   "ListPublicQuizzesFunction list_quizzes_function.zip ListQuizzesRole"
   "RetryQuizzesWritesFunction retry_quizzes_writes_function.zip RetryQuizzesWritesRole"
+  "ArchiveSubmissionsFunction archive_submissions_function.zip ArchiveSubmissionsRole"
+  "SearchQuizzesFunction search_quizzes_function.zip SearchQuizzesRole"
+  "IndexQuizzesFunction index_quizzes_function.zip IndexQuizzesRole"
+  "CreateTournamentFunction create_tournament_function.zip CreateTournamentRole"
+  "GetTournamentLeaderboardFunction get_tournament_leaderboard_function.zip GetTournamentLeaderboardRole"
 )
 
 for LAMBDA_INFO in "${LAMBDAS[@]}"; do
@@ -148,10 +298,34 @@ for LAMBDA_INFO in "${LAMBDAS[@]}"; do
       --runtime python3.10 \
       --handler handler.lambda_handler \
       --zip-file fileb://${ZIP_FILE} \
+      --layers ${LAYER_ARN} \
       --role arn:aws:iam::000000000000:role/${ROLE_NAME} \
       --timeout 30 \
       --output text >/dev/null
 done
+
+awslocal lambda wait function-active-v2 --function-name SubmitQuizFunction
+awslocal lambda update-function-configuration \
+    --function-name SubmitQuizFunction \
+    --environment "Variables={INLINE_SCORING_ENABLED=${INLINE_SCORING},SUBMISSION_RETENTION_DAYS=${SUBMISSION_RETENTION_DAYS},ADMISSION_MAX_BACKLOG=${ADMISSION_MAX_BACKLOG},ADMISSION_USER_RATE=${ADMISSION_USER_RATE},ADMISSION_USER_BURST=${ADMISSION_USER_BURST},ADMISSION_QUIZ_RATE=${ADMISSION_QUIZ_RATE},ADMISSION_QUIZ_BURST=${ADMISSION_QUIZ_BURST}}" \
+    --output text >/dev/null
+awslocal lambda wait function-active-v2 --function-name ScoringFunction
+awslocal lambda update-function-configuration \
+    --function-name ScoringFunction \
+    --environment "Variables={SUBMISSION_RETENTION_DAYS=${SUBMISSION_RETENTION_DAYS},SCORING_RECORD_CONCURRENCY=${SCORING_RECORD_CONCURRENCY}}" \
+    --output text >/dev/null
+awslocal lambda wait function-active-v2 --function-name IndexQuizzesFunction
+awslocal lambda update-function-configuration \
+    --function-name IndexQuizzesFunction \
+    --environment "Variables={SEARCH_INDEX_QUESTIONS=${SEARCH_INDEX_QUESTIONS}}" \
+    --output text >/dev/null
+for FUNCTION_NAME in CreateQuizFunction UpdateQuizFunction RetryQuizzesWritesFunction; do
+  awslocal lambda wait function-active-v2 --function-name ${FUNCTION_NAME}
+  awslocal lambda update-function-configuration \
+      --function-name ${FUNCTION_NAME} \
+      --environment "Variables={QUIZ_STORAGE_FORMAT=${QUIZ_STORAGE_FORMAT}}" \
+      --output text >/dev/null
+done
 log "Lambda functions deployed successfully."
 
 # SQS Trigger
@@ -159,12 +333,49 @@ log "Setting up SQS trigger for ScoringFunction..."
 QUEUE_URL=$(awslocal sqs get-queue-url --queue-name QuizSubmissionQueue --query 'QueueUrl' --output text)
 QUEUE_ARN=$(awslocal sqs get-queue-attributes --queue-url $QUEUE_URL --attribute-names QueueArn --query 'Attributes.QueueArn' --output text)
 
+SCALING_CONFIG=()
+if [ "$SCORING_MAX_CONCURRENCY" != "0" ]; then
+    SCALING_CONFIG=(--scaling-config MaximumConcurrency=${SCORING_MAX_CONCURRENCY})
+fi
 awslocal lambda create-event-source-mapping \
     --function-name ScoringFunction \
-    --batch-size 10 \
+    --batch-size ${SCORING_BATCH_SIZE} \
+    --maximum-batching-window-in-seconds ${SCORING_BATCHING_WINDOW} \
+    --function-response-types ReportBatchItemFailures \
+    "${SCALING_CONFIG[@]}" \
     --event-source-arn $QUEUE_ARN >/dev/null
 log "SQS trigger set up successfully."
 
+# Archival of expired submissions
+log "Setting up archival of expired submissions..."
+awslocal s3 mb s3://quiz-app-submissions-archive >/dev/null
+STREAM_ARN=$(awslocal dynamodb describe-table --table-name UserSubmissions --query 'Table.LatestStreamArn' --output text)
+
+# only TTL deletions are archived, not the writes of every scored submission
+awslocal lambda create-event-source-mapping \
+    --function-name ArchiveSubmissionsFunction \
+    --batch-size 100 \
+    --starting-position TRIM_HORIZON \
+    --event-source-arn $STREAM_ARN \
+    --filter-criteria '{"Filters": [{"Pattern": "{\"eventName\": [\"REMOVE\"], \"userIdentity\": {\"type\": [\"Service\"]}}"}]}' \
+    >/dev/null
+log "Archival set up successfully."
+
+# Quiz search index, updated from the Quizzes stream
+log "Setting up the quiz search index..."
+awslocal s3 mb s3://quiz-app-search-index >/dev/null
+QUIZZES_STREAM_ARN=$(awslocal dynamodb describe-table --table-name Quizzes --query 'Table.LatestStreamArn' --output text)
+
+# every invocation rewrites the whole index, so changes are batched up
+awslocal lambda create-event-source-mapping \
+    --function-name IndexQuizzesFunction \
+    --batch-size 100 \
+    --maximum-batching-window-in-seconds 5 \
+    --starting-position TRIM_HORIZON \
+    --event-source-arn $QUIZZES_STREAM_ARN \
+    >/dev/null
+log "Quiz search index set up successfully."
+
 # Create REST API
 log "Creating REST API..."
 API_ID=$(awslocal apigateway create-rest-api \
@@ -182,10 +393,15 @@ log "Root resource ID: $PARENT_ID"
 ENDPOINTS=(
   "getquiz GET GetQuizFunction"
   "createquiz POST CreateQuizFunction"
+  "updatequiz POST UpdateQuizFunction"
   "submitquiz POST SubmitQuizFunction"
   "getsubmission GET GetSubmissionFunction"
   "getleaderboard GET GetLeaderboardFunction"
+  "getusersubmissions GET GetUserSubmissionsFunction"
   "listquizzes GET ListPublicQuizzesFunction"
+  "searchquizzes GET SearchQuizzesFunction"
+  "createtournament POST CreateTournamentFunction"
+  "gettournamentleaderboard GET GetTournamentLeaderboardFunction"
 )
 
 for ENDPOINT_INFO in "${ENDPOINTS[@]}"; do
@@ -367,11 +583,16 @@ API_ID=$(awslocal apigateway get-rest-apis \
 
 LAMBDA_PERMISSIONS=(
   "CreateQuizFunction POST createquiz"
+  "UpdateQuizFunction POST updatequiz"
   "SubmitQuizFunction POST submitquiz"
   "GetQuizFunction GET getquiz"
   "GetSubmissionFunction GET getsubmission"
   "GetLeaderboardFunction GET getleaderboard"
+  "GetUserSubmissionsFunction GET getusersubmissions"
   "ListPublicQuizzesFunction GET listquizzes"
+  "SearchQuizzesFunction GET searchquizzes"
+  "CreateTournamentFunction POST createtournament"
+  "GetTournamentLeaderboardFunction GET gettournamentleaderboard"
 )
 
 for PERMISSION_INFO in "${LAMBDA_PERMISSIONS[@]}"; do
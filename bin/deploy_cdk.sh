@@ -4,6 +4,31 @@ set -euo pipefail
 
 AWS_CMD=${AWS_CMD:-aws}
 CDK_CMD=${CDK_CMD:-cdk}
+# "split" (one function per endpoint) or "router" (single API function)
+API_LAYOUT=${API_LAYOUT:-split}
+# score small submissions inside submitquiz while the queue is idle
+INLINE_SCORING=${INLINE_SCORING:-false}
+# days until scored submissions are archived to S3 (0 keeps them in DynamoDB)
+SUBMISSION_RETENTION_DAYS=${SUBMISSION_RETENTION_DAYS:-0}
+# index question texts for /searchquizzes as well as titles
+SEARCH_INDEX_QUESTIONS=${SEARCH_INDEX_QUESTIONS:-false}
+# store quiz questions as lists of maps ("map") or as compressed binary ("compressed")
+QUIZ_STORAGE_FORMAT=${QUIZ_STORAGE_FORMAT:-map}
+# scoring event source settings (see bin/sweep_scoring.py); 0 concurrency leaves it unlimited
+SCORING_BATCH_SIZE=${SCORING_BATCH_SIZE:-10}
+SCORING_BATCHING_WINDOW=${SCORING_BATCHING_WINDOW:-0}
+SCORING_MAX_CONCURRENCY=${SCORING_MAX_CONCURRENCY:-0}
+# records of a batch that ScoringFunction scores at the same time (1 scores them in turn)
+SCORING_RECORD_CONCURRENCY=${SCORING_RECORD_CONCURRENCY:-10}
+# admission control of /submitquiz: queue backlog and submissions per second per player and per quiz (0 disables)
+ADMISSION_MAX_BACKLOG=${ADMISSION_MAX_BACKLOG:-0}
+ADMISSION_USER_RATE=${ADMISSION_USER_RATE:-0}
+ADMISSION_QUIZ_RATE=${ADMISSION_QUIZ_RATE:-0}
+# tokens a player's and a quiz's bucket hold, taken at once before the rates apply
+ADMISSION_USER_BURST=${ADMISSION_USER_BURST:-5}
+ADMISSION_QUIZ_BURST=${ADMISSION_QUIZ_BURST:-100}
+# serve /getquiz, /listquizzes and /getleaderboard through the CloudFront distribution
+EDGE_CACHE_READS=${EDGE_CACHE_READS:-false}
 
 # stub build the frontend code since the CDK stack needs this code to
 # synthesise the FrontendStack, but we don't yet know the backend URL to inject
@@ -15,6 +40,9 @@ if [ ! -d frontend/build ]; then
     )
 fi
 
+# bundle quiz_common with its optional packages (see bin/build_layer.sh)
+bin/build_layer.sh
+
 # bootstrap the stack
 (cd cdk
 npm run ${CDK_CMD} bootstrap
@@ -22,20 +50,25 @@ npm run ${CDK_CMD} bootstrap
 
 # deploy bulk of the application
 (cd cdk
-npm run ${CDK_CMD} -- deploy --require-approval never QuizAppStack
+npm run ${CDK_CMD} -- deploy --require-approval never -c api_layout=${API_LAYOUT} -c inline_scoring=${INLINE_SCORING} -c submission_retention_days=${SUBMISSION_RETENTION_DAYS} -c search_index_questions=${SEARCH_INDEX_QUESTIONS} -c scoring_batch_size=${SCORING_BATCH_SIZE} -c scoring_batching_window=${SCORING_BATCHING_WINDOW} -c scoring_max_concurrency=${SCORING_MAX_CONCURRENCY} -c scoring_record_concurrency=${SCORING_RECORD_CONCURRENCY} -c admission_max_backlog=${ADMISSION_MAX_BACKLOG} -c admission_user_rate=${ADMISSION_USER_RATE} -c admission_user_burst=${ADMISSION_USER_BURST} -c admission_quiz_rate=${ADMISSION_QUIZ_RATE} -c admission_quiz_burst=${ADMISSION_QUIZ_BURST} -c edge_cache_reads=${EDGE_CACHE_READS} -c quiz_storage_format=${QUIZ_STORAGE_FORMAT} QuizAppStack
 )
 
 # get the backend API url
-API_URL=$($AWS_CMD cloudformation describe-stacks --stack-name QuizAppStack --query Stacks[0].Outputs[0].OutputValue --output text)
+# (with EDGE_CACHE_READS the stack also exports values to the FrontendStack)
+API_URL=$($AWS_CMD cloudformation describe-stacks --stack-name QuizAppStack --query "Stacks[0].Outputs[?starts_with(OutputKey, 'QuizAPIEndpoint')].OutputValue | [0]" --output text)
 echo "Backend API URL: $API_URL"
 
 # build the frontend code
 (cd frontend
 echo "REACT_APP_API_ENDPOINT=$API_URL" > .env.local
+if [ "$EDGE_CACHE_READS" = "true" ]; then
+    # an empty endpoint makes the reads relative to the distribution
+    echo "REACT_APP_READ_API_ENDPOINT=" >> .env.local
+fi
 npx react-scripts build
 )
 
 # deploy the frontend stack
 (cd cdk
-npm run ${CDK_CMD} -- deploy --require-approval never FrontendStack
+npm run ${CDK_CMD} -- deploy --require-approval never --exclusively -c edge_cache_reads=${EDGE_CACHE_READS} FrontendStack
 )
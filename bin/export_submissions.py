@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+
+"""
+Export the UserSubmissions table for offline analytics.
+
+The table is read with a parallel Scan: each of --segments segments is scanned
+by its own worker thread, page by page, and every page is appended to that
+segment's output file as a gzip member (gzip readers treat the file as one
+JSON Lines stream). Nothing but the current page is held in memory.
+
+After each page the worker records the scan position and the output file size
+in a per-segment checkpoint. A rerun with the same --output resumes every
+unfinished segment where it stopped, truncating anything written after the
+last checkpoint. Reads are throttled to --max-rcu read capacity units per
+second, by default half of the table's provisioned read capacity.
+
+Usage:
+    bin/export_submissions.py --output ./export [--segments 8] [--max-rcu 50] [--page-size 500]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lambdas", "common", "python"))
+
+from quiz_common.archive import encode_items  # noqa: E402
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "test")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
+
+
+class CapacityLimiter:
+    """Token bucket over read capacity units, refilled at `rate` units per second.
+
+    The cost of a page is only known after it has been read, so consumption is
+    charged afterwards and may drive the bucket negative; the next caller then
+    waits until the debt is repaid.
+    """
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens > 0:
+                    return
+                delay = -self.tokens / self.rate
+            time.sleep(delay)
+
+    def charge(self, units):
+        if not self.rate:
+            return
+        with self.lock:
+            self.tokens -= units
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.items = 0
+        self.resumed = 0
+        self.pages = 0
+        self.bytes = 0
+        self.capacity = 0.0
+        self.segments_done = 0
+
+    def add(self, **counts):
+        with self.lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+
+def checkpoint_path(output, segment):
+    return os.path.join(output, f"segment-{segment:04d}.checkpoint.json")
+
+
+def data_path(output, segment):
+    return os.path.join(output, f"segment-{segment:04d}.jsonl.gz")
+
+
+def load_checkpoint(output, segment, total_segments):
+    path = checkpoint_path(output, segment)
+    if not os.path.exists(path):
+        return {"TotalSegments": total_segments, "Offset": 0, "Items": 0, "ExclusiveStartKey": None, "Done": False}
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint["TotalSegments"] != total_segments:
+        raise SystemExit(
+            f"{path} was written with --segments {checkpoint['TotalSegments']}; "
+            f"resume with the same value or use a new --output"
+        )
+    return checkpoint
+
+
+def save_checkpoint(output, segment, checkpoint):
+    path = checkpoint_path(output, segment)
+    with open(path + ".tmp", "w") as f:
+        json.dump(checkpoint, f, default=str)
+    # atomic, so a crash leaves either the old or the new checkpoint
+    os.replace(path + ".tmp", path)
+
+
+def export_segment(table, output, segment, total_segments, page_size, limiter, stats):
+    checkpoint = load_checkpoint(output, segment, total_segments)
+    stats.add(resumed=checkpoint["Items"])
+    if checkpoint["Done"]:
+        stats.add(segments_done=1)
+        return
+
+    with open(data_path(output, segment), "ab") as out:
+        # drop pages written after the last checkpoint; they are read again
+        out.truncate(checkpoint["Offset"])
+        out.seek(checkpoint["Offset"])
+        while True:
+            kwargs = {
+                "Segment": segment,
+                "TotalSegments": total_segments,
+                "Limit": page_size,
+                "ReturnConsumedCapacity": "TOTAL",
+            }
+            if checkpoint["ExclusiveStartKey"]:
+                kwargs["ExclusiveStartKey"] = checkpoint["ExclusiveStartKey"]
+            limiter.wait()
+            response = table.scan(**kwargs)
+            capacity = response.get("ConsumedCapacity", {}).get("CapacityUnits", 0)
+            limiter.charge(capacity)
+
+            items = response.get("Items", [])
+            if items:
+                data = encode_items(items)
+                out.write(data)
+                out.flush()
+                os.fsync(out.fileno())
+                stats.add(bytes=len(data))
+            stats.add(items=len(items), pages=1, capacity=capacity)
+
+            checkpoint["Offset"] = out.tell()
+            checkpoint["Items"] += len(items)
+            checkpoint["ExclusiveStartKey"] = response.get("LastEvaluatedKey")
+            checkpoint["Done"] = "LastEvaluatedKey" not in response
+            save_checkpoint(output, segment, checkpoint)
+            if checkpoint["Done"]:
+                stats.add(segments_done=1)
+                return
+
+
+def default_rate(client, table_name):
+    table = client.describe_table(TableName=table_name)["Table"]
+    units = table.get("ProvisionedThroughput", {}).get("ReadCapacityUnits", 0)
+    # on-demand tables report 0 provisioned units and are not throttled here
+    return units / 2
+
+
+def report(stats, total_segments, start, done):
+    while not done.wait(10):
+        elapsed = time.monotonic() - start
+        print(
+            f"  {stats.items} items, {stats.segments_done}/{total_segments} segments, "
+            f"{stats.items / elapsed:.0f} items/s, {stats.capacity / elapsed:.1f} RCU/s"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export UserSubmissions with a parallel scan")
+    parser.add_argument("--output", required=True, help="directory for segment files and checkpoints")
+    parser.add_argument("--table", default="UserSubmissions")
+    parser.add_argument("--segments", type=int, default=8, help="scan segments, each read by its own thread")
+    parser.add_argument("--page-size", type=int, default=500, help="items per Scan request")
+    parser.add_argument("--max-rcu", type=float,
+                        help="read capacity units per second for the whole export "
+                             "(default: half the provisioned read capacity, 0 = unlimited)")
+    parser.add_argument("--endpoint-url", default=os.environ.get("AWS_ENDPOINT_URL", "http://localhost:4566"))
+    args = parser.parse_args()
+
+    config = Config(max_pool_connections=max(10, args.segments))
+    client = boto3.client("dynamodb", endpoint_url=args.endpoint_url, config=config)
+    table = boto3.resource("dynamodb", endpoint_url=args.endpoint_url, config=config).Table(args.table)
+    rate = args.max_rcu if args.max_rcu is not None else default_rate(client, args.table)
+    os.makedirs(args.output, exist_ok=True)
+    print(f"Exporting {args.table} to {args.output} with {args.segments} segments"
+          f"{f', at most {rate:g} RCU/s' if rate else ''}")
+
+    limiter = CapacityLimiter(rate)
+    stats = Stats()
+    start = time.monotonic()
+    done = threading.Event()
+    reporter = threading.Thread(target=report, args=(stats, args.segments, start, done), daemon=True)
+    reporter.start()
+    try:
+        with ThreadPoolExecutor(max_workers=args.segments) as executor:
+            futures = [
+                executor.submit(export_segment, table, args.output, segment, args.segments,
+                                args.page_size, limiter, stats)
+                for segment in range(args.segments)
+            ]
+            for future in futures:
+                future.result()
+    finally:
+        done.set()
+
+    elapsed = time.monotonic() - start
+    if stats.resumed:
+        print(f"Resumed after {stats.resumed} items exported by earlier runs")
+    print(
+        f"Exported {stats.items} items ({stats.bytes / 1e6:.1f} MB compressed this run) "
+        f"in {stats.pages} pages, {elapsed:.1f}s: {stats.items / max(elapsed, 1e-9):.0f} items/s, "
+        f"{stats.capacity:.1f} RCU consumed"
+    )
+
+
+if __name__ == "__main__":
+    main()
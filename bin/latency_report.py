@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+
+"""
+Report submission latencies of a test run, from /submitquiz to score and email.
+
+Reads the stage lines that SubmitQuizFunction and ScoringFunction print (see
+quiz_common/tracing.py) from CloudWatch Logs, and the email executions of
+SendEmailStateMachine, joins them by correlation ID and prints percentiles
+and a histogram of each stage's latency. Log lines can also be read from
+files instead, e.g. the output of bin/bench_handlers.py.
+
+Usage:
+    bin/latency_report.py [--since-minutes 30] [--no-emails]
+    bin/bench_handlers.py --submissions 1000 | bin/latency_report.py --log-file - --no-emails
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import boto3
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "test")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
+
+LOG_GROUPS = [
+    "/aws/lambda/SubmitQuizFunction",
+    "/aws/lambda/ScoringFunction",
+    # with the router layout, SubmitQuizFunction's lines come from the router
+    "/aws/lambda/ApiRouterFunction",
+]
+EMAIL_STATE_MACHINE_ARN = "arn:aws:states:us-east-1:000000000000:stateMachine:SendEmailStateMachine"
+PERCENTILES = (0.5, 0.9, 0.99)
+
+
+def parse_stage(line):
+    start = line.find('{"Stage"')
+    if start < 0:
+        return None
+    try:
+        return json.loads(line[start:])
+    except ValueError:
+        return None
+
+
+def stages_from_files(paths):
+    for path in paths:
+        with (sys.stdin if path == "-" else open(path)) as lines:
+            for line in lines:
+                stage = parse_stage(line)
+                if stage:
+                    yield stage
+
+
+def stages_from_logs(logs, since_ms):
+    for group in LOG_GROUPS:
+        kwargs = {"logGroupName": group, "startTime": since_ms, "filterPattern": '"Stage"'}
+        try:
+            for page in logs.get_paginator("filter_log_events").paginate(**kwargs):
+                for event in page["events"]:
+                    stage = parse_stage(event["message"])
+                    if stage:
+                        yield stage
+        except logs.exceptions.ResourceNotFoundException:
+            continue
+
+
+def stages_from_emails(stepfunctions, since_ms):
+    """One 'emailed' stage per execution that sent an email, timed when SendEmail finished."""
+    paginator = stepfunctions.get_paginator("list_executions")
+    for page in paginator.paginate(stateMachineArn=EMAIL_STATE_MACHINE_ARN, statusFilter="SUCCEEDED"):
+        for execution in page["executions"]:
+            if execution["startDate"].timestamp() * 1000 < since_ms:
+                continue
+            description = stepfunctions.describe_execution(executionArn=execution["executionArn"])
+            payload = json.loads(description.get("input") or "{}")
+            if not payload.get("CorrelationId"):
+                continue
+            history = stepfunctions.get_execution_history(executionArn=execution["executionArn"])
+            for event in history["events"]:
+                details = event.get("stateExitedEventDetails") or {}
+                if details.get("name") == "SendEmail":
+                    yield {
+                        "Stage": "emailed",
+                        "CorrelationId": payload["CorrelationId"],
+                        "SubmissionID": payload.get("SubmissionID"),
+                        "At": int(event["timestamp"].timestamp() * 1000),
+                        "ScoredAt": payload.get("ScoredAt"),
+                    }
+                    break
+
+
+def join(stages):
+    """CorrelationId -> {stage name: stage}."""
+    submissions = {}
+    for stage in stages:
+        if stage.get("CorrelationId"):
+            submissions.setdefault(stage["CorrelationId"], {})[stage["Stage"]] = stage
+    return submissions
+
+
+def latencies(submissions):
+    series = {
+        "received -> enqueued": [],
+        "enqueued -> scored": [],
+        "  of which queue wait": [],
+        "scored -> emailed": [],
+        "received -> emailed": [],
+    }
+    for stages in submissions.values():
+        enqueued, scored, emailed = stages.get("enqueued"), stages.get("scored"), stages.get("emailed")
+        if enqueued and "ReceivedAt" in enqueued:
+            series["received -> enqueued"].append(enqueued["At"] - enqueued["ReceivedAt"])
+        if scored and "EnqueuedAt" in scored:
+            series["enqueued -> scored"].append(scored["At"] - scored["EnqueuedAt"])
+            if "ReceivedAt" in scored:
+                series["  of which queue wait"].append(scored["ReceivedAt"] - scored["EnqueuedAt"])
+        if scored and emailed:
+            series["scored -> emailed"].append(emailed["At"] - scored["At"])
+        if enqueued and emailed and "ReceivedAt" in enqueued:
+            series["received -> emailed"].append(emailed["At"] - enqueued["ReceivedAt"])
+    return series
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def histogram(values, width=40):
+    """Buckets doubling in size from 1 ms, as (upper bound, count) pairs."""
+    buckets = {}
+    for value in values:
+        bound = 1
+        while bound < value:
+            bound *= 2
+        buckets[bound] = buckets.get(bound, 0) + 1
+    peak = max(buckets.values())
+    return [(bound, count, "#" * max(1, round(width * count / peak))) for bound, count in sorted(buckets.items())]
+
+
+def report(submissions, show_histograms):
+    incomplete = sum(1 for stages in submissions.values() if "enqueued" in stages and "scored" not in stages)
+    inline = sum(1 for stages in submissions.values() if stages.get("scored", {}).get("Inline"))
+    print(f"{len(submissions)} submissions traced, {inline} scored inline, {incomplete} enqueued but not scored")
+    for name, values in latencies(submissions).items():
+        if not values:
+            continue
+        values.sort()
+        quantiles = ", ".join(f"p{round(q * 100)} {percentile(values, q)} ms" for q in PERCENTILES)
+        print(f"{name:>22}: n={len(values)}, {quantiles}, max {values[-1]} ms")
+        if show_histograms:
+            for bound, count, bar in histogram(values):
+                print(f"{'<= ' + str(bound) + ' ms':>32} {count:>7} {bar}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report submission latencies from the logs of a test run")
+    parser.add_argument("--log-file", action="append",
+                        help="read stage lines from this file ('-' for stdin) instead of CloudWatch Logs")
+    parser.add_argument("--since-minutes", type=float, default=30)
+    parser.add_argument("--no-emails", action="store_true", help="skip the Step Functions executions")
+    parser.add_argument("--no-histograms", action="store_true")
+    parser.add_argument("--endpoint-url", default=os.environ.get("AWS_ENDPOINT_URL", "http://localhost:4566"))
+    args = parser.parse_args()
+
+    since_ms = int((time.time() - args.since_minutes * 60) * 1000)
+    stages = []
+    if args.log_file:
+        stages.extend(stages_from_files(args.log_file))
+    else:
+        stages.extend(stages_from_logs(boto3.client("logs", endpoint_url=args.endpoint_url), since_ms))
+    if not args.no_emails:
+        stepfunctions = boto3.client("stepfunctions", endpoint_url=args.endpoint_url)
+        stages.extend(stages_from_emails(stepfunctions, since_ms))
+    report(join(stages), not args.no_histograms)
+
+
+if __name__ == "__main__":
+    main()
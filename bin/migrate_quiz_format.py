@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+
+"""
+Rewrite the stored quizzes in another storage format (see quiz_common/quizzes.py).
+
+Scans the Quizzes and QuizVersions tables and rewrites every item whose
+Questions are not yet in the requested format, adding the public /getquiz
+body to items stored without one. The functions read both formats, so the
+migration can run while the app is serving; deploy with the same
+QUIZ_STORAGE_FORMAT first so that new quizzes are written in it too. A quiz
+updated during the scan is left to the update, which writes it in the
+deployed format.
+
+Usage:
+    bin/migrate_quiz_format.py --format compressed [--dry-run]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import boto3
+from botocore.exceptions import ClientError
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lambdas", "common", "python"))
+
+from quiz_common.quizzes import PUBLIC_BODY, STORAGE_FORMATS, stored_quiz, with_public_body  # noqa: E402
+from quiz_common.storage.dynamodb import QUIZ_VERSIONS_TABLE, QUIZZES_TABLE  # noqa: E402
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "test")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
+
+
+def scan(table):
+    kwargs = {}
+    while True:
+        response = table.scan(**kwargs)
+        yield from response["Items"]
+        if "LastEvaluatedKey" not in response:
+            return
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def in_format(item, storage_format):
+    return PUBLIC_BODY in item and isinstance(item["Questions"], list) == (storage_format == "map")
+
+
+def put_unchanged(table, item, original):
+    """Write `item` unless the quiz was updated since `original` was read."""
+    if "Version" in original:
+        condition = {
+            "ConditionExpression": "#version = :version",
+            "ExpressionAttributeNames": {"#version": "Version"},
+            "ExpressionAttributeValues": {":version": original["Version"]},
+        }
+    else:
+        condition = {
+            "ConditionExpression": "attribute_not_exists(#version)",
+            "ExpressionAttributeNames": {"#version": "Version"},
+        }
+    try:
+        table.put_item(Item=item, **condition)
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        return False
+    return True
+
+
+def migrate(table, storage_format, dry_run, versioned):
+    scanned = rewritten = skipped = 0
+    for original in scan(table):
+        scanned += 1
+        if in_format(original, storage_format):
+            continue
+        item = stored_quiz(original if PUBLIC_BODY in original else with_public_body(dict(original)), storage_format)
+        if dry_run:
+            rewritten += 1
+        # versions are never modified once written
+        elif versioned:
+            table.put_item(Item=item)
+            rewritten += 1
+        elif put_unchanged(table, item, original):
+            rewritten += 1
+        else:
+            skipped += 1
+    return scanned, rewritten, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rewrite the stored quizzes in another storage format")
+    parser.add_argument("--format", choices=STORAGE_FORMATS, required=True)
+    parser.add_argument("--dry-run", action="store_true", help="only count the items that would be rewritten")
+    parser.add_argument("--endpoint-url", default=os.environ.get("AWS_ENDPOINT_URL", "http://localhost:4566"))
+    args = parser.parse_args()
+
+    dynamodb = boto3.resource("dynamodb", endpoint_url=args.endpoint_url)
+    for table_name, versioned in ((QUIZZES_TABLE, False), (QUIZ_VERSIONS_TABLE, True)):
+        start = time.monotonic()
+        scanned, rewritten, skipped = migrate(dynamodb.Table(table_name), args.format, args.dry_run, versioned)
+        print(
+            f"{table_name}: {scanned} items scanned, {rewritten} {'to rewrite' if args.dry_run else 'rewritten'}, "
+            f"{skipped} updated concurrently in {time.monotonic() - start:.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
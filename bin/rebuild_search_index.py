@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+
+"""
+Rebuild the quiz search index from a scan of the Quizzes table.
+
+IndexQuizzesFunction keeps the index up to date from the Quizzes stream, but
+only with the quizzes written since the stream was enabled. This tool indexes
+every public quiz, for the first deployment or after changing whether
+question texts are indexed. The index is only replaced if it was not updated
+during the scan; otherwise the scan is repeated.
+
+Usage:
+    bin/rebuild_search_index.py [--questions] [--bucket quiz-app-search-index] [--dry-run]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import boto3
+from boto3.dynamodb.conditions import Attr
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lambdas", "common", "python"))
+
+from quiz_common.search import SearchIndex  # noqa: E402
+from quiz_common.storage.dynamodb import SEARCH_INDEX_BUCKET, SEARCH_INDEX_KEY, S3SearchIndexStore  # noqa: E402
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "test")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
+
+MAX_ATTEMPTS = 3
+
+
+def public_quizzes(table, include_questions):
+    attributes = ["QuizID", "Title", "Visibility"] + (["Questions"] if include_questions else [])
+    kwargs = {
+        "ProjectionExpression": ", ".join(f"#{idx}" for idx in range(len(attributes))),
+        "ExpressionAttributeNames": {f"#{idx}": name for idx, name in enumerate(attributes)},
+        "FilterExpression": Attr("Visibility").eq("Public"),
+    }
+    while True:
+        response = table.scan(**kwargs)
+        yield from response["Items"]
+        if "LastEvaluatedKey" not in response:
+            return
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def build_index(table, include_questions):
+    index = SearchIndex()
+    # quizzes carry no creation time, so a rebuilt index ranks them in scan order until they change
+    for quiz in public_quizzes(table, include_questions):
+        index.add(quiz, include_questions=include_questions)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the quiz search index")
+    parser.add_argument("--questions", action="store_true", help="index question texts as well as titles")
+    parser.add_argument("--table", default="Quizzes")
+    parser.add_argument("--bucket", default=SEARCH_INDEX_BUCKET)
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--endpoint-url", default=os.environ.get("AWS_ENDPOINT_URL", "http://localhost:4566"))
+    args = parser.parse_args()
+
+    table = boto3.resource("dynamodb", endpoint_url=args.endpoint_url).Table(args.table)
+    store = S3SearchIndexStore(boto3.client("s3", endpoint_url=args.endpoint_url), args.bucket)
+
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        version = store.get_index_version()
+        start = time.monotonic()
+        index = build_index(table, args.questions)
+        blob = index.to_blob()
+        print(f"Indexed {len(index)} public quizzes in {time.monotonic() - start:.1f}s, "
+              f"index is {len(blob) / 1024:.0f} KiB")
+        if args.dry_run:
+            return
+        if store.put_index(blob, version):
+            print(f"Wrote s3://{args.bucket}/{SEARCH_INDEX_KEY}")
+            return
+        print(f"The index was updated during the scan, scanning again (attempt {attempt})")
+    sys.exit(f"The index kept changing during {MAX_ATTEMPTS} scans, giving up")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+
+"""
+Replay submissions stranded in the QuizSubmissionDLQ back into QuizSubmissionQueue.
+
+Several receivers long-poll the DLQ in parallel and re-enqueue messages with
+SendMessageBatch, throttled to a configurable rate. A message is deleted from
+the DLQ only after it has been accepted by the target queue. Messages that are
+filtered out (or all messages in dry-run mode) stay invisible until the run is
+over, so no receiver sees them twice, and are then released back to the DLQ.
+
+Usage:
+    bin/redrive_dlq.py [--quiz-id QUIZ_ID ...] [--rate 200] [--receivers 8] [--dry-run]
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "test")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
+
+# SendMessageBatch and DeleteMessageBatch take at most 10 entries
+MAX_BATCH = 10
+
+
+class RateLimiter:
+    """Token bucket shared by all receivers, refilled at `rate` messages per second.
+
+    It holds at least a whole batch, so that batches can be taken at rates
+    below the batch size.
+    """
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.capacity = max(rate, MAX_BATCH)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, count):
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= count:
+                    self.tokens -= count
+                    return
+                wait = (count - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.received = 0
+        self.redriven = 0
+        self.would_redrive = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def add(self, **counts):
+        with self.lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+
+def resolve_queue_url(sqs, queue):
+    if queue.startswith("http"):
+        return queue
+    try:
+        return sqs.get_queue_url(QueueName=queue)["QueueUrl"]
+    except sqs.exceptions.QueueDoesNotExist:
+        # queues created by CDK get a generated name containing the construct id
+        for queue_url in sqs.list_queues().get("QueueUrls", []):
+            if queue in queue_url.rsplit("/", 1)[-1]:
+                return queue_url
+        raise
+
+
+def message_quiz_id(message):
+    try:
+        return json.loads(message["Body"]).get("QuizID")
+    except (ValueError, AttributeError):
+        return None
+
+
+def redrive_batch(sqs, source_url, target_url, messages, limiter, stats):
+    limiter.acquire(len(messages))
+    entries = []
+    for index, message in enumerate(messages):
+        entry = {"Id": str(index), "MessageBody": message["Body"]}
+        if message.get("MessageAttributes"):
+            entry["MessageAttributes"] = message["MessageAttributes"]
+        entries.append(entry)
+
+    response = sqs.send_message_batch(QueueUrl=target_url, Entries=entries)
+    successful = [messages[int(entry["Id"])] for entry in response.get("Successful", [])]
+    for failure in response.get("Failed", []):
+        print(f"Failed to re-send {messages[int(failure['Id'])]['MessageId']}: {failure.get('Message')}")
+
+    failed = len(response.get("Failed", []))
+    redriven = len(successful)
+    if successful:
+        response = sqs.delete_message_batch(
+            QueueUrl=source_url,
+            Entries=[
+                {"Id": str(index), "ReceiptHandle": message["ReceiptHandle"]}
+                for index, message in enumerate(successful)
+            ],
+        )
+        # these reappear in the DLQ after the visibility timeout and would be replayed again
+        for failure in response.get("Failed", []):
+            print(
+                f"Re-sent {successful[int(failure['Id'])]['MessageId']} but failed to delete it from the DLQ, "
+                f"remove it before the next run: {failure.get('Message')}"
+            )
+        failed += len(response.get("Failed", []))
+        redriven -= len(response.get("Failed", []))
+    stats.add(redriven=redriven, failed=failed)
+
+
+def receiver(sqs, source_url, target_url, args, limiter, stats, held, held_lock):
+    empty_polls = 0
+    while empty_polls < args.empty_polls:
+        if args.max_messages and stats.received >= args.max_messages:
+            return
+        response = sqs.receive_message(
+            QueueUrl=source_url,
+            MaxNumberOfMessages=MAX_BATCH,
+            WaitTimeSeconds=20,
+            VisibilityTimeout=args.visibility_timeout,
+            MessageAttributeNames=["All"],
+        )
+        messages = response.get("Messages", [])
+        if not messages:
+            empty_polls += 1
+            continue
+        empty_polls = 0
+        stats.add(received=len(messages))
+
+        selected = []
+        for message in messages:
+            if args.quiz_id and message_quiz_id(message) not in args.quiz_id:
+                stats.add(skipped=1)
+                with held_lock:
+                    held.append(message)
+            elif args.dry_run:
+                print(f"[dry-run] would redrive {message['MessageId']}: {message['Body'][:200]}")
+                stats.add(would_redrive=1)
+                with held_lock:
+                    held.append(message)
+            else:
+                selected.append(message)
+
+        if selected:
+            redrive_batch(sqs, source_url, target_url, selected, limiter, stats)
+
+
+def release(sqs, source_url, messages):
+    """Make held messages visible in the DLQ again."""
+    for start in range(0, len(messages), MAX_BATCH):
+        chunk = messages[start:start + MAX_BATCH]
+        sqs.change_message_visibility_batch(
+            QueueUrl=source_url,
+            Entries=[
+                {"Id": str(index), "ReceiptHandle": message["ReceiptHandle"], "VisibilityTimeout": 0}
+                for index, message in enumerate(chunk)
+            ],
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Redrive QuizSubmissionDLQ messages into QuizSubmissionQueue")
+    parser.add_argument("--source-queue", default="QuizSubmissionDLQ", help="DLQ name or URL")
+    parser.add_argument("--target-queue", default="QuizSubmissionQueue", help="target queue name or URL")
+    parser.add_argument("--quiz-id", action="append", help="only redrive submissions for this QuizID (repeatable)")
+    parser.add_argument("--rate", type=float, default=100, help="maximum messages re-enqueued per second (0 = unlimited)")
+    parser.add_argument("--receivers", type=int, default=4, help="number of parallel long-polling receivers")
+    parser.add_argument("--max-messages", type=int, default=0, help="stop after receiving this many messages (0 = drain)")
+    parser.add_argument("--empty-polls", type=int, default=1, help="consecutive empty long polls before a receiver stops")
+    parser.add_argument("--visibility-timeout", type=int, default=900,
+                        help="seconds a received message stays hidden; must outlast the run")
+    parser.add_argument("--dry-run", action="store_true", help="report what would be redriven without changing anything")
+    parser.add_argument("--endpoint-url", default=os.environ.get("AWS_ENDPOINT_URL", "http://localhost:4566"))
+    args = parser.parse_args()
+
+    sqs = boto3.client(
+        "sqs",
+        endpoint_url=args.endpoint_url,
+        config=Config(max_pool_connections=max(10, args.receivers * 2)),
+    )
+    source_url = resolve_queue_url(sqs, args.source_queue)
+    target_url = resolve_queue_url(sqs, args.target_queue)
+    print(f"Redriving {source_url} -> {target_url}{' (dry run)' if args.dry_run else ''}")
+
+    limiter = RateLimiter(args.rate)
+    stats = Stats()
+    held = []
+    held_lock = threading.Lock()
+    start = time.monotonic()
+    try:
+        with ThreadPoolExecutor(max_workers=args.receivers) as executor:
+            futures = [
+                executor.submit(receiver, sqs, source_url, target_url, args, limiter, stats, held, held_lock)
+                for _ in range(args.receivers)
+            ]
+            for future in futures:
+                future.result()
+    finally:
+        release(sqs, source_url, held)
+
+    elapsed = time.monotonic() - start
+    if args.dry_run:
+        print(f"Received {stats.received}, would redrive {stats.would_redrive}, skipped {stats.skipped} "
+              f"in {elapsed:.1f}s")
+    else:
+        print(
+            f"Received {stats.received}, redriven {stats.redriven}, skipped {stats.skipped}, "
+            f"failed {stats.failed} in {elapsed:.1f}s ({stats.redriven / max(elapsed, 1e-9):.1f} msg/s)"
+        )
+    if stats.failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+"""
+Restore a quiz's archived submissions into the UserSubmissions table.
+
+Submissions removed by the table's TTL are archived as gzip JSON Lines files
+per quiz and day (see lambdas/archive_submissions). This tool reads a quiz's
+files back, optionally limited to a range of days, and writes the submissions
+to the table again. Restored items are flagged `Rehydrated` so that they are
+not archived a second time when they expire again.
+
+Usage:
+    bin/rehydrate_submissions.py --quiz-id QUIZ_ID [--from-date 2026-01-01] [--to-date 2026-01-31]
+        [--archive s3://quiz-app-submissions-archive | --archive ./archive] [--retention-hours 24] [--dry-run]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+import boto3
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lambdas", "common", "python"))
+
+from quiz_common.archive import decode_items, open_archive, quiz_prefix  # noqa: E402
+from quiz_common.leaderboard import score_rank  # noqa: E402
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "test")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
+
+DATE_PATTERN = re.compile(r"/date=([^/]+)/")
+
+
+def archived_files(archive, quiz_id, from_date, to_date):
+    for key in archive.list(quiz_prefix(quiz_id)):
+        match = DATE_PATTERN.search(key)
+        day = match.group(1) if match else "undated"
+        # undated files cannot be placed in a range, so they are only restored without one
+        if from_date and (day == "undated" or day < from_date):
+            continue
+        if to_date and (day == "undated" or day > to_date):
+            continue
+        yield key
+
+
+def rehydrate(archive, table, quiz_id, from_date, to_date, retention_hours, dry_run):
+    expires_at = int(time.time()) + int(retention_hours * 3600) if retention_hours else None
+    files = restored = 0
+    start = time.monotonic()
+    # overwrite_by_pkeys drops duplicates within a batch, e.g. a submission archived twice
+    with table.batch_writer(overwrite_by_pkeys=["SubmissionID"]) as batch:
+        for key in archived_files(archive, quiz_id, from_date, to_date):
+            files += 1
+            for item in decode_items(archive.get(key)):
+                item["Rehydrated"] = True
+                # submissions archived before the leaderboard was sorted by ScoreRank
+                if "Score" in item and "ScoreRank" not in item:
+                    item["ScoreRank"] = score_rank(item["Score"], item["SubmissionID"])
+                item.pop("ExpiresAt", None)
+                if expires_at:
+                    item["ExpiresAt"] = expires_at
+                restored += 1
+                if not dry_run:
+                    batch.put_item(Item=item)
+    elapsed = time.monotonic() - start
+    action = "Would restore" if dry_run else "Restored"
+    print(f"{action} {restored} submissions of {quiz_id} from {files} files in {elapsed:.1f}s")
+    return restored
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Restore archived submissions of a quiz")
+    parser.add_argument("--quiz-id", required=True)
+    parser.add_argument("--from-date", help="first day to restore (YYYY-MM-DD)")
+    parser.add_argument("--to-date", help="last day to restore (YYYY-MM-DD)")
+    parser.add_argument("--archive", default=os.environ.get("ARCHIVE_TARGET", "s3://quiz-app-submissions-archive"),
+                        help="s3://bucket[/prefix] or a local directory")
+    parser.add_argument("--retention-hours", type=float, default=24,
+                        help="expire restored submissions again after this many hours (0 keeps them)")
+    parser.add_argument("--table", default="UserSubmissions")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--endpoint-url", default=os.environ.get("AWS_ENDPOINT_URL", "http://localhost:4566"))
+    args = parser.parse_args()
+
+    archive = open_archive(args.archive, boto3.client("s3", endpoint_url=args.endpoint_url))
+    table = boto3.resource("dynamodb", endpoint_url=args.endpoint_url).Table(args.table)
+    rehydrate(archive, table, args.quiz_id, args.from_date, args.to_date, args.retention_hours, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
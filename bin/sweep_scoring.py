@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+
+"""
+Sweep the scoring event source settings against a synthetic submission stream.
+
+For every combination of batch size, batching window and maximum concurrency,
+a producer enqueues submissions at a fixed rate into a local stand-in for
+QuizSubmissionQueue, and pollers hand batches to in-process copies of the
+scoring handler like the SQS event source mapping does: a batch is sent once
+it is full or the batching window has passed, and at most `concurrency`
+batches are scored at the same time. Each poller loads its own copy of the
+handler, so answer key caches are per container as in Lambda. Within a batch
+the handler scores up to --record-concurrency records at the same time.
+
+Storage runs in memory; every storage call is counted and delayed by
+--call-latency-ms to stand in for the DynamoDB (and Step Functions) round
+trip, and every invocation by --invoke-overhead-ms. The report lists
+throughput, enqueue-to-scored latency and storage calls per message, and
+suggests the settings for `bin/deploy_cdk.sh` / `bin/deploy.sh`.
+
+Usage:
+    bin/sweep_scoring.py [--submissions 2000] [--rate 400] [--batch-sizes 1,10,50]
+        [--windows 0,1] [--concurrency 2,5,20] [--record-concurrency 10]
+        [--call-latency-ms 5] [--invoke-overhead-ms 15]
+"""
+
+import argparse
+import collections
+import contextlib
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+LAMBDAS_ROOT = os.path.join(ROOT, "lambdas")
+sys.path.insert(0, os.path.join(LAMBDAS_ROOT, "common", "python"))
+
+from quiz_common.handlers import import_handler  # noqa: E402
+from quiz_common.storage import Storage, create_storage, set_storage  # noqa: E402
+from quiz_common.tracing import sqs_record  # noqa: E402
+
+# the SQS event source rejects larger batches without a batching window of at least a second
+MAX_BATCH_WITHOUT_WINDOW = 10
+
+
+class CountingStore:
+    """Forwards to a store, counting and delaying each call like a network round trip."""
+
+    def __init__(self, name, store, calls, latency):
+        self._name = name
+        self._store = store
+        self._calls = calls
+        self._latency = latency
+
+    def __getattr__(self, attribute):
+        method = getattr(self._store, attribute)
+        if not callable(method):
+            return method
+        key = f"{self._name}.{attribute}"
+
+        def call(*args, **kwargs):
+            self._calls[key] += 1
+            if self._latency:
+                time.sleep(self._latency)
+            return method(*args, **kwargs)
+        return call
+
+
+class SubmissionQueue:
+    """Messages with the time they were enqueued; pollers wait on the condition."""
+
+    def __init__(self):
+        self.messages = collections.deque()
+        self.condition = threading.Condition()
+        self.closed = False
+        self.max_backlog = 0
+
+    def put(self, message):
+        with self.condition:
+            self.messages.append((time.monotonic(), message))
+            self.max_backlog = max(self.max_backlog, len(self.messages))
+            self.condition.notify()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def take(self, batch_size, window):
+        """Block until a batch is full or `window` seconds passed since a message was available."""
+        with self.condition:
+            while not self.messages and not self.closed:
+                self.condition.wait()
+            deadline = time.monotonic() + window
+            while len(self.messages) < batch_size and not self.closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            return [self.messages.popleft() for _ in range(min(batch_size, len(self.messages)))]
+
+
+def synthetic_quiz(quiz_id, questions):
+    return {
+        "QuizID": quiz_id,
+        "Title": f"Sweep {quiz_id}",
+        "Visibility": "Public",
+        "Version": 1,
+        "QuestionCount": questions,
+        "EnableTimer": True,
+        "TimerSeconds": 10,
+        "Questions": [
+            {"QuestionText": f"Question {idx}", "Options": ["A. 1", "B. 2"], "CorrectAnswer": "A. 1"}
+            for idx in range(questions)
+        ],
+    }
+
+
+def synthetic_submissions(count, quiz_ids, questions, email_share, rng):
+    for idx in range(count):
+        message = {
+            "SubmissionID": f"sweep-{idx}",
+            "Username": f"player{idx}",
+            "QuizID": rng.choice(quiz_ids),
+            "Version": 1,
+            "SubmittedAt": "2026-01-01T12:00:00.000+00:00",
+            "Answers": {
+                str(question): {"Answer": rng.choice(["A. 1", "B. 2"]), "TimeTaken": rng.randint(0, 10)}
+                for question in range(questions)
+            },
+        }
+        if rng.random() < email_share:
+            message["Email"] = f"player{idx}@example.com"
+        yield message
+
+
+def run(config, args):
+    batch_size, window, concurrency = config
+    memory = create_storage("memory")
+    quiz_ids = [f"sweep-quiz-{idx}" for idx in range(args.quizzes)]
+    for quiz_id in quiz_ids:
+        memory.quizzes.put_quiz(synthetic_quiz(quiz_id, args.questions))
+
+    calls = collections.Counter()
+    latency = args.call_latency_ms / 1000
+    scored_at = {}
+    submissions = CountingStore("submissions", memory.submissions, calls, latency)
+    put_submission = submissions.put_submission_if_absent
+
+    def put_submission_if_absent(item):
+        is_new = put_submission(item)
+        scored_at[item["SubmissionID"]] = time.monotonic()
+        return is_new
+    submissions.put_submission_if_absent = put_submission_if_absent
+
+    storage = Storage(
+        quizzes=CountingStore("quizzes", memory.quizzes, calls, latency),
+        submissions=submissions,
+        leaderboard=memory.leaderboard,
+        snapshots=memory.snapshots,
+        publisher=CountingStore("publisher", memory.publisher, calls, latency),
+        search_index=memory.search_index,
+        tournaments=memory.tournaments,
+    )
+    # handlers bind the process-wide storage at import time
+    set_storage(storage)
+    handlers = [import_handler(LAMBDAS_ROOT, "scoring").lambda_handler for _ in range(concurrency)]
+
+    queue = SubmissionQueue()
+    enqueued_at = {}
+    invocations = []
+
+    def poll(handler):
+        while True:
+            batch = queue.take(batch_size, window)
+            if not batch:
+                return
+            for at, message in batch:
+                enqueued_at[message["SubmissionID"]] = at
+            time.sleep(args.invoke_overhead_ms / 1000)
+            handler({"Records": [sqs_record(message) for _, message in batch]}, None)
+            invocations.append(len(batch))
+
+    rng = random.Random(args.seed)
+    messages = list(synthetic_submissions(args.submissions, quiz_ids, args.questions, args.email_share, rng))
+    pollers = [threading.Thread(target=poll, args=(handler,)) for handler in handlers]
+    start = time.monotonic()
+    # scoring prints a line per submission
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for poller in pollers:
+            poller.start()
+        for idx, message in enumerate(messages):
+            delay = start + idx / args.rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            queue.put(message)
+        queue.close()
+        for poller in pollers:
+            poller.join()
+    elapsed = max(scored_at.values()) - start
+
+    latencies = sorted(scored_at[sid] - enqueued_at[sid] for sid in scored_at)
+    storage_calls = sum(count for key, count in calls.items() if not key.startswith("publisher."))
+    set_storage(None)
+    return {
+        "config": config,
+        "throughput": len(scored_at) / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))],
+        "invocations": len(invocations),
+        "mean_batch": statistics.mean(invocations),
+        "calls_per_message": storage_calls / len(scored_at),
+        "max_backlog": queue.max_backlog,
+        "calls": calls,
+    }
+
+
+def parse_list(value, kind):
+    return [kind(item) for item in value.split(",") if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep the scoring event source settings")
+    parser.add_argument("--submissions", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=400, help="submissions enqueued per second")
+    parser.add_argument("--batch-sizes", default="1,10,50")
+    parser.add_argument("--windows", default="0,1", help="batching windows in whole seconds")
+    parser.add_argument("--concurrency", default="2,5,20", help="maximum concurrent batches (at least 2)")
+    parser.add_argument("--record-concurrency", type=int, default=10, help="records of a batch scored at the same time")
+    parser.add_argument("--call-latency-ms", type=float, default=5)
+    parser.add_argument("--invoke-overhead-ms", type=float, default=15)
+    parser.add_argument("--quizzes", type=int, default=5)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--email-share", type=float, default=0.2, help="share of submissions with an email")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    # read by the scoring handlers when they are loaded
+    os.environ["SCORING_RECORD_CONCURRENCY"] = str(args.record_concurrency)
+
+    configs = [
+        (batch_size, window, concurrency)
+        for batch_size in parse_list(args.batch_sizes, int)
+        for window in parse_list(args.windows, int)
+        for concurrency in parse_list(args.concurrency, int)
+        if batch_size <= MAX_BATCH_WITHOUT_WINDOW or window >= 1
+    ]
+    print(f"{args.submissions} submissions at {args.rate:.0f}/s, {args.call_latency_ms} ms per storage call, "
+          f"{args.invoke_overhead_ms} ms per invocation, {args.record_concurrency} records scored at a time")
+    print(f"{'batch':>5} {'window':>6} {'conc':>4} {'msg/s':>7} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'invokes':>7} {'avg batch':>9} {'calls/msg':>9} {'backlog':>7}")
+    results = []
+    for config in configs:
+        result = run(config, args)
+        results.append(result)
+        print(f"{config[0]:>5} {config[1]:>6} {config[2]:>4} {result['throughput']:>7.0f} "
+              f"{result['p50'] * 1000:>8.0f} {result['p99'] * 1000:>8.0f} {result['invocations']:>7} "
+              f"{result['mean_batch']:>9.1f} {result['calls_per_message']:>9.2f} {result['max_backlog']:>7}")
+
+    # the lowest p99 among the settings that keep up with the offered rate, with the fewest invocations
+    keeping_up = [result for result in results if result["throughput"] >= 0.95 * args.rate] or results
+    best = min(keeping_up, key=lambda result: (round(result["p99"], 2), result["invocations"]))
+    batch_size, window, concurrency = best["config"]
+    print("storage calls of the suggested settings: "
+          + ", ".join(f"{key} {count}" for key, count in sorted(best["calls"].items())))
+    print(f"suggested: SCORING_BATCH_SIZE={batch_size} SCORING_BATCHING_WINDOW={window} "
+          f"SCORING_MAX_CONCURRENCY={concurrency} SCORING_RECORD_CONCURRENCY={args.record_concurrency}")
+
+
+if __name__ == "__main__":
+    main()
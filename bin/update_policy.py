@@ -5,96 +5,169 @@ Simple script that allows enabling/disabling access from the sample app's Lambda
 functions to the DynamoDB tables, by removing/adding permissions from/to the role
 policy that manages access.
 This can be handy to showcase IAM enforcement in LocalStack (IAM soft mode and hard mode).
+
+All roles of the account are listed page by page, and the roles of the stack are
+updated concurrently. Policies that already have the requested access are left
+untouched.
+
+Usage:
+    bin/update_policy.py disable
+    bin/update_policy.py enable --concurrency 20
 """
 
+import argparse
 import json
 import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import boto3
+from botocore.config import Config
 
 os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
 os.environ.setdefault("AWS_ACCESS_KEY_ID", "test")
 os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
-iam_client = boto3.client("iam", endpoint_url="http://localhost:4566")
-
-
-def update_role_policy(allow: bool):
-    roles = iam_client.list_roles()
-    for role in roles["Roles"]:
-        in_scope = (
-            "QuizAppStack-ScoringFunctionLambdaFun" in role["RoleName"]
-            or "QuizAppStack-ListPublicQuizzes" in role["RoleName"]
-            or "QuizAppStack-" in role["RoleName"]
-        )
-        if not in_scope:
-            continue
-
-        # list policies for this role
-        response = iam_client.list_role_policies(RoleName=role["RoleName"])
-        for policy_name in response["PolicyNames"]:
-            response = iam_client.get_role_policy(
-                RoleName=role["RoleName"], PolicyName=policy_name
-            )
-            # get the policy document
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambdas", "common", "python"))
+
+from quiz_common.storage.dynamodb import QUIZZES_TABLE, TABLES  # noqa: E402
+
+TABLE_ARN_PREFIX = "arn:aws:dynamodb:us-east-1:000000000000:table/"
+
+# roles created by the QuizAppStack
+ROLE_NAME_MARKER = "QuizAppStack-"
+
+DYNAMODB_ACCESS_STATEMENT = {
+    "Action": [
+        "dynamodb:BatchGetItem",
+        "dynamodb:BatchWriteItem",
+        "dynamodb:ConditionCheckItem",
+        "dynamodb:DeleteItem",
+        "dynamodb:DescribeTable",
+        "dynamodb:GetItem",
+        "dynamodb:GetRecords",
+        "dynamodb:GetShardIterator",
+        "dynamodb:PutItem",
+        "dynamodb:Query",
+        "dynamodb:Scan",
+        "dynamodb:UpdateItem",
+    ],
+    "Effect": "Allow",
+    # every table of the storage layer, with its indexes
+    "Resource": [
+        arn
+        for table in TABLES
+        for arn in (TABLE_ARN_PREFIX + table, f"{TABLE_ARN_PREFIX}{table}/index/*")
+    ],
+}
+
+# hack/workaround: statement cannot be fully empty, so we're adding a single dummy entry
+PLACEHOLDER_STATEMENT = {
+    "Action": ["dynamodb:ConditionCheckItem"],
+    "Effect": "Allow",
+    "Resource": [
+        TABLE_ARN_PREFIX + QUIZZES_TABLE
+    ],
+}
+
+# statement elements that IAM accepts either as a single string or as a list
+LIST_ELEMENTS = ("Action", "NotAction", "Resource", "NotResource")
+
+
+def normalized(policy_doc):
+    """`policy_doc` with single values wrapped in lists, and lists and statements sorted."""
+    statements = policy_doc.get("Statement", [])
+    if isinstance(statements, dict):
+        statements = [statements]
+    statements = [
+        {
+            key: sorted([value] if isinstance(value, str) else value) if key in LIST_ELEMENTS else value
+            for key, value in stmt.items()
+        }
+        for stmt in statements
+    ]
+    return {**policy_doc, "Statement": sorted(statements, key=lambda stmt: json.dumps(stmt, sort_keys=True))}
+
+
+def updated_policy(policy_doc, allow):
+    # remove all policies that contain a statement with "dynamodb:GetItem"
+    statements = [
+        stmt
+        for stmt in normalized(policy_doc)["Statement"]
+        if "dynamodb:GetItem" not in stmt.get("Action", [])
+    ]
+    if allow:
+        # if we're in `allow` mode, add a statement with the required actions back to the policy
+        statements.append(DYNAMODB_ACCESS_STATEMENT)
+    if not statements:
+        statements.append(PLACEHOLDER_STATEMENT)
+    return {**policy_doc, "Statement": statements}
+
+
+def list_stack_roles(iam_client):
+    paginator = iam_client.get_paginator("list_roles")
+    return [
+        role["RoleName"]
+        for page in paginator.paginate()
+        for role in page["Roles"]
+        if ROLE_NAME_MARKER in role["RoleName"]
+    ]
+
+
+def update_role(iam_client, role_name, allow):
+    """Update the inline policies of a role; returns (policies, updated)."""
+    policies = updated = 0
+    paginator = iam_client.get_paginator("list_role_policies")
+    for page in paginator.paginate(RoleName=role_name):
+        for policy_name in page["PolicyNames"]:
+            policies += 1
+            response = iam_client.get_role_policy(RoleName=role_name, PolicyName=policy_name)
             policy_doc = response["PolicyDocument"]
-            # remove all policies that contain a statement with "dynamodb:GetItem"
-            policy_doc["Statement"] = [
-                stmt
-                for stmt in policy_doc["Statement"]
-                if "dynamodb:GetItem" not in stmt["Action"]
-            ]
-            if allow:
-                # if we're in `allow` mode, add a statement with the required actions back to the policy
-                policy_doc["Statement"].append(
-                    {
-                        "Action": [
-                            "dynamodb:BatchGetItem",
-                            "dynamodb:BatchWriteItem",
-                            "dynamodb:ConditionCheckItem",
-                            "dynamodb:DeleteItem",
-                            "dynamodb:DescribeTable",
-                            "dynamodb:GetItem",
-                            "dynamodb:GetRecords",
-                            "dynamodb:GetShardIterator",
-                            "dynamodb:PutItem",
-                            "dynamodb:Query",
-                            "dynamodb:Scan",
-                            "dynamodb:UpdateItem",
-                        ],
-                        "Effect": "Allow",
-                        "Resource": [
-                            "arn:aws:dynamodb:us-east-1:000000000000:table/Quizzes",
-                            "arn:aws:dynamodb:us-east-1:000000000000:table/UserSubmissions",
-                            "arn:aws:dynamodb:us-east-1:000000000000:table/UserSubmissions/index/*",
-                        ],
-                    }
-                )
-
-            if not policy_doc["Statement"]:
-                # hack/workaround: statement cannot be fully empty, so we're adding a single dummy entry here
-                policy_doc["Statement"].append(
-                    {
-                        "Action": ["dynamodb:ConditionCheckItem"],
-                        "Effect": "Allow",
-                        "Resource": [
-                            "arn:aws:dynamodb:us-east-1:000000000000:table/Quizzes"
-                        ],
-                    }
-                )
-
-            # update the role policy
+            new_doc = updated_policy(policy_doc, allow)
+            # IAM may return single values as strings and lists in another order
+            if normalized(new_doc) == normalized(policy_doc):
+                continue
             iam_client.put_role_policy(
-                RoleName=role["RoleName"],
+                RoleName=role_name,
                 PolicyName=policy_name,
-                PolicyDocument=json.dumps(policy_doc),
+                PolicyDocument=json.dumps(new_doc),
             )
+            updated += 1
+    return policies, updated
+
+
+def update_role_policy(allow: bool, concurrency=10, endpoint_url="http://localhost:4566"):
+    iam_client = boto3.client(
+        "iam",
+        endpoint_url=endpoint_url,
+        config=Config(max_pool_connections=max(10, concurrency)),
+    )
+    start = time.monotonic()
+    role_names = list_stack_roles(iam_client)
+    listed = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda role_name: update_role(iam_client, role_name, allow), role_names))
+    finished = time.monotonic()
+
+    policies = sum(count for count, _ in results)
+    updated = sum(count for _, count in results)
+    print(
+        f"{len(role_names)} roles listed in {listed - start:.2f}s; "
+        f"{updated} of {policies} policies updated in {finished - listed:.2f}s "
+        f"({policies - updated} already {'enabled' if allow else 'disabled'})"
+    )
 
 
 def main():
-    if len(sys.argv) <= 1 or sys.argv[1] not in ("enable", "disable"):
-        raise Exception("Usage: update_policy.py [enable | disable]")
-    update_role_policy(allow=sys.argv[1] == "enable")
+    parser = argparse.ArgumentParser(description="Enable or disable DynamoDB access for the quiz app roles")
+    parser.add_argument("mode", choices=("enable", "disable"))
+    parser.add_argument("--concurrency", type=int, default=10,
+                        help="roles updated at the same time")
+    parser.add_argument("--endpoint-url", default=os.environ.get("AWS_ENDPOINT_URL", "http://localhost:4566"))
+    args = parser.parse_args()
+    update_role_policy(allow=args.mode == "enable", concurrency=args.concurrency, endpoint_url=args.endpoint_url)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+"""
+Prime the quiz app's Lambda functions ahead of a scheduled quiz event.
+
+Fires N concurrent warm-up invocations per function so that N containers are
+initialized at once. Each handler recognizes the `{"warmup": true}` event, sets
+up its clients, resolves the SQS queue URL, and preloads answer keys and
+sanitized quiz bodies for the given quiz IDs. Warm-up never reads or writes
+user submissions.
+
+Usage:
+    bin/warmup.py --concurrency 10 --quiz-ids brave-lions-danced,cool-cats-ran
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "test")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
+
+DEFAULT_FUNCTIONS = [
+    "GetQuizFunction",
+    "SubmitQuizFunction",
+    "ScoringFunction",
+    "CreateQuizFunction",
+    "GetSubmissionFunction",
+    "GetLeaderboardFunction",
+    "GetUserSubmissionsFunction",
+    "ListPublicQuizzesFunction",
+    "SearchQuizzesFunction",
+    "GetTournamentLeaderboardFunction",
+]
+
+
+def invoke_warmup(lambda_client, function_name, payload):
+    start = time.monotonic()
+    response = lambda_client.invoke(
+        FunctionName=function_name,
+        InvocationType="RequestResponse",
+        Payload=json.dumps(payload).encode(),
+    )
+    elapsed = time.monotonic() - start
+    result = json.loads(response["Payload"].read() or b"null")
+    return function_name, elapsed, response.get("FunctionError"), result
+
+
+def warm_up(function_names, concurrency, quiz_ids, endpoint_url):
+    lambda_client = boto3.client(
+        "lambda",
+        endpoint_url=endpoint_url,
+        config=Config(max_pool_connections=max(10, concurrency * len(function_names))),
+    )
+    payload = {"warmup": True, "quiz_ids": quiz_ids}
+
+    # all invocations are in flight at the same time, which forces Lambda to
+    # spin up one container per concurrent request
+    with ThreadPoolExecutor(max_workers=concurrency * len(function_names)) as executor:
+        futures = [
+            executor.submit(invoke_warmup, lambda_client, function_name, payload)
+            for function_name in function_names
+            for _ in range(concurrency)
+        ]
+        results = [future.result() for future in futures]
+
+    failures = 0
+    for function_name in function_names:
+        timings = [elapsed for name, elapsed, _, _ in results if name == function_name]
+        errors = [result for name, _, error, result in results if name == function_name and error]
+        failures += len(errors)
+        print(
+            f"{function_name}: {len(timings)} invocations, "
+            f"max {max(timings) * 1000:.0f} ms, {len(errors)} errors"
+        )
+        for error in errors[:3]:
+            print(f"  {error}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm up the quiz app Lambda functions")
+    parser.add_argument("--concurrency", type=int, default=5,
+                        help="concurrent warm-up invocations per function")
+    parser.add_argument("--quiz-ids", default="",
+                        help="comma-separated quiz IDs whose data should be preloaded")
+    parser.add_argument("--functions", default=",".join(DEFAULT_FUNCTIONS),
+                        help="comma-separated function names (use ApiRouterFunction,ScoringFunction for the router layout)")
+    parser.add_argument("--endpoint-url", default=os.environ.get("AWS_ENDPOINT_URL", "http://localhost:4566"))
+    args = parser.parse_args()
+
+    quiz_ids = [quiz_id for quiz_id in args.quiz_ids.split(",") if quiz_id]
+    function_names = [name for name in args.functions.split(",") if name]
+    failures = warm_up(function_names, args.concurrency, quiz_ids, args.endpoint_url)
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,9 @@ import os
 
 import aws_cdk
 from aws_cdk import (
+    Duration,
     Stack,
+    aws_apigateway as apigateway,
     aws_s3 as s3,
     aws_cloudfront as cf,
     aws_cloudfront_origins as origins,
@@ -13,7 +15,13 @@ from constructs import Construct
 
 
 class FrontendStack(Stack):
-    def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        rest_api: apigateway.RestApi = None,
+        **kwargs,
+    ) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
         webapp_bucket = s3.Bucket(
@@ -39,6 +47,13 @@ class FrontendStack(Stack):
             ),
         )
 
+        # serve the read endpoints from the distribution so that identical
+        # requests are answered by the edge cache; the frontend then reads
+        # them from its own origin (REACT_APP_READ_API_ENDPOINT)
+        edge_cache_reads = str(self.node.try_get_context("edge_cache_reads") or "false").lower()
+        if edge_cache_reads == "true" and rest_api is not None:
+            self.add_read_api_behaviors(distribution, rest_api)
+
         s3deploy.BucketDeployment(
             self,
             "DeployApp",
@@ -56,3 +71,43 @@ class FrontendStack(Stack):
 
         CfnOutput(self, "DistributionDomainName", value=distribution.domain_name)
 
+    def add_read_api_behaviors(self, distribution: cf.Distribution, rest_api: apigateway.RestApi) -> None:
+        # The handlers set Cache-Control on successful responses, which takes
+        # precedence over the default TTLs below; max_ttl caps what they ask for.
+        read_paths = [
+            # quizzes are keyed on quiz_id (and version); a stale quiz is still
+            # scored against the version it shows, so it can be kept for long
+            ("/getquiz", "QuizCachePolicy", Duration.hours(1), Duration.days(1), ["quiz_id", "version"]),
+            ("/listquizzes", "CatalogCachePolicy", Duration.seconds(30), Duration.minutes(5), []),
+            (
+                "/getleaderboard",
+                "LeaderboardCachePolicy",
+                Duration.seconds(5),
+                Duration.minutes(1),
+                ["quiz_id", "top", "limit", "next_token", "submission_id", "count"],
+            ),
+        ]
+        api_origin = origins.RestApiOrigin(rest_api)
+        for path_pattern, policy_id, default_ttl, max_ttl, query_strings in read_paths:
+            cache_policy = cf.CachePolicy(
+                self,
+                policy_id,
+                default_ttl=default_ttl,
+                min_ttl=Duration.seconds(0),
+                max_ttl=max_ttl,
+                query_string_behavior=(
+                    cf.CacheQueryStringBehavior.allow_list(*query_strings)
+                    if query_strings
+                    else cf.CacheQueryStringBehavior.none()
+                ),
+                enable_accept_encoding_gzip=True,
+                enable_accept_encoding_brotli=True,
+            )
+            distribution.add_behavior(
+                path_pattern,
+                api_origin,
+                cache_policy=cache_policy,
+                allowed_methods=cf.AllowedMethods.ALLOW_GET_HEAD_OPTIONS,
+                viewer_protocol_policy=cf.ViewerProtocolPolicy.REDIRECT_TO_HTTPS,
+            )
+
@@ -1,3 +1,5 @@
+import os
+
 import aws_cdk
 from aws_cdk import (
     Stack,
@@ -5,6 +7,7 @@ from aws_cdk import (
     aws_dynamodb as dynamodb,
     aws_iam as iam,
     aws_lambda as _lambda,
+    aws_s3 as s3,
     aws_sns as sns,
     aws_stepfunctions as sfn,
     aws_pipes as pipes,
@@ -16,6 +19,7 @@ from constructs import Construct
 
 class QuizAppStack(Stack):
     backend_api_url: str
+    rest_api: apigateway.RestApi
 
     def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
@@ -29,6 +33,25 @@ class QuizAppStack(Stack):
                 name="QuizID",
                 type=dynamodb.AttributeType.STRING,
             ),
+            # the search index is updated from the stream
+            stream=dynamodb.StreamViewType.NEW_IMAGE,
+            billing_mode=dynamodb.BillingMode.PROVISIONED,
+            read_capacity=5,
+            write_capacity=5,
+        )
+
+        quiz_versions_table = dynamodb.Table(
+            self,
+            "QuizVersionsTable",
+            table_name="QuizVersions",
+            partition_key=dynamodb.Attribute(
+                name="QuizID",
+                type=dynamodb.AttributeType.STRING,
+            ),
+            sort_key=dynamodb.Attribute(
+                name="Version",
+                type=dynamodb.AttributeType.NUMBER,
+            ),
             billing_mode=dynamodb.BillingMode.PROVISIONED,
             read_capacity=5,
             write_capacity=5,
@@ -42,6 +65,9 @@ class QuizAppStack(Stack):
                 name="SubmissionID",
                 type=dynamodb.AttributeType.STRING,
             ),
+            # expired submissions are archived from the stream
+            time_to_live_attribute="ExpiresAt",
+            stream=dynamodb.StreamViewType.OLD_IMAGE,
             billing_mode=dynamodb.BillingMode.PROVISIONED,
             read_capacity=5,
             write_capacity=5,
@@ -52,15 +78,131 @@ class QuizAppStack(Stack):
                 name="QuizID",
                 type=dynamodb.AttributeType.STRING,
             ),
+            # score and SubmissionID, so that tied entries keep one order
+            sort_key=dynamodb.Attribute(
+                name="ScoreRank",
+                type=dynamodb.AttributeType.STRING,
+            ),
+            # leaderboard entries only; the answers are read from the table
+            projection_type=dynamodb.ProjectionType.INCLUDE,
+            non_key_attributes=["Username", "Score"],
+            read_capacity=5,
+            write_capacity=5,
+        )
+        user_submissions_table.add_global_secondary_index(
+            index_name="Username-SubmittedAt-index",
+            partition_key=dynamodb.Attribute(
+                name="Username",
+                type=dynamodb.AttributeType.STRING,
+            ),
+            sort_key=dynamodb.Attribute(
+                name="SubmittedAt",
+                type=dynamodb.AttributeType.STRING,
+            ),
+            projection_type=dynamodb.ProjectionType.INCLUDE,
+            non_key_attributes=["QuizID", "QuizVersion", "Score", "TotalQuestions"],
+            read_capacity=5,
+            write_capacity=5,
+        )
+
+        submission_idempotency_table = dynamodb.Table(
+            self,
+            "SubmissionIdempotencyTable",
+            table_name="SubmissionIdempotency",
+            partition_key=dynamodb.Attribute(
+                name="IdempotencyKey",
+                type=dynamodb.AttributeType.STRING,
+            ),
+            time_to_live_attribute="ExpiresAt",
+            billing_mode=dynamodb.BillingMode.PROVISIONED,
+            read_capacity=5,
+            write_capacity=5,
+        )
+
+        # token buckets of the /submitquiz admission control (see quiz_common/admission.py);
+        # on demand, so that a burst of submissions is not throttled by the table itself
+        submission_rate_limits_table = dynamodb.Table(
+            self,
+            "SubmissionRateLimitsTable",
+            table_name="SubmissionRateLimits",
+            partition_key=dynamodb.Attribute(
+                name="BucketKey",
+                type=dynamodb.AttributeType.STRING,
+            ),
+            time_to_live_attribute="ExpiresAt",
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+        )
+
+        leaderboard_snapshots_table = dynamodb.Table(
+            self,
+            "LeaderboardSnapshotsTable",
+            table_name="LeaderboardSnapshots",
+            partition_key=dynamodb.Attribute(
+                name="QuizID",
+                type=dynamodb.AttributeType.STRING,
+            ),
+            billing_mode=dynamodb.BillingMode.PROVISIONED,
+            read_capacity=5,
+            write_capacity=5,
+        )
+
+        tournaments_table = dynamodb.Table(
+            self,
+            "TournamentsTable",
+            table_name="Tournaments",
+            partition_key=dynamodb.Attribute(
+                name="TournamentID",
+                type=dynamodb.AttributeType.STRING,
+            ),
+            billing_mode=dynamodb.BillingMode.PROVISIONED,
+            read_capacity=5,
+            write_capacity=5,
+        )
+
+        # running player scores of aggregated tournaments, kept up to date by scoring
+        tournament_scores_table = dynamodb.Table(
+            self,
+            "TournamentScoresTable",
+            table_name="TournamentScores",
+            partition_key=dynamodb.Attribute(
+                name="TournamentID",
+                type=dynamodb.AttributeType.STRING,
+            ),
+            sort_key=dynamodb.Attribute(
+                name="Username",
+                type=dynamodb.AttributeType.STRING,
+            ),
+            billing_mode=dynamodb.BillingMode.PROVISIONED,
+            read_capacity=5,
+            write_capacity=5,
+        )
+        tournament_scores_table.add_global_secondary_index(
+            index_name="TournamentID-Score-index",
+            partition_key=dynamodb.Attribute(
+                name="TournamentID",
+                type=dynamodb.AttributeType.STRING,
+            ),
             sort_key=dynamodb.Attribute(
                 name="Score",
                 type=dynamodb.AttributeType.NUMBER,
             ),
-            projection_type=dynamodb.ProjectionType.ALL,
+            projection_type=dynamodb.ProjectionType.KEYS_ONLY,
             read_capacity=5,
             write_capacity=5,
         )
 
+        submissions_archive_bucket = s3.Bucket(
+            self,
+            "SubmissionsArchiveBucket",
+            bucket_name="quiz-app-submissions-archive",
+        )
+
+        search_index_bucket = s3.Bucket(
+            self,
+            "SearchIndexBucket",
+            bucket_name="quiz-app-search-index",
+        )
+
         dlq_submission_queue = sqs.Queue(self, "QuizSubmissionDLQ")
         submission_queue = sqs.Queue(
             self,
@@ -80,6 +222,10 @@ class QuizAppStack(Stack):
                 "GetQuizFunction",
                 "lambdas/get_quiz",
             ),
+            (
+                "UpdateQuizFunction",
+                "lambdas/update_quiz",
+            ),
             (
                 "SubmitQuizFunction",
                 "lambdas/submit_quiz",
@@ -96,6 +242,10 @@ class QuizAppStack(Stack):
                 "GetLeaderboardFunction",
                 "lambdas/get_leaderboard",
             ),
+            (
+                "GetUserSubmissionsFunction",
+                "lambdas/get_user_submissions",
+            ),
             (
                 "ListPublicQuizzesFunction",
                 "lambdas/list_quizzes",
@@ -104,11 +254,68 @@ class QuizAppStack(Stack):
                 "RetryQuizzesWritesFunction",
                 "lambdas/retry_quizzes_writes",
             ),
+            (
+                "ArchiveSubmissionsFunction",
+                "lambdas/archive_submissions",
+            ),
+            (
+                "SearchQuizzesFunction",
+                "lambdas/search_quizzes",
+            ),
+            (
+                "IndexQuizzesFunction",
+                "lambdas/index_quizzes",
+            ),
+            (
+                "CreateTournamentFunction",
+                "lambdas/create_tournament",
+            ),
+            (
+                "GetTournamentLeaderboardFunction",
+                "lambdas/get_tournament_leaderboard",
+            ),
+        ]
+        endpoints = [
+            ("getquiz", "GET", "GetQuizFunction"),
+            ("createquiz", "POST", "CreateQuizFunction"),
+            ("updatequiz", "POST", "UpdateQuizFunction"),
+            ("submitquiz", "POST", "SubmitQuizFunction"),
+            ("getsubmission", "GET", "GetSubmissionFunction"),
+            ("getleaderboard", "GET", "GetLeaderboardFunction"),
+            ("getusersubmissions", "GET", "GetUserSubmissionsFunction"),
+            ("listquizzes", "GET", "ListPublicQuizzesFunction"),
+            ("searchquizzes", "GET", "SearchQuizzesFunction"),
+            ("createtournament", "POST", "CreateTournamentFunction"),
+            ("gettournamentleaderboard", "GET", "GetTournamentLeaderboardFunction"),
         ]
+        api_function_names = {function_name for _, _, function_name in endpoints}
+
+        # "split" deploys one function per endpoint, "router" serves every
+        # endpoint from a single function (see lambdas/api_router)
+        api_layout = self.node.try_get_context("api_layout") or "split"
+        if api_layout not in ("split", "router"):
+            raise ValueError(f"Unknown api_layout '{api_layout}', expected 'split' or 'router'")
+
+        # storage layer shared by the handlers (lambdas/common/python/quiz_common);
+        # bin/build_layer.sh adds the optional packages such as orjson
+        layer_path = "../build/quiz_common_layer"
+        if not os.path.isdir(layer_path):
+            layer_path = "../lambdas/common"
+        common_layer = _lambda.LayerVersion(
+            self,
+            "QuizCommonLayer",
+            code=_lambda.Code.from_asset(
+                layer_path, exclude=["**/__pycache__", "requirements.txt"]
+            ),
+            compatible_runtimes=[_lambda.Runtime.PYTHON_3_11],
+        )
+
         functions = {}
 
         for function_info in functions_and_roles:
             function_name, handler_path = function_info
+            if api_layout == "router" and function_name in api_function_names:
+                continue
             current_function = _lambda.Function(
                 self,
                 f"{function_name}LambdaFunction",
@@ -116,15 +323,113 @@ class QuizAppStack(Stack):
                 runtime=_lambda.Runtime.PYTHON_3_11,
                 handler="handler.lambda_handler",
                 code=_lambda.Code.from_asset(f"../{handler_path}"),
+                layers=[common_layer],
                 timeout=aws_cdk.Duration.seconds(30),
             )
             functions[function_name] = current_function
 
+        if api_layout == "router":
+            api_router_function = _lambda.Function(
+                self,
+                "ApiRouterFunctionLambdaFunction",
+                function_name="ApiRouterFunction",
+                runtime=_lambda.Runtime.PYTHON_3_11,
+                handler="api_router/handler.lambda_handler",
+                code=_lambda.Code.from_asset(
+                    "../lambdas", exclude=["**/__pycache__", "common"]
+                ),
+                layers=[common_layer],
+                timeout=aws_cdk.Duration.seconds(30),
+            )
+            # every API function name resolves to the router, so the
+            # integrations and grants below apply to it unchanged
+            for function_name in api_function_names:
+                functions[function_name] = api_router_function
+
+        # submitquiz scores small submissions itself while the queue is idle
+        inline_scoring = str(self.node.try_get_context("inline_scoring") or "false").lower()
+        functions["SubmitQuizFunction"].add_environment("INLINE_SCORING_ENABLED", inline_scoring)
+        # admission control of /submitquiz; 0 disables a check
+        admission_defaults = {
+            "ADMISSION_MAX_BACKLOG": "0",
+            "ADMISSION_USER_RATE": "0",
+            "ADMISSION_USER_BURST": "5",
+            "ADMISSION_QUIZ_RATE": "0",
+            "ADMISSION_QUIZ_BURST": "100",
+        }
+        for name, default in admission_defaults.items():
+            functions["SubmitQuizFunction"].add_environment(name, str(self.node.try_get_context(name.lower()) or default))
+
+        # scoring batch settings; measure candidates with bin/sweep_scoring.py
+        scoring_batch_size = int(self.node.try_get_context("scoring_batch_size") or 10)
+        scoring_batching_window = int(self.node.try_get_context("scoring_batching_window") or 0)
+        scoring_max_concurrency = int(self.node.try_get_context("scoring_max_concurrency") or 0)
+        if scoring_batch_size > 10 and scoring_batching_window < 1:
+            raise ValueError("scoring_batch_size above 10 needs a scoring_batching_window of at least 1 second")
         _lambda.EventSourceMapping(
             self,
             "ScoringFunctionSubscription",
             target=functions["ScoringFunction"],
             event_source_arn=submission_queue.queue_arn,
+            batch_size=scoring_batch_size,
+            max_batching_window=aws_cdk.Duration.seconds(scoring_batching_window)
+            if scoring_batching_window else None,
+            # 0 leaves concurrency to the event source's own scaling
+            max_concurrency=scoring_max_concurrency or None,
+            # records whose email could not be started are handed back on their own
+            report_batch_item_failures=True,
+        )
+        # records of a batch scored at the same time within an invocation
+        functions["ScoringFunction"].add_environment(
+            "SCORING_RECORD_CONCURRENCY", str(self.node.try_get_context("scoring_record_concurrency") or "10")
+        )
+
+        # scored submissions expire after this many days and are archived; 0 keeps them
+        retention_days = str(self.node.try_get_context("submission_retention_days") or "0")
+        for function_name in ("ScoringFunction", "SubmitQuizFunction"):
+            functions[function_name].add_environment("SUBMISSION_RETENTION_DAYS", retention_days)
+        functions["ArchiveSubmissionsFunction"].add_environment(
+            "ARCHIVE_TARGET", f"s3://{submissions_archive_bucket.bucket_name}"
+        )
+        _lambda.EventSourceMapping(
+            self,
+            "ArchiveSubmissionsSubscription",
+            target=functions["ArchiveSubmissionsFunction"],
+            event_source_arn=user_submissions_table.table_stream_arn,
+            starting_position=_lambda.StartingPosition.TRIM_HORIZON,
+            batch_size=100,
+            # only TTL deletions are archived, not the writes of every scored submission
+            filters=[
+                _lambda.FilterCriteria.filter(
+                    {
+                        "eventName": _lambda.FilterRule.is_equal("REMOVE"),
+                        "userIdentity": {"type": _lambda.FilterRule.is_equal("Service")},
+                    }
+                )
+            ],
+        )
+
+        for function_name in ("SearchQuizzesFunction", "IndexQuizzesFunction"):
+            functions[function_name].add_environment(
+                "SEARCH_INDEX_BUCKET", search_index_bucket.bucket_name
+            )
+        # indexing question texts as well makes the index several times larger
+        search_questions = str(self.node.try_get_context("search_index_questions") or "false").lower()
+        functions["IndexQuizzesFunction"].add_environment("SEARCH_INDEX_QUESTIONS", search_questions)
+
+        # "map" or "compressed" (see quiz_common/quizzes.py); all readers accept both
+        quiz_storage_format = self.node.try_get_context("quiz_storage_format") or "map"
+        for function_name in ["CreateQuizFunction", "UpdateQuizFunction", "RetryQuizzesWritesFunction"]:
+            functions[function_name].add_environment("QUIZ_STORAGE_FORMAT", quiz_storage_format)
+        _lambda.EventSourceMapping(
+            self,
+            "IndexQuizzesSubscription",
+            target=functions["IndexQuizzesFunction"],
+            event_source_arn=quizzes_table.table_stream_arn,
+            starting_position=_lambda.StartingPosition.TRIM_HORIZON,
+            batch_size=100,
+            # every invocation rewrites the whole index, so changes are batched up
+            max_batching_window=aws_cdk.Duration.seconds(5),
         )
 
         # create rest api
@@ -140,14 +445,6 @@ class QuizAppStack(Stack):
             ),
         )
 
-        endpoints = [
-            ("getquiz", "GET", "GetQuizFunction"),
-            ("createquiz", "POST", "CreateQuizFunction"),
-            ("submitquiz", "POST", "SubmitQuizFunction"),
-            ("getsubmission", "GET", "GetSubmissionFunction"),
-            ("getleaderboard", "GET", "GetLeaderboardFunction"),
-            ("listquizzes", "GET", "ListPublicQuizzesFunction"),
-        ]
         for path_part, http_method, function_name in endpoints:
             resource = rest_api.root.add_resource(path_part)
             integration = apigateway.LambdaIntegration(
@@ -156,6 +453,7 @@ class QuizAppStack(Stack):
             resource.add_method(http_method, integration=integration)
 
         self.backend_api_url = rest_api.url
+        self.rest_api = rest_api
 
         # verify email identity for SES
         for email in ["your.email@example.com", "admin@localstack.cloud", "sender@example.com"]:
@@ -241,7 +539,12 @@ class QuizAppStack(Stack):
                             "sesv2:SendEmail",
                         ],
                         "Resource": "*",
-                    }
+                    },
+                    {
+                        "Effect": "Allow",
+                        "Action": "cloudwatch:PutMetricData",
+                        "Resource": "*",
+                    },
                 ],
             }
         )
@@ -269,14 +572,43 @@ class QuizAppStack(Stack):
         quizzes_table.grant_write_data(functions["CreateQuizFunction"])
         # TODO: createquizfunction should be able to write to QuizzesWriteFailures
         quizzes_table.grant_read_data(functions["GetQuizFunction"])
+        quiz_versions_table.grant_read_data(functions["GetQuizFunction"])
+        quizzes_table.grant_read_write_data(functions["UpdateQuizFunction"])
+        quiz_versions_table.grant_read_write_data(functions["UpdateQuizFunction"])
         quizzes_table.grant_read_data(functions["SubmitQuizFunction"])
+        quiz_versions_table.grant_read_data(functions["SubmitQuizFunction"])
         submission_queue.grant_send_messages(functions["SubmitQuizFunction"])
+        submission_idempotency_table.grant_read_write_data(functions["SubmitQuizFunction"])
+        submission_rate_limits_table.grant_write_data(functions["SubmitQuizFunction"])
+        user_submissions_table.grant_write_data(functions["SubmitQuizFunction"])
         quizzes_table.grant_read_write_data(functions["ScoringFunction"])
+        quiz_versions_table.grant_read_data(functions["ScoringFunction"])
         self.state_machine.grant_start_execution(functions["ScoringFunction"])
+        self.state_machine.grant_start_execution(functions["SubmitQuizFunction"])
         submission_queue.grant_consume_messages(functions["ScoringFunction"])
         user_submissions_table.grant_read_write_data(functions["ScoringFunction"])
         user_submissions_table.grant_read_data(functions["GetSubmissionFunction"])
+        quizzes_table.grant_read_data(functions["GetSubmissionFunction"])
+        quiz_versions_table.grant_read_data(functions["GetSubmissionFunction"])
         user_submissions_table.grant_read_data(functions["GetLeaderboardFunction"])
+        leaderboard_snapshots_table.grant_read_data(functions["GetLeaderboardFunction"])
+        user_submissions_table.grant_read_data(functions["GetUserSubmissionsFunction"])
         quizzes_table.grant_read_data(functions["ListPublicQuizzesFunction"])
         quizzes_table.grant_read_write_data(functions["RetryQuizzesWritesFunction"])
+        user_submissions_table.grant_stream_read(functions["ArchiveSubmissionsFunction"])
+        leaderboard_snapshots_table.grant_read_write_data(functions["ArchiveSubmissionsFunction"])
+        submissions_archive_bucket.grant_put(functions["ArchiveSubmissionsFunction"])
+        search_index_bucket.grant_read(functions["SearchQuizzesFunction"])
+        search_index_bucket.grant_read_write(functions["IndexQuizzesFunction"])
+        quizzes_table.grant_stream_read(functions["IndexQuizzesFunction"])
+        quizzes_table.grant_read_data(functions["CreateTournamentFunction"])
+        tournaments_table.grant_write_data(functions["CreateTournamentFunction"])
+        tournaments_table.grant_read_data(functions["GetTournamentLeaderboardFunction"])
+        tournament_scores_table.grant_read_data(functions["GetTournamentLeaderboardFunction"])
+        user_submissions_table.grant_read_data(functions["GetTournamentLeaderboardFunction"])
+        leaderboard_snapshots_table.grant_read_data(functions["GetTournamentLeaderboardFunction"])
+        # both score submissions, so both update the aggregated tournaments
+        for function_name in ("ScoringFunction", "SubmitQuizFunction"):
+            tournaments_table.grant_read_data(functions[function_name])
+            tournament_scores_table.grant_read_write_data(functions[function_name])
         # TODO: retryquizzeswritesfunction should have access to read and write to quizzeswritefailuresqueue
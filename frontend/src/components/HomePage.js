@@ -27,7 +27,7 @@ function HomePage() {
   const navigate = useNavigate();
 
   useEffect(() => {
-    fetch(`${process.env.REACT_APP_API_ENDPOINT}/listquizzes`)
+    fetch(`${process.env.REACT_APP_READ_API_ENDPOINT ?? process.env.REACT_APP_API_ENDPOINT}/listquizzes`)
       .then((res) => res.json())
       .then((data) => {
         if (data && Array.isArray(data.Quizzes) && data.Quizzes.length > 0) {
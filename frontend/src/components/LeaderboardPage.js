@@ -31,7 +31,7 @@ function LeaderboardPage() {
     }
 
     fetch(
-      `${process.env.REACT_APP_API_ENDPOINT}/getleaderboard?quiz_id=${quizID}&top=5`
+      `${process.env.REACT_APP_READ_API_ENDPOINT ?? process.env.REACT_APP_API_ENDPOINT}/getleaderboard?quiz_id=${quizID}&top=5`
     )
       .then((res) => res.json())
       .then((data) => {
@@ -21,6 +21,10 @@ import Mascot1 from '../Mascot1.svg';
 import Mascot2 from '../Mascot2.svg';
 import Mascot3 from '../Mascot3.svg';
 
+// submissions turned away with 429 are retried this many times in all
+const MAX_SUBMIT_ATTEMPTS = 5;
+const BUSY_MESSAGE = 'The quiz is too busy right now. Please try submitting again in a few minutes.';
+
 function QuizPage() {
   const { state } = useLocation();
   const navigate = useNavigate();
@@ -33,6 +37,12 @@ function QuizPage() {
   const timerRef = useRef(null);
   const questionStartTimeRef = useRef(null);
   const hasSubmittedRef = useRef(false);
+  // Reused across retries of the same attempt so the backend can deduplicate
+  const idempotencyKeyRef = useRef(
+    window.crypto && window.crypto.randomUUID
+      ? window.crypto.randomUUID()
+      : `${Date.now()}-${Math.random().toString(36).slice(2)}`
+  );
 
   useEffect(() => {
     if (!quizID || !username) {
@@ -40,7 +50,7 @@ function QuizPage() {
       return;
     }
 
-    fetch(`${process.env.REACT_APP_API_ENDPOINT}/getquiz?quiz_id=${quizID}`)
+    fetch(`${process.env.REACT_APP_READ_API_ENDPOINT ?? process.env.REACT_APP_API_ENDPOINT}/getquiz?quiz_id=${quizID}`)
       .then((res) => res.json())
       .then((data) => {
         setQuizData(data);
@@ -66,7 +76,11 @@ function QuizPage() {
         Username: username,
         QuizID: quizID,
         Answers: submissionAnswers,
+        IdempotencyKey: idempotencyKeyRef.current,
       };
+      if (quizData && quizData.Version) {
+        submissionData.Version = quizData.Version;
+      }
       if (email) {
         submissionData.Email = email;
       }
@@ -74,25 +88,52 @@ function QuizPage() {
         submissionData.TimerExceeded = true;
       }
 
-      fetch(`${process.env.REACT_APP_API_ENDPOINT}/submitquiz`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(submissionData),
-      })
-        .then((res) => res.json())
+      // a busy quiz turns submissions away with 429; wait as told, plus up to
+      // a second so that players turned away together spread out, and retry
+      const postSubmission = (attempt = 1) =>
+        fetch(`${process.env.REACT_APP_API_ENDPOINT}/submitquiz`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify(submissionData),
+        }).then((res) => {
+          if (res.status !== 429) {
+            return res.json();
+          }
+          if (attempt >= MAX_SUBMIT_ATTEMPTS) {
+            throw new Error(BUSY_MESSAGE);
+          }
+          return res.json().then((data) => {
+            const retryAfter = Number(res.headers.get('Retry-After')) || data.RetryAfter || 1;
+            return new Promise((resolve) => {
+              setTimeout(() => resolve(postSubmission(attempt + 1)), retryAfter * 1000 + Math.random() * 1000);
+            });
+          });
+        });
+
+      postSubmission()
         .then((data) => {
+          // a submission scored inline is shown right away, without polling
+          const result =
+            data.Score !== undefined
+              ? {
+                  Score: data.Score,
+                  TotalQuestions: data.TotalQuestions,
+                  QuizVersion: data.QuizVersion,
+                  UserAnswers: submissionData.Answers,
+                }
+              : undefined;
           navigate('/result', {
-            state: { submissionID: data.SubmissionID, quizID },
+            state: { submissionID: data.SubmissionID, quizID, result },
           });
         })
         .catch((err) => {
           console.error('Error submitting quiz:', err);
-          alert('Failed to submit quiz. Please try again.');
+          alert(err.message === BUSY_MESSAGE ? BUSY_MESSAGE : 'Failed to submit quiz. Please try again.');
           setIsSubmitting(false);
           hasSubmittedRef.current = false;
         });
     },
-    [answers, email, navigate, quizID, username]
+    [answers, email, navigate, quizData, quizID, username]
   );
 
   const moveToNextQuestion = useCallback(() => {
@@ -22,7 +22,7 @@ import StarSharp from '../../src/StarSharp.svg';
 function ResultPage() {
   const { state } = useLocation();
   const navigate = useNavigate();
-  const { submissionID, quizID } = state || {};
+  const { submissionID, quizID, result } = state || {};
   const [resultData, setResultData] = useState(null);
   const [quizData, setQuizData] = useState(null);
   const [loading, setLoading] = useState(true);
@@ -38,16 +38,21 @@ function ResultPage() {
       return;
     }
 
-    fetch(`${process.env.REACT_APP_API_ENDPOINT}/getquiz?quiz_id=${quizID}`)
-      .then((res) => res.json())
-      .then((data) => {
-        setQuizData(data);
-      })
-      .catch((err) => {
-        console.error('Error fetching quiz data:', err);
-        setError('Failed to fetch quiz data. Please try again later.');
-        setLoading(false);
-      });
+    // the submission was scored against a particular version of the quiz,
+    // so show the questions of that version even if the quiz changed since
+    const fetchQuiz = (version) => {
+      const versionParam = version != null ? `&version=${version}` : '';
+      fetch(`${process.env.REACT_APP_READ_API_ENDPOINT ?? process.env.REACT_APP_API_ENDPOINT}/getquiz?quiz_id=${quizID}${versionParam}`)
+        .then((res) => res.json())
+        .then((data) => {
+          setQuizData(data);
+        })
+        .catch((err) => {
+          console.error('Error fetching quiz data:', err);
+          setError('Failed to fetch quiz data. Please try again later.');
+          setLoading(false);
+        });
+    };
 
     const fetchResult = () => {
       fetch(
@@ -61,6 +66,7 @@ function ResultPage() {
         })
         .then((data) => {
           setResultData(data);
+          fetchQuiz(data.QuizVersion);
           setLoading(false);
         })
         .catch((err) => {
@@ -75,13 +81,19 @@ function ResultPage() {
           }
         });
     };
+    if (result) {
+      setResultData(result);
+      fetchQuiz(result.QuizVersion);
+      setLoading(false);
+      return;
+    }
     fetchResult();
     return () => {
       if (timeoutIdRef.current) {
         clearTimeout(timeoutIdRef.current);
       }
     };
-  }, [submissionID, quizID, navigate]);
+  }, [submissionID, quizID, result, navigate]);
 
   const handleViewLeaderboard = () => {
     navigate('/leaderboard', { state: { quizID } });
@@ -91,17 +103,6 @@ function ResultPage() {
     navigate('/');
   };
 
-  if (loading || !quizData) {
-    return (
-      <Container maxWidth="sm" sx={{ textAlign: 'center', marginTop: 8 }}>
-        <CircularProgress />
-        <Typography variant="h6" sx={{ marginTop: 2 }}>
-          Processing your submission...
-        </Typography>
-      </Container>
-    );
-  }
-
   if (error) {
     return (
       <Container maxWidth="sm" sx={{ textAlign: 'center', marginTop: 8 }}>
@@ -115,6 +116,17 @@ function ResultPage() {
     );
   }
 
+  if (loading || !quizData) {
+    return (
+      <Container maxWidth="sm" sx={{ textAlign: 'center', marginTop: 8 }}>
+        <CircularProgress />
+        <Typography variant="h6" sx={{ marginTop: 2 }}>
+          Processing your submission...
+        </Typography>
+      </Container>
+    );
+  }
+
   return (
     <QuizLayout>
       <Container maxWidth="sm" className="main-quiz-container">
@@ -0,0 +1,58 @@
+import os
+
+from quiz_common import codec
+from quiz_common.handlers import import_handler
+
+# The router is deployed with the whole `lambdas/` directory as its code asset,
+# so every API handler lives next to this package
+LAMBDAS_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ROUTES = {
+    ('getquiz', 'GET'): 'get_quiz',
+    ('createquiz', 'POST'): 'create_quiz',
+    ('updatequiz', 'POST'): 'update_quiz',
+    ('submitquiz', 'POST'): 'submit_quiz',
+    ('getsubmission', 'GET'): 'get_submission',
+    ('getleaderboard', 'GET'): 'get_leaderboard',
+    ('getusersubmissions', 'GET'): 'get_user_submissions',
+    ('listquizzes', 'GET'): 'list_quizzes',
+    ('searchquizzes', 'GET'): 'search_quizzes',
+    ('createtournament', 'POST'): 'create_tournament',
+    ('gettournamentleaderboard', 'GET'): 'get_tournament_leaderboard',
+}
+
+# Handler modules are imported once per container and shared by all routes,
+# so module-level clients and caches stay warm across endpoints
+_handlers = {}
+
+def load_handler(package):
+    handler = _handlers.get(package)
+    if handler is None:
+        handler = _handlers[package] = import_handler(LAMBDAS_ROOT, package).lambda_handler
+    return handler
+
+def route_key(event):
+    resource = event.get('resource') or event.get('path') or ''
+    path_part = resource.rstrip('/').rsplit('/', 1)[-1]
+    return path_part, (event.get('httpMethod') or '').upper()
+
+def lambda_handler(event, context):
+    if event.get('warmup'):
+        # Import every handler and let each prime its own clients and caches
+        results = {}
+        for package in ROUTES.values():
+            results[package] = load_handler(package)(event, context)
+        return {'warmup': True, 'handlers': results}
+
+    path_part, http_method = route_key(event)
+    package = ROUTES.get((path_part, http_method))
+    if package is None:
+        return {
+            'statusCode': 404,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': '*',
+            },
+            'body': codec.dumps({'message': f'No route for {http_method} /{path_part}'})
+        }
+    return load_handler(package)(event, context)
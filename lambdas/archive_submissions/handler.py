@@ -0,0 +1,58 @@
+import os
+
+from boto3.dynamodb.types import TypeDeserializer
+from quiz_common.archive import encode_items, file_key, open_archive, partition
+from quiz_common.leaderboard import leaderboard_entry
+from quiz_common.storage import get_storage
+
+ARCHIVE_TARGET = os.environ.get('ARCHIVE_TARGET', 's3://quiz-app-submissions-archive')
+LEADERBOARD_SNAPSHOT_SIZE = int(os.environ.get('LEADERBOARD_SNAPSHOT_SIZE', '100'))
+
+storage = get_storage()
+archive = open_archive(ARCHIVE_TARGET)
+deserializer = TypeDeserializer()
+
+def is_ttl_deletion(record):
+    # TTL deletions are performed by the DynamoDB service principal
+    identity = record.get('userIdentity') or {}
+    return (
+        record.get('eventName') == 'REMOVE'
+        and identity.get('type') == 'Service'
+        and identity.get('principalId') == 'dynamodb.amazonaws.com'
+    )
+
+def lambda_handler(event, context):
+    if event.get('warmup'):
+        return {'warmup': True}
+
+    partitions = {}
+    batch_id = None
+    for record in event['Records']:
+        if not is_ttl_deletion(record):
+            continue
+        image = record['dynamodb'].get('OldImage')
+        if not image:
+            continue
+        item = {k: deserializer.deserialize(v) for k, v in image.items()}
+        # rehydrated submissions are already in the archive
+        if item.get('Rehydrated'):
+            continue
+        # the first sequence number names the files, so a retried batch overwrites them
+        batch_id = batch_id or record['dynamodb']['SequenceNumber']
+        partitions.setdefault(partition(item), []).append(item)
+
+    snapshot_entries = {}
+    for (quiz_id, day), items in partitions.items():
+        archive.put(file_key(quiz_id, day, batch_id), encode_items(items))
+        snapshot_entries.setdefault(quiz_id, []).extend(
+            leaderboard_entry(item) for item in items if 'Score' in item
+        )
+
+    # leaderboards of archived submissions stay answerable from the snapshot
+    for quiz_id, entries in snapshot_entries.items():
+        if entries:
+            storage.snapshots.merge_snapshot(quiz_id, entries, LEADERBOARD_SNAPSHOT_SIZE)
+
+    archived = sum(len(items) for items in partitions.values())
+    print(f"Archived {archived} submissions into {len(partitions)} partitions")
+    return {'archived': archived}
@@ -0,0 +1 @@
+"""Code shared by the quiz app's Lambda functions, deployed as a Lambda layer."""
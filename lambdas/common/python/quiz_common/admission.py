@@ -0,0 +1,42 @@
+"""Token buckets that admit submissions to `/submitquiz`.
+
+A bucket holds up to `burst` tokens and regains one every `interval_ms`. It is
+stored as a single number, `FullAt`: the time (epoch milliseconds) at which
+it is full again, as in the generic cell rate algorithm. Taking a token
+moves `FullAt` one interval further, starting from now if the bucket is
+already full, and a token is available while `FullAt` stays within
+`burst - 1` intervals of now. DynamoDB can therefore take a token with one
+conditional update and no read (see `DynamoDBSubmissionStore`).
+"""
+
+import math
+
+# a full bucket is deleted by the table's TTL a while after it refilled
+BUCKET_EXPIRY_SECONDS = 60
+
+
+def interval_ms(rate):
+    """The refill interval of a bucket that regains `rate` tokens per second."""
+    return max(1, round(1000 / rate))
+
+
+def latest_full_at(now, interval, burst):
+    """The latest `FullAt` that still leaves a token to take at `now`."""
+    return now + (burst - 1) * interval
+
+
+def take(full_at, now, interval, burst):
+    """Take a token from a bucket stored as `full_at` (None: never used).
+
+    Returns (new full_at, 0) if a token was taken, otherwise (full_at,
+    milliseconds until a token is available).
+    """
+    latest = latest_full_at(now, interval, burst)
+    if full_at is not None and full_at > latest:
+        return full_at, full_at - latest
+    return max(full_at or 0, now) + interval, 0
+
+
+def expires_at(now, interval, burst):
+    """TTL (epoch seconds) for a bucket updated at `now`; it is full again by then."""
+    return math.ceil((latest_full_at(now, interval, burst) + interval) / 1000) + BUCKET_EXPIRY_SECONDS
@@ -0,0 +1,94 @@
+"""Archived submissions: gzip-compressed JSON Lines files partitioned by quiz and day.
+
+Files live under `submissions/quiz_id=<QuizID>/date=<YYYY-MM-DD>/<batch>.jsonl.gz`,
+either in an S3 bucket (`s3://bucket[/prefix]`) or in a local directory. Every
+archiver invocation writes new files, so files are never rewritten.
+"""
+
+import gzip
+import json
+import os
+from decimal import Decimal
+
+from . import codec
+
+ARCHIVE_ROOT = 'submissions'
+
+
+def encode_items(items):
+    lines = ''.join(codec.dumps(item) + '\n' for item in items)
+    return gzip.compress(lines.encode(), compresslevel=6)
+
+
+def decode_items(data):
+    """Yield archived items with numbers as `Decimal`, ready to be written back to DynamoDB."""
+    for line in gzip.decompress(data).decode().splitlines():
+        if line:
+            yield json.loads(line, parse_float=Decimal, parse_int=Decimal)
+
+
+def partition(item):
+    # submissions scored before SubmittedAt existed have no day
+    day = (item.get('SubmittedAt') or '')[:10] or 'undated'
+    return item['QuizID'], day
+
+
+def quiz_prefix(quiz_id):
+    return f'{ARCHIVE_ROOT}/quiz_id={quiz_id}/'
+
+
+def file_key(quiz_id, day, batch_id):
+    return f'{quiz_prefix(quiz_id)}date={day}/{batch_id}.jsonl.gz'
+
+
+class LocalArchive:
+    def __init__(self, root):
+        self.root = root
+
+    def put(self, key, data):
+        path = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    def list(self, prefix):
+        keys = []
+        for directory, _, files in os.walk(os.path.join(self.root, prefix)):
+            for name in files:
+                keys.append(os.path.relpath(os.path.join(directory, name), self.root).replace(os.sep, '/'))
+        return sorted(keys)
+
+    def get(self, key):
+        with open(os.path.join(self.root, key), 'rb') as f:
+            return f.read()
+
+
+class S3Archive:
+    def __init__(self, bucket, prefix='', s3_client=None):
+        if s3_client is None:
+            import boto3
+            s3_client = boto3.client('s3')
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+
+    def put(self, key, data):
+        self.s3.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=data, ContentType='application/gzip')
+
+    def list(self, prefix):
+        keys = []
+        paginator = self.s3.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix + prefix):
+            keys.extend(obj['Key'][len(self.prefix):] for obj in page.get('Contents', []))
+        return sorted(keys)
+
+    def get(self, key):
+        return self.s3.get_object(Bucket=self.bucket, Key=self.prefix + key)['Body'].read()
+
+
+def open_archive(target, s3_client=None):
+    """Open `s3://bucket[/prefix]` or a local directory."""
+    if target.startswith('s3://'):
+        bucket, _, prefix = target[len('s3://'):].partition('/')
+        return S3Archive(bucket, prefix, s3_client)
+    return LocalArchive(target)
@@ -0,0 +1,72 @@
+"""JSON for request and response bodies, queue messages and stored documents.
+
+Uses orjson when it is installed in the layer (see lambdas/common/requirements.txt)
+and the standard library otherwise; `JSON_CODEC=json` forces the latter. Both
+produce compact output and encode the `Decimal` values DynamoDB returns as
+integers or floats, so items can be serialized without converting them first.
+"""
+
+import json
+import os
+from decimal import Decimal
+
+JSON_CODEC = os.environ.get('JSON_CODEC', 'auto')
+
+# orjson.JSONDecodeError subclasses this, so one except clause covers both codecs
+JSONDecodeError = json.JSONDecodeError
+
+
+def encode_default(o):
+    if isinstance(o, Decimal):
+        return int(o) if o % 1 == 0 else float(o)
+    if isinstance(o, (set, frozenset)):
+        return sorted(o)
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+class StdlibCodec:
+    name = 'json'
+
+    def __init__(self):
+        self.encoder = json.JSONEncoder(default=encode_default, separators=(',', ':'))
+        self.decoder = json.JSONDecoder()
+
+    def dumps(self, obj):
+        return self.encoder.encode(obj)
+
+    def loads(self, data):
+        if isinstance(data, (bytes, bytearray)):
+            data = data.decode()
+        return self.decoder.decode(data)
+
+
+class OrjsonCodec:
+    name = 'orjson'
+
+    def __init__(self, orjson):
+        self.orjson = orjson
+
+    def dumps(self, obj):
+        return self.orjson.dumps(obj, default=encode_default).decode()
+
+    def loads(self, data):
+        return self.orjson.loads(data)
+
+
+def create_codec(name='auto'):
+    if name not in ('auto', 'orjson', 'json'):
+        raise ValueError(f"Unknown JSON codec '{name}', expected 'auto', 'orjson' or 'json'")
+    if name != 'json':
+        try:
+            import orjson
+        except ImportError:
+            if name == 'orjson':
+                raise
+        else:
+            return OrjsonCodec(orjson)
+    return StdlibCodec()
+
+
+default_codec = create_codec(JSON_CODEC)
+dumps = default_codec.dumps
+loads = default_codec.loads
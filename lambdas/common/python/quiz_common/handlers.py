@@ -0,0 +1,18 @@
+"""Import the Lambda handler modules in process: the API router, the benchmarks and the tests."""
+
+import importlib.util
+import os
+
+
+def import_handler(lambdas_root, package):
+    """Import `<lambdas_root>/<package>/handler.py` as a new module.
+
+    Every call executes the module again, so each copy has its own clients
+    and caches and reads the environment as it is at that moment.
+    """
+    spec = importlib.util.spec_from_file_location(
+        f'{package}_handler', os.path.join(lambdas_root, package, 'handler.py')
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,58 @@
+"""Leaderboard ordering shared by the storage backends and the leaderboard handlers.
+
+DynamoDB does not order index items with equal sort keys, so the
+`QuizID-Score-index` is sorted by `ScoreRank` rather than by `Score`: the
+score, inverted so that the best comes first, followed by the SubmissionID.
+Every entry therefore has its own place in the index, and entries from the
+index, snapshots and cursors are all ordered by the same key.
+"""
+
+from decimal import Decimal, localcontext
+
+LEADERBOARD_ENTRY_ATTRIBUTES = ('SubmissionID', 'Username', 'Score')
+
+# scores stay far below this (at most 100 points per question)
+RANK_SCORE_LIMIT = Decimal(10) ** 9
+# digits of the inverted score: 10 before the point and 12 after it
+RANK_SCORE_FORMAT = '023.12f'
+
+
+def score_rank(score, submission_id):
+    """The `ScoreRank` of a submission; ranks sort ascending in leaderboard order."""
+    with localcontext() as context:
+        context.prec = 40
+        inverted = RANK_SCORE_LIMIT - Decimal(str(score))
+        return f"{inverted:{RANK_SCORE_FORMAT}}#{submission_id}"
+
+
+def rank_score(rank):
+    """The score a `ScoreRank` was built from, to 12 decimal places."""
+    with localcontext() as context:
+        context.prec = 40
+        return RANK_SCORE_LIMIT - Decimal(rank.split('#', 1)[0])
+
+
+def leaderboard_order(item):
+    # highest score first, ties by SubmissionID, exactly as the index orders them
+    return score_rank(item['Score'], item['SubmissionID'])
+
+
+def leaderboard_entry(item):
+    return {attribute: item[attribute] for attribute in LEADERBOARD_ENTRY_ATTRIBUTES}
+
+
+def leaderboard_key(quiz_id, entry):
+    """The `QuizID-Score-index` key of an entry, as `LastEvaluatedKey` holds it."""
+    return {
+        'QuizID': quiz_id,
+        'ScoreRank': score_rank(entry['Score'], entry['SubmissionID']),
+        'SubmissionID': entry['SubmissionID'],
+    }
+
+
+def merge_leaderboards(entries, limit):
+    """Return the best `limit` entries, counting each SubmissionID once."""
+    unique = {}
+    for entry in entries:
+        unique.setdefault(entry['SubmissionID'], entry)
+    return sorted(unique.values(), key=leaderboard_order)[:limit]
@@ -0,0 +1,96 @@
+"""Quiz items as stored: the public representation and the storage format.
+
+`/getquiz` serves quizzes without their answers. The sanitized JSON body is
+built once when a version is written (by `create_quiz`, `update_quiz` and the
+write retries) and stored in its `PublicBody` attribute, so reads fetch only
+that attribute and return it verbatim. Quizzes written before the attribute
+was introduced are sanitized on read instead.
+
+Items are written in one of two storage formats, chosen with the
+`QUIZ_STORAGE_FORMAT` environment variable of the writers:
+
+- `map` (default): `Questions` is a list of maps and `PublicBody` a string;
+- `compressed`: both are binary attributes holding a format version byte
+  followed by the zlib-compressed JSON. DynamoDB charges for every byte of an
+  item, including the attribute names repeated in each question's map, so
+  this makes large quizzes several times cheaper to read and write and keeps
+  them further from the 400 KB item size limit.
+
+Readers accept both formats, so the format can be changed at any time;
+`bin/migrate_quiz_format.py` rewrites the existing items.
+"""
+
+import os
+import zlib
+
+from . import codec
+
+PUBLIC_BODY = 'PublicBody'
+# what /getquiz reads of a quiz item
+PUBLIC_ATTRIBUTES = ('QuizID', 'Version', PUBLIC_BODY)
+
+STORAGE_FORMATS = ('map', 'compressed')
+QUIZ_STORAGE_FORMAT = os.environ.get('QUIZ_STORAGE_FORMAT', 'map')
+# first byte of a compressed attribute; a new encoding gets a new version
+COMPRESSED_V1 = 1
+
+
+def compress(text):
+    return bytes([COMPRESSED_V1]) + zlib.compress(text.encode(), 9)
+
+
+def decompress(data):
+    # boto3 returns binary attributes wrapped in a `Binary`
+    data = bytes(getattr(data, 'value', data))
+    if not data or data[0] != COMPRESSED_V1:
+        raise ValueError(f'Unknown compressed attribute format {data[:1]!r}')
+    return zlib.decompress(data[1:]).decode()
+
+
+def quiz_questions(quiz):
+    """The questions of a quiz item in either storage format."""
+    questions = quiz['Questions']
+    if isinstance(questions, list):
+        return questions
+    return codec.loads(decompress(questions))
+
+
+def stored_public_body(quiz):
+    """The stored public body of a quiz item as a string, or None if it has none."""
+    body = quiz.get(PUBLIC_BODY)
+    if body is None or isinstance(body, str):
+        return body
+    return decompress(body)
+
+
+def stored_quiz(quiz, storage_format=None):
+    """A copy of a quiz item to write, with its questions and public body in `storage_format`."""
+    storage_format = storage_format or QUIZ_STORAGE_FORMAT
+    if storage_format not in STORAGE_FORMATS:
+        raise ValueError(f"Unknown quiz storage format '{storage_format}', expected 'map' or 'compressed'")
+    item = dict(quiz, Questions=quiz_questions(quiz))
+    if PUBLIC_BODY in item:
+        item[PUBLIC_BODY] = stored_public_body(item)
+    if storage_format == 'compressed':
+        item['Questions'] = compress(codec.dumps(item['Questions']))
+        if PUBLIC_BODY in item:
+            item[PUBLIC_BODY] = compress(item[PUBLIC_BODY])
+    return item
+
+
+def public_body(quiz):
+    """The /getquiz response body for a quiz item: everything but the answers."""
+    public = {name: value for name, value in quiz.items() if name != PUBLIC_BODY}
+    # quizzes created before versioning was introduced are implicitly version 1
+    public['Version'] = int(quiz.get('Version', 1))
+    public['Questions'] = [
+        {name: value for name, value in question.items() if name != 'CorrectAnswer'}
+        for question in quiz_questions(quiz)
+    ]
+    return codec.dumps(public)
+
+
+def with_public_body(quiz):
+    """Store the public body of a quiz item in the item itself."""
+    quiz[PUBLIC_BODY] = public_body(quiz)
+    return quiz
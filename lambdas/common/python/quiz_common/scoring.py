@@ -0,0 +1,205 @@
+"""Scoring rules shared by the queue-driven `scoring` function and inline scoring in `submit_quiz`."""
+
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from decimal import Decimal, localcontext
+
+from .leaderboard import score_rank
+from .quizzes import quiz_questions
+
+# Scored submissions expire after this many days and are then archived by the
+# DynamoDB TTL stream (see archive_submissions); 0 keeps them forever
+SUBMISSION_RETENTION_DAYS = int(os.environ.get('SUBMISSION_RETENTION_DAYS', '0'))
+
+
+def quiz_version(quiz):
+    # quizzes created before versioning was introduced are implicitly version 1
+    return int(quiz.get('Version', 1))
+
+
+def now_iso():
+    # ISO-8601 in UTC so that it sorts chronologically as a string
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds')
+
+
+# what an answer key is built from; skips the quiz's stored public body
+ANSWER_KEY_ATTRIBUTES = ('QuizID', 'Version', 'Questions', 'EnableTimer', 'TimerSeconds')
+
+
+def answer_key(quiz):
+    return {
+        'CorrectAnswers': [q['CorrectAnswer'] for q in quiz_questions(quiz)],
+        # the stored answers are indices into these (see compact_answers)
+        'Options': [q.get('Options', []) for q in quiz_questions(quiz)],
+        'EnableTimer': quiz.get('EnableTimer', False),
+        'TimerSeconds': quiz.get('TimerSeconds', None),
+    }
+
+
+class AnswerKeyCache:
+    """Answer keys keyed by (QuizID, Version).
+
+    A version is never modified once written, so entries stay valid for the
+    container lifetime; the oldest entry is evicted once `max_entries` is reached.
+    The cache may be shared by threads; concurrent misses for the same version
+    each read it.
+    """
+
+    def __init__(self, storage, max_entries):
+        self.storage = storage
+        self.max_entries = max_entries
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, quiz):
+        key = answer_key(quiz)
+        with self.lock:
+            if len(self.entries) >= self.max_entries:
+                self.entries.pop(next(iter(self.entries)))
+            self.entries[(quiz['QuizID'], quiz_version(quiz))] = key
+        return key
+
+    def get(self, quiz_id, version):
+        """Return (version, answer key) for a quiz, or (version, None) if it does not exist.
+
+        Without a version the current one is used, e.g. for messages enqueued
+        before versioning.
+        """
+        if version is not None:
+            key = self.entries.get((quiz_id, version))
+            if key is not None:
+                return version, key
+        # the requested version is most likely the current one
+        quiz = self.storage.quizzes.get_quiz(quiz_id, attributes=ANSWER_KEY_ATTRIBUTES)
+        if quiz is not None:
+            if version is None or quiz_version(quiz) == version:
+                return quiz_version(quiz), self.add(quiz)
+        if version is None:
+            return None, None
+        quiz = self.storage.quizzes.get_quiz_version(quiz_id, version, attributes=ANSWER_KEY_ATTRIBUTES)
+        if quiz is None:
+            return version, None
+        return version, self.add(quiz)
+
+    def warm_up(self, quiz_ids):
+        for quiz in self.storage.quizzes.batch_get_quizzes(quiz_ids, attributes=ANSWER_KEY_ATTRIBUTES):
+            self.add(quiz)
+
+
+def score_answers(key, user_answers):
+    """Score answers of the form {"<question index>": {"Answer": ..., "TimeTaken": ...}}.
+
+    Correct answers earn 100 points, scaled down linearly with the time taken
+    when the quiz has a timer; answers after the timer ran out earn nothing.
+    """
+    enable_timer = key['EnableTimer']
+    timer_seconds = key['TimerSeconds']
+
+    with localcontext() as context:
+        context.prec = 6
+        score = Decimal('0.0')
+        for idx, correct in enumerate(key['CorrectAnswers']):
+            user_answer_data = user_answers.get(str(idx))
+            if user_answer_data is None:
+                continue
+            if str(user_answer_data['Answer']) != str(correct):
+                continue
+            time_taken = Decimal(str(user_answer_data['TimeTaken']))
+            if enable_timer and timer_seconds is not None:
+                timer_seconds_decimal = Decimal(str(timer_seconds))
+                if time_taken > timer_seconds_decimal:
+                    question_score = Decimal('0.0')
+                else:
+                    max_score = Decimal('100.0')
+                    question_score = max_score * (Decimal('1.0') - (time_taken / timer_seconds_decimal))
+                    if question_score < Decimal('0.0'):
+                        question_score = Decimal('0.0')
+            else:
+                question_score = Decimal('100.0')
+            score += question_score
+    return score
+
+
+def compact_answers(key, user_answers):
+    """Encode answers for storage as two lists indexed by question.
+
+    `AnswerChoices` holds the index of the chosen option, or the answer itself
+    when it is not one of the options (e.g. the empty answer sent when the
+    timer runs out), and `AnswerMillis` the time taken in whole milliseconds;
+    both are null for unanswered questions. This is a fraction of the size of
+    the `{"<question index>": {"Answer": ..., "TimeTaken": ...}}` map.
+    """
+    options = key.get('Options') or []
+    count = max((int(idx) + 1 for idx in user_answers), default=0)
+    choices, millis = [None] * count, [None] * count
+    for idx, answer in user_answers.items():
+        idx = int(idx)
+        value = str(answer['Answer'])
+        question_options = options[idx] if idx < len(options) else []
+        choices[idx] = question_options.index(value) if value in question_options else value
+        millis[idx] = int((Decimal(str(answer['TimeTaken'])) * 1000).to_integral_value())
+    return {'AnswerChoices': choices, 'AnswerMillis': millis}
+
+
+def expand_answers(item, key):
+    """The `UserAnswers` map of a stored submission, as it was submitted.
+
+    Submissions scored before answers were compacted store the map itself.
+    Without the answer key, e.g. once the quiz is deleted, option indices
+    are returned in place of the answers.
+    """
+    if 'UserAnswers' in item:
+        return item['UserAnswers']
+    options = (key or {}).get('Options') or []
+    user_answers = {}
+    for idx, (choice, millis) in enumerate(zip(item.get('AnswerChoices', []), item.get('AnswerMillis', []))):
+        if millis is None:
+            continue
+        if not isinstance(choice, str) and idx < len(options) and int(choice) < len(options[idx]):
+            choice = options[idx][int(choice)]
+        user_answers[str(idx)] = {'Answer': choice, 'TimeTaken': Decimal(int(millis)) / 1000}
+    return user_answers
+
+
+def scored_submission(submission, version, key):
+    """Build the `UserSubmissions` item for a submission message."""
+    item = {
+        'SubmissionID': submission['SubmissionID'],
+        'Username': submission['Username'],
+        'QuizID': submission['QuizID'],
+        'QuizVersion': version,
+        # messages enqueued before SubmittedAt was introduced are stamped on scoring
+        'SubmittedAt': submission.get('SubmittedAt') or now_iso(),
+        'Score': score_answers(key, submission['Answers']),
+        'TotalQuestions': Decimal(len(key['CorrectAnswers'])),
+        **compact_answers(key, submission['Answers']),
+    }
+    item['ScoreRank'] = score_rank(item['Score'], item['SubmissionID'])
+    if SUBMISSION_RETENTION_DAYS > 0:
+        item['ExpiresAt'] = int(time.time()) + SUBMISSION_RETENTION_DAYS * 86400
+    return item
+
+
+def email_input(item, email, correlation_id=None, scored_at=None):
+    """Input of the email notification workflow for a scored submission.
+
+    With `scored_at` (epoch milliseconds) the workflow records how long the
+    email took as the ScoredToEmailedLatency metric.
+    """
+    payload = {
+        'SubmissionID': item['SubmissionID'],
+        'Username': item['Username'],
+        'Email': email,
+        'Score': float(item['Score']),
+        'TotalQuestions': int(item['TotalQuestions']),
+    }
+    if correlation_id:
+        payload['CorrelationId'] = correlation_id
+    if scored_at:
+        payload['ScoredAt'] = scored_at
+    return payload
@@ -0,0 +1,201 @@
+"""Inverted index over public quizzes, answering /searchquizzes.
+
+The index is a single blob: gzip-compressed JSON holding the indexed quizzes
+as a list of [QuizID, Title] and, per field and term, the ascending
+positions of the quizzes that contain the term, delta-encoded. Titles are
+always indexed; question texts only if the indexer is asked to.
+
+Quizzes are appended as they are created. A changed quiz is appended again
+and its old position becomes a tombstone (null), as does a quiz that is made
+private; `compact` renumbers the positions once tombstones make up a quarter
+of them. Later positions are quizzes created or changed more recently, and
+results are returned in that order, newest first.
+"""
+
+import bisect
+import gzip
+import heapq
+import re
+from array import array
+from itertools import accumulate
+
+from . import codec
+from .quizzes import quiz_questions
+
+FORMAT_VERSION = 1
+FIELDS = ('Titles', 'Questions')
+# longer words are indexed and searched by their first characters only
+MAX_TERM_LENGTH = 24
+MAX_QUERY_TERMS = 8
+COMPACT_RATIO = 0.25
+
+_WORD = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return [word[:MAX_TERM_LENGTH] for word in _WORD.findall(text.casefold())]
+
+
+def _deltas(positions):
+    return [positions[0]] + [b - a for a, b in zip(positions, positions[1:])]
+
+
+def _contains(positions, position):
+    i = bisect.bisect_left(positions, position)
+    return i < len(positions) and positions[i] == position
+
+
+def _newest_first(postings):
+    """Merge ascending posting lists into one descending stream without duplicates."""
+    previous = None
+    for position in heapq.merge(*(reversed(p) for p in postings), reverse=True):
+        if position != previous:
+            previous = position
+            yield position
+
+
+class SearchIndex:
+    def __init__(self, docs=None, postings=None):
+        self.docs = docs if docs is not None else []
+        # field -> term -> ascending positions
+        self.postings = postings if postings is not None else {field: {} for field in FIELDS}
+        self.positions = {doc[0]: position for position, doc in enumerate(self.docs) if doc is not None}
+        self.removed = len(self.docs) - len(self.positions)
+        # field -> sorted terms, for prefix lookups; rebuilt after new terms are added
+        self._sorted_terms = {field: sorted(terms) for field, terms in self.postings.items()}
+
+    def __len__(self):
+        return len(self.positions)
+
+    @classmethod
+    def from_blob(cls, blob):
+        document = codec.loads(gzip.decompress(blob))
+        if document.get('Format') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported search index format {document.get('Format')}")
+        postings = {
+            field: {term: array('I', accumulate(deltas)) for term, deltas in document[field].items()}
+            for field in FIELDS
+        }
+        return cls(document['Docs'], postings)
+
+    def to_blob(self):
+        document = {'Format': FORMAT_VERSION, 'Docs': self.docs}
+        for field in FIELDS:
+            document[field] = {term: _deltas(positions) for term, positions in self.postings[field].items()}
+        return gzip.compress(codec.dumps(document).encode(), compresslevel=6)
+
+    def remove(self, quiz_id):
+        position = self.positions.pop(quiz_id, None)
+        if position is not None:
+            self.docs[position] = None
+            self.removed += 1
+
+    def add(self, quiz, include_questions=False):
+        """Index the current version of a quiz; a private quiz is removed instead."""
+        quiz_id = quiz['QuizID']
+        if quiz.get('Visibility') != 'Public':
+            self.remove(quiz_id)
+            return
+        doc = [quiz_id, quiz['Title']]
+        position = self.positions.get(quiz_id)
+        # question texts are not kept in the index, so changes to them cannot be detected
+        if position is not None and self.docs[position] == doc and not include_questions:
+            return
+        self.remove(quiz_id)
+
+        position = len(self.docs)
+        self.docs.append(doc)
+        self.positions[quiz_id] = position
+        self._append('Titles', set(tokenize(quiz['Title'])), position)
+        if include_questions:
+            terms = set()
+            for question in quiz_questions(quiz) if 'Questions' in quiz else []:
+                terms.update(tokenize(question.get('QuestionText', '')))
+            self._append('Questions', terms, position)
+
+    def _append(self, field, terms, position):
+        postings = self.postings[field]
+        for term in terms:
+            positions = postings.get(term)
+            if positions is None:
+                postings[term] = array('I', [position])
+                self._sorted_terms.pop(field, None)
+            else:
+                positions.append(position)
+
+    def compact(self, force=False):
+        """Drop tombstones and renumber positions; returns True if anything changed."""
+        if not self.removed or (not force and self.removed < COMPACT_RATIO * len(self.docs)):
+            return False
+        renumbered = {}
+        docs = []
+        for position, doc in enumerate(self.docs):
+            if doc is not None:
+                renumbered[position] = len(docs)
+                docs.append(doc)
+        postings = {}
+        for field in FIELDS:
+            postings[field] = {}
+            for term, positions in self.postings[field].items():
+                kept = array('I', (renumbered[p] for p in positions if p in renumbered))
+                if kept:
+                    postings[field][term] = kept
+        self.__init__(docs, postings)
+        return True
+
+    def _prefixed(self, field, prefix):
+        terms = self._sorted_terms.get(field)
+        if terms is None:
+            terms = self._sorted_terms[field] = sorted(self.postings[field])
+        start = bisect.bisect_left(terms, prefix)
+        end = bisect.bisect_left(terms, prefix + '\U0010ffff')
+        postings = self.postings[field]
+        return [postings[term] for term in terms[start:end]]
+
+    def search(self, query, limit=20, include_questions=False):
+        """Return [QuizID, Title] of up to `limit` quizzes matching every word of `query`, newest first.
+
+        The last word also matches as a prefix, unless the query ends with a space.
+        """
+        words = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+        if not words or limit <= 0:
+            return []
+        fields = FIELDS if include_questions else ('Titles',)
+        prefix = None if query[-1:].isspace() else words.pop()
+
+        # each word becomes a group of posting lists, any of which may hold a match
+        groups = []
+        for word in words:
+            group = [self.postings[field][word] for field in fields if word in self.postings[field]]
+            if not group:
+                return []
+            groups.append(group)
+        prefix_group = None
+        if prefix is not None:
+            prefix_group = [positions for field in fields for positions in self._prefixed(field, prefix)]
+            if not prefix_group:
+                return []
+            groups.append(prefix_group)
+
+        # walk the smallest group newest first and check the others for each position
+        groups.sort(key=lambda group: sum(len(positions) for positions in group))
+        driver, others = groups[0], groups[1:]
+        checks = []
+        for group in others:
+            if group is not prefix_group:
+                checks.append(lambda position, doc, group=group: any(_contains(p, position) for p in group))
+            elif not include_questions:
+                # a prefix can match thousands of terms; the title tells directly
+                checks.append(lambda position, doc: any(word.startswith(prefix) for word in tokenize(doc[1])))
+            else:
+                matching = set().union(*group)
+                checks.append(lambda position, doc: position in matching)
+
+        results = []
+        for position in _newest_first(driver):
+            doc = self.docs[position]
+            if doc is not None and all(check(position, doc) for check in checks):
+                results.append(doc)
+                if len(results) == limit:
+                    break
+        return results
@@ -0,0 +1,64 @@
+"""Storage layer shared by the Lambda handlers.
+
+The backend is chosen with the `STORAGE_BACKEND` environment variable:
+`dynamodb` (default, the deployed tables and queues), `memory`, or `sqlite`
+(stored at `STORAGE_SQLITE_PATH`). Handlers call `get_storage()` at import
+time; the instance is shared by every handler loaded in the same process.
+"""
+
+import os
+
+from .base import (
+    LeaderboardReader,
+    LeaderboardSnapshotStore,
+    QueuePublisher,
+    QuizStore,
+    SearchIndexStore,
+    Storage,
+    SubmissionStore,
+    TournamentStore,
+)
+
+_storage = None
+
+
+def create_storage(backend=None, sqlite_path=None):
+    backend = backend or os.environ.get('STORAGE_BACKEND', 'dynamodb')
+    if backend == 'dynamodb':
+        from . import dynamodb
+        return dynamodb.create_storage()
+    if backend == 'memory':
+        from . import memory
+        return memory.create_storage()
+    if backend == 'sqlite':
+        from . import sqlite
+        return sqlite.create_storage(sqlite_path or os.environ.get('STORAGE_SQLITE_PATH', 'quiz_app.sqlite3'))
+    raise ValueError(f"Unknown storage backend '{backend}', expected 'dynamodb', 'memory' or 'sqlite'")
+
+
+def get_storage():
+    global _storage
+    if _storage is None:
+        _storage = create_storage()
+    return _storage
+
+
+def set_storage(storage):
+    """Replace the process-wide storage, e.g. with an in-memory one for benchmarks."""
+    global _storage
+    _storage = storage
+
+
+__all__ = [
+    'LeaderboardReader',
+    'LeaderboardSnapshotStore',
+    'QueuePublisher',
+    'QuizStore',
+    'SearchIndexStore',
+    'Storage',
+    'SubmissionStore',
+    'TournamentStore',
+    'create_storage',
+    'get_storage',
+    'set_storage',
+]
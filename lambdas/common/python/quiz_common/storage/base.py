@@ -0,0 +1,219 @@
+"""Interfaces of the storage layer used by the Lambda handlers.
+
+Every backend keeps DynamoDB's semantics: numbers come back as `Decimal`,
+floats are rejected on write, items are returned as copies, and leaderboards
+are ordered by score, highest first and ties by SubmissionID, like the
+`QuizID-Score-index` GSI.
+"""
+
+import abc
+
+# Attributes projected into the `Username-SubmittedAt-index` GSI
+USER_HISTORY_ATTRIBUTES = (
+    'SubmissionID', 'Username', 'SubmittedAt', 'QuizID', 'QuizVersion', 'Score', 'TotalQuestions',
+)
+
+
+class QuizStore(abc.ABC):
+    """Current quiz versions (`Quizzes`) and superseded ones (`QuizVersions`)."""
+
+    @abc.abstractmethod
+    def get_quiz(self, quiz_id, attributes=None, consistent=False):
+        """Return the current version of a quiz, or None."""
+
+    @abc.abstractmethod
+    def get_quiz_version(self, quiz_id, version, attributes=None):
+        """Return a superseded version of a quiz, or None."""
+
+    @abc.abstractmethod
+    def batch_get_quizzes(self, quiz_ids, attributes=None):
+        """Return the current versions of up to 100 quizzes, skipping missing ones."""
+
+    @abc.abstractmethod
+    def put_quiz(self, item):
+        """Create or overwrite the current version of a quiz."""
+
+    @abc.abstractmethod
+    def put_quiz_if_absent(self, item):
+        """Create a quiz; returns False without writing if its QuizID is already taken.
+
+        Versions after the first are only written by `replace_quiz`, so a late
+        retry of a create can never overwrite them.
+        """
+
+    @abc.abstractmethod
+    def replace_quiz(self, updated, superseded, expected_version):
+        """Atomically archive `superseded` and make `updated` the current version.
+
+        Returns False without writing anything if the current version is no
+        longer `expected_version`.
+        """
+
+    @abc.abstractmethod
+    def list_public_quizzes(self):
+        """Return QuizID, Title and Visibility of every public quiz."""
+
+
+class SubmissionStore(abc.ABC):
+    """Scored submissions (`UserSubmissions`), submission idempotency keys and admission token buckets."""
+
+    @abc.abstractmethod
+    def get_submission(self, submission_id):
+        """Return a scored submission, or None."""
+
+    @abc.abstractmethod
+    def put_submission_if_absent(self, item):
+        """Store a scored submission; returns False if it was already stored."""
+
+    @abc.abstractmethod
+    def list_user_submissions(self, username, limit, start_key=None):
+        """Return a page of a user's submissions, newest first, as (items, last_key).
+
+        Items carry the `USER_HISTORY_ATTRIBUTES` only. `last_key` is None on
+        the last page, otherwise it is passed back as `start_key` to continue.
+        """
+
+    @abc.abstractmethod
+    def claim_idempotency_key(self, key, submission_id, ttl_seconds):
+        """Claim a key for a submission for `ttl_seconds`.
+
+        Returns (submission_id, is_new); if the key is already claimed, the
+        SubmissionID that owns it is returned with is_new=False.
+        """
+
+    @abc.abstractmethod
+    def get_idempotency_key(self, key):
+        """Return the SubmissionID that owns a claimed, unexpired key, or None; claims nothing."""
+
+    @abc.abstractmethod
+    def release_idempotency_key(self, key):
+        """Forget a claimed key so that a retry can claim it again."""
+
+    @abc.abstractmethod
+    def take_admission_token(self, bucket_key, interval, burst):
+        """Take a token from a bucket of `burst` tokens refilled every `interval` ms (see quiz_common.admission).
+
+        Returns 0 if a token was taken, otherwise the milliseconds until one is available.
+        """
+
+    @abc.abstractmethod
+    def return_admission_token(self, bucket_key, interval):
+        """Put back a token taken with `take_admission_token` for a submission that was turned away."""
+
+
+class LeaderboardReader(abc.ABC):
+    """Read side of the `QuizID-Score-index` GSI, sorted by `ScoreRank` (see quiz_common.leaderboard)."""
+
+    @abc.abstractmethod
+    def top(self, quiz_id, limit):
+        """Return up to `limit` submissions of a quiz, highest score first."""
+
+    @abc.abstractmethod
+    def page(self, quiz_id, limit, start_key=None, reverse=False):
+        """Return up to `limit` leaderboard entries after `start_key`, as (entries, last_key).
+
+        Entries carry the `LEADERBOARD_ENTRY_ATTRIBUTES` only and are read in
+        leaderboard order from the entry at `start_key` (an index key, see
+        `leaderboard_key`), which need not exist anymore. With `reverse` the
+        entries ranked above it are read instead, nearest first. `last_key` is
+        None once there are no more entries.
+        """
+
+
+class LeaderboardSnapshotStore(abc.ABC):
+    """Final leaderboards of archived submissions (`LeaderboardSnapshots`)."""
+
+    @abc.abstractmethod
+    def get_snapshot(self, quiz_id):
+        """Return the snapshot entries of a quiz, highest score first, or an empty list."""
+
+    @abc.abstractmethod
+    def merge_snapshot(self, quiz_id, entries, size):
+        """Merge leaderboard entries into a quiz's snapshot, keeping the best `size`."""
+
+
+class QueuePublisher(abc.ABC):
+    """Asynchronous hand-offs: the submission queue, failed writes and emails."""
+
+    def prepare(self):
+        """Resolve anything needed to publish, e.g. queue URLs. Used by warm-up."""
+
+    @abc.abstractmethod
+    def publish_submission(self, message, attributes=None):
+        """Enqueue a submission for scoring, with optional message attributes (name -> string)."""
+
+    @abc.abstractmethod
+    def submission_backlog(self):
+        """Return the approximate number of submissions waiting to be scored."""
+
+    @abc.abstractmethod
+    def publish_failed_write(self, message):
+        """Hand a failed quiz write over to the retry path."""
+
+    @abc.abstractmethod
+    def start_email(self, payload):
+        """Start the email notification workflow for a scored submission.
+
+        Idempotent per `SubmissionID`: starting it again for the same submission does nothing.
+        """
+
+
+class SearchIndexStore(abc.ABC):
+    """The quiz search index: one blob, always replaced as a whole (see quiz_common.search)."""
+
+    @abc.abstractmethod
+    def get_index_version(self):
+        """Return the version tag of the stored index, or None if there is none yet."""
+
+    @abc.abstractmethod
+    def get_index(self):
+        """Return (version tag, blob), or (None, None) if there is no index yet."""
+
+    @abc.abstractmethod
+    def put_index(self, blob, expected_version):
+        """Replace the index if its version tag is still `expected_version` (None: no index yet).
+
+        Returns False without writing anything if another writer replaced it first.
+        """
+
+
+class TournamentStore(abc.ABC):
+    """Tournament definitions (`Tournaments`) and the running scores of aggregated ones (`TournamentScores`)."""
+
+    @abc.abstractmethod
+    def get_tournament(self, tournament_id):
+        """Return a tournament definition, or None."""
+
+    @abc.abstractmethod
+    def put_tournament(self, item):
+        """Store a new tournament definition."""
+
+    @abc.abstractmethod
+    def list_aggregated_tournaments(self):
+        """Return the definitions of every tournament created with `Aggregated`."""
+
+    @abc.abstractmethod
+    def record_score(self, tournament, username, quiz_id, score):
+        """Raise a player's score in one quiz of an aggregated tournament to `score`.
+
+        Lower scores leave the player unchanged, so a submission may be
+        recorded more than once. The player's tournament score is combined
+        again with the tournament's rule.
+        """
+
+    @abc.abstractmethod
+    def top_scores(self, tournament_id, limit):
+        """Return up to `limit` players of an aggregated tournament as {'Username', 'Score'}, highest first."""
+
+
+class Storage:
+    """The set of stores a handler works with."""
+
+    def __init__(self, quizzes, submissions, leaderboard, snapshots, publisher, search_index, tournaments):
+        self.quizzes = quizzes
+        self.submissions = submissions
+        self.leaderboard = leaderboard
+        self.snapshots = snapshots
+        self.publisher = publisher
+        self.search_index = search_index
+        self.tournaments = tournaments
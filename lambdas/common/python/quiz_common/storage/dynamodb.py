@@ -0,0 +1,539 @@
+"""Storage backed by the DynamoDB tables, SQS, SNS, Step Functions and S3."""
+
+import os
+import threading
+import time
+
+import boto3
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError, ParamValidationError
+
+from .. import admission, codec
+from ..leaderboard import LEADERBOARD_ENTRY_ATTRIBUTES, merge_leaderboards
+from ..tournament import tournament_score
+from .base import (
+    USER_HISTORY_ATTRIBUTES,
+    LeaderboardReader,
+    LeaderboardSnapshotStore,
+    QueuePublisher,
+    QuizStore,
+    SearchIndexStore,
+    Storage,
+    SubmissionStore,
+    TournamentStore,
+)
+
+QUIZZES_TABLE = 'Quizzes'
+QUIZ_VERSIONS_TABLE = 'QuizVersions'
+SUBMISSIONS_TABLE = 'UserSubmissions'
+IDEMPOTENCY_TABLE = 'SubmissionIdempotency'
+ADMISSION_TABLE = 'SubmissionRateLimits'
+SNAPSHOTS_TABLE = 'LeaderboardSnapshots'
+TOURNAMENTS_TABLE = 'Tournaments'
+TOURNAMENT_SCORES_TABLE = 'TournamentScores'
+# every table the stores use, for tools that grant access to them
+TABLES = (
+    QUIZZES_TABLE, QUIZ_VERSIONS_TABLE, SUBMISSIONS_TABLE, IDEMPOTENCY_TABLE,
+    ADMISSION_TABLE, SNAPSHOTS_TABLE, TOURNAMENTS_TABLE, TOURNAMENT_SCORES_TABLE,
+)
+TOURNAMENT_RANK_INDEX = 'TournamentID-Score-index'
+LEADERBOARD_INDEX = 'QuizID-Score-index'
+USER_HISTORY_INDEX = 'Username-SubmittedAt-index'
+SUBMISSION_QUEUE = 'QuizSubmissionQueue'
+FAILED_WRITES_TOPIC_ARN = 'arn:aws:sns:us-east-1:000000000000:QuizzesWriteFailures'
+EMAIL_STATE_MACHINE_ARN = 'arn:aws:states:us-east-1:000000000000:stateMachine:SendEmailStateMachine'
+SEARCH_INDEX_BUCKET = os.environ.get('SEARCH_INDEX_BUCKET', 'quiz-app-search-index')
+SEARCH_INDEX_KEY = 'quizzes/index.json.gz'
+
+
+def projection(attributes):
+    """Build ProjectionExpression arguments, aliasing names such as the reserved word `Version`."""
+    if not attributes:
+        return {}
+    names = {f'#p{index}': attribute for index, attribute in enumerate(attributes)}
+    return {
+        'ProjectionExpression': ', '.join(names),
+        'ExpressionAttributeNames': names,
+    }
+
+
+def is_condition_failure(error):
+    return error.response['Error']['Code'] in ('ConditionalCheckFailedException', 'TransactionCanceledException')
+
+
+class ThreadLocalDynamoDB:
+    """The DynamoDB resource of the calling thread.
+
+    boto3 resources and their Table objects are not thread-safe, and the
+    scoring handler uses the stores from a thread pool. Each thread
+    therefore gets a resource (from a session of its own) on first use;
+    attributes and tables are looked up on it per call.
+    """
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def resource(self):
+        resource = getattr(self.local, 'resource', None)
+        if resource is None:
+            resource = self.local.resource = boto3.session.Session().resource('dynamodb')
+            self.local.tables = {}
+        return resource
+
+    def table(self, name):
+        resource = self.resource()
+        table = self.local.tables.get(name)
+        if table is None:
+            table = self.local.tables[name] = resource.Table(name)
+        return table
+
+    def Table(self, name):
+        return ThreadLocalTable(self, name)
+
+    def __getattr__(self, name):
+        return getattr(self.resource(), name)
+
+
+class ThreadLocalTable:
+    """A table name bound to `ThreadLocalDynamoDB`; calls go to the calling thread's Table."""
+
+    def __init__(self, dynamodb, name):
+        self.dynamodb = dynamodb
+        self.name = name
+
+    def __getattr__(self, name):
+        return getattr(self.dynamodb.table(self.name), name)
+
+
+class DynamoDBQuizStore(QuizStore):
+    def __init__(self, dynamodb):
+        self.dynamodb = dynamodb
+        self.table = dynamodb.Table(QUIZZES_TABLE)
+        self.versions_table = dynamodb.Table(QUIZ_VERSIONS_TABLE)
+
+    def get_quiz(self, quiz_id, attributes=None, consistent=False):
+        response = self.table.get_item(
+            Key={'QuizID': quiz_id}, ConsistentRead=consistent, **projection(attributes)
+        )
+        return response.get('Item')
+
+    def get_quiz_version(self, quiz_id, version, attributes=None):
+        response = self.versions_table.get_item(
+            Key={'QuizID': quiz_id, 'Version': version}, **projection(attributes)
+        )
+        return response.get('Item')
+
+    def batch_get_quizzes(self, quiz_ids, attributes=None):
+        quiz_ids = list(dict.fromkeys(quiz_ids))[:100]
+        if not quiz_ids:
+            return []
+        # Best effort: a single round trip, unprocessed keys are not retried
+        response = self.dynamodb.batch_get_item(RequestItems={
+            QUIZZES_TABLE: {
+                'Keys': [{'QuizID': quiz_id} for quiz_id in quiz_ids],
+                **projection(attributes),
+            }
+        })
+        return response.get('Responses', {}).get(QUIZZES_TABLE, [])
+
+    def put_quiz(self, item):
+        self.table.put_item(Item=item)
+
+    def put_quiz_if_absent(self, item):
+        try:
+            self.table.put_item(Item=item, ConditionExpression='attribute_not_exists(QuizID)')
+        except ClientError as e:
+            if is_condition_failure(e):
+                return False
+            raise
+        return True
+
+    def replace_quiz(self, updated, superseded, expected_version):
+        if expected_version == 1:
+            # quizzes created before versioning have no Version attribute
+            condition = 'attribute_not_exists(#version) OR #version = :expected'
+        else:
+            condition = '#version = :expected'
+        try:
+            # the resource's client accepts plain Python values like Table.put_item
+            self.dynamodb.meta.client.transact_write_items(TransactItems=[
+                {
+                    'Put': {
+                        'TableName': QUIZ_VERSIONS_TABLE,
+                        'Item': superseded,
+                        'ConditionExpression': 'attribute_not_exists(QuizID)',
+                    }
+                },
+                {
+                    'Put': {
+                        'TableName': QUIZZES_TABLE,
+                        'Item': updated,
+                        'ConditionExpression': condition,
+                        'ExpressionAttributeNames': {'#version': 'Version'},
+                        'ExpressionAttributeValues': {':expected': expected_version},
+                    }
+                },
+            ])
+        except ClientError as e:
+            if is_condition_failure(e):
+                return False
+            raise
+        return True
+
+    def list_public_quizzes(self):
+        kwargs = {
+            'FilterExpression': Attr('Visibility').eq('Public'),
+            'ProjectionExpression': 'QuizID, Title, Visibility',
+        }
+        quizzes = []
+        while True:
+            response = self.table.scan(**kwargs)
+            quizzes.extend(response.get('Items', []))
+            if 'LastEvaluatedKey' not in response:
+                return quizzes
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+class DynamoDBSubmissionStore(SubmissionStore):
+    def __init__(self, dynamodb):
+        self.table = dynamodb.Table(SUBMISSIONS_TABLE)
+        self.idempotency_table = dynamodb.Table(IDEMPOTENCY_TABLE)
+        self.admission_table = dynamodb.Table(ADMISSION_TABLE)
+
+    def get_submission(self, submission_id):
+        return self.table.get_item(Key={'SubmissionID': submission_id}).get('Item')
+
+    def put_submission_if_absent(self, item):
+        try:
+            self.table.put_item(Item=item, ConditionExpression='attribute_not_exists(SubmissionID)')
+        except ClientError as e:
+            if is_condition_failure(e):
+                return False
+            raise
+        return True
+
+    def list_user_submissions(self, username, limit, start_key=None):
+        kwargs = {
+            'IndexName': USER_HISTORY_INDEX,
+            'KeyConditionExpression': Key('Username').eq(username),
+            'ScanIndexForward': False,
+            'Limit': limit,
+            **projection(USER_HISTORY_ATTRIBUTES),
+        }
+        if start_key:
+            kwargs['ExclusiveStartKey'] = start_key
+        response = self.table.query(**kwargs)
+        return response.get('Items', []), response.get('LastEvaluatedKey')
+
+    def claim_idempotency_key(self, key, submission_id, ttl_seconds):
+        while True:
+            now = int(time.time())
+            try:
+                self.idempotency_table.put_item(
+                    Item={
+                        'IdempotencyKey': key,
+                        'SubmissionID': submission_id,
+                        'ExpiresAt': now + ttl_seconds,
+                    },
+                    # TTL deletion is lazy, so treat expired records as free to reclaim
+                    ConditionExpression='attribute_not_exists(IdempotencyKey) OR ExpiresAt < :now',
+                    ExpressionAttributeValues={':now': now},
+                )
+                return submission_id, True
+            except ClientError as e:
+                if not is_condition_failure(e):
+                    raise
+            existing = self.idempotency_table.get_item(
+                Key={'IdempotencyKey': key}, ConsistentRead=True
+            ).get('Item')
+            if existing is not None:
+                return existing['SubmissionID'], False
+            # The record was removed between our write and read, so try to claim it again
+
+    def get_idempotency_key(self, key):
+        existing = self.idempotency_table.get_item(Key={'IdempotencyKey': key}, ConsistentRead=True).get('Item')
+        # TTL deletion is lazy, so an expired record is no claim
+        if existing is not None and existing['ExpiresAt'] >= int(time.time()):
+            return existing['SubmissionID']
+        return None
+
+    def release_idempotency_key(self, key):
+        self.idempotency_table.delete_item(Key={'IdempotencyKey': key})
+
+    def _update_bucket(self, bucket_key, update, condition, values):
+        """Apply a conditional update to a bucket; returns (applied, FullAt it failed on or None)."""
+        try:
+            self.admission_table.update_item(
+                Key={'BucketKey': bucket_key},
+                UpdateExpression=update,
+                ConditionExpression=condition,
+                ExpressionAttributeValues=values,
+                ReturnValuesOnConditionCheckFailure='ALL_OLD',
+            )
+        except ClientError as e:
+            if not is_condition_failure(e):
+                raise
+            # the item of an error is in the wire format; LocalStack may leave it out
+            full_at = (e.response.get('Item') or {}).get('FullAt')
+            return False, int(full_at['N']) if full_at else None
+        return True, None
+
+    def take_admission_token(self, bucket_key, interval, burst):
+        # the two cases of admission.take, each a single conditional update; a
+        # concurrent request can move the bucket from one case to the other
+        for _ in range(3):
+            now = int(time.time() * 1000)
+            latest = admission.latest_full_at(now, interval, burst)
+            expires_at = admission.expires_at(now, interval, burst)
+            taken, full_at = self._update_bucket(
+                bucket_key,
+                'SET FullAt = FullAt + :interval, ExpiresAt = :expires',
+                'FullAt BETWEEN :now AND :latest',
+                {':interval': interval, ':expires': expires_at, ':now': now, ':latest': latest},
+            )
+            if taken:
+                return 0
+            # without the failed item, the other case is tried anyway
+            if full_at is not None and full_at > latest:
+                return full_at - latest
+            taken, full_at = self._update_bucket(
+                bucket_key,
+                'SET FullAt = :next, ExpiresAt = :expires',
+                'attribute_not_exists(FullAt) OR FullAt < :now',
+                {':next': now + interval, ':expires': expires_at, ':now': now},
+            )
+            if taken:
+                return 0
+            if full_at is not None and full_at > latest:
+                return full_at - latest
+        return interval
+
+    def return_admission_token(self, bucket_key, interval):
+        # a bucket that expired in the meantime is full anyway
+        self._update_bucket(
+            bucket_key, 'SET FullAt = FullAt - :interval', 'attribute_exists(FullAt)', {':interval': interval}
+        )
+
+
+class DynamoDBLeaderboardReader(LeaderboardReader):
+    def __init__(self, dynamodb):
+        self.table = dynamodb.Table(SUBMISSIONS_TABLE)
+
+    # ScoreRank ascends in leaderboard order (see quiz_common.leaderboard)
+    def top(self, quiz_id, limit):
+        response = self.table.query(
+            IndexName=LEADERBOARD_INDEX,
+            KeyConditionExpression=Key('QuizID').eq(quiz_id),
+            Limit=limit
+        )
+        return response.get('Items', [])
+
+    def page(self, quiz_id, limit, start_key=None, reverse=False):
+        kwargs = {
+            'IndexName': LEADERBOARD_INDEX,
+            'KeyConditionExpression': Key('QuizID').eq(quiz_id),
+            'ScanIndexForward': not reverse,
+            'Limit': limit,
+            **projection(LEADERBOARD_ENTRY_ATTRIBUTES),
+        }
+        if start_key:
+            kwargs['ExclusiveStartKey'] = start_key
+        response = self.table.query(**kwargs)
+        return response.get('Items', []), response.get('LastEvaluatedKey')
+
+
+class DynamoDBLeaderboardSnapshotStore(LeaderboardSnapshotStore):
+    def __init__(self, dynamodb):
+        self.table = dynamodb.Table(SNAPSHOTS_TABLE)
+
+    def get_snapshot(self, quiz_id):
+        item = self.table.get_item(Key={'QuizID': quiz_id}).get('Item')
+        return item['Entries'] if item else []
+
+    def merge_snapshot(self, quiz_id, entries, size):
+        # optimistic concurrency: archivers of different stream shards may merge into the same quiz
+        while True:
+            item = self.table.get_item(Key={'QuizID': quiz_id}, ConsistentRead=True).get('Item')
+            revision = int(item['Revision']) if item else 0
+            merged = merge_leaderboards((item['Entries'] if item else []) + entries, size)
+            try:
+                self.table.put_item(
+                    Item={'QuizID': quiz_id, 'Entries': merged, 'Revision': revision + 1},
+                    ConditionExpression='attribute_not_exists(QuizID) OR Revision = :revision',
+                    ExpressionAttributeValues={':revision': revision},
+                )
+                return
+            except ClientError as e:
+                if not is_condition_failure(e):
+                    raise
+
+
+class DynamoDBTournamentStore(TournamentStore):
+    def __init__(self, dynamodb):
+        self.table = dynamodb.Table(TOURNAMENTS_TABLE)
+        self.scores_table = dynamodb.Table(TOURNAMENT_SCORES_TABLE)
+
+    def get_tournament(self, tournament_id):
+        return self.table.get_item(Key={'TournamentID': tournament_id}).get('Item')
+
+    def put_tournament(self, item):
+        self.table.put_item(Item=item)
+
+    def list_aggregated_tournaments(self):
+        # tournaments are few, and the scoring functions cache the result
+        kwargs = {'FilterExpression': Attr('Aggregated').eq(True)}
+        tournaments = []
+        while True:
+            response = self.table.scan(**kwargs)
+            tournaments.extend(response.get('Items', []))
+            if 'LastEvaluatedKey' not in response:
+                return tournaments
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def record_score(self, tournament, username, quiz_id, score):
+        key = {'TournamentID': tournament['TournamentID'], 'Username': username}
+        # optimistic concurrency: scoring functions of the same player's submissions may race
+        while True:
+            item = self.scores_table.get_item(Key=key, ConsistentRead=True).get('Item')
+            revision = int(item['Revision']) if item else 0
+            scores = item['Scores'] if item else {}
+            if quiz_id in scores and scores[quiz_id] >= score:
+                return
+            scores[quiz_id] = score
+            try:
+                self.scores_table.put_item(
+                    Item={
+                        **key,
+                        'Scores': scores,
+                        'Score': tournament_score(tournament['Rule'], scores),
+                        'Revision': revision + 1,
+                    },
+                    ConditionExpression='attribute_not_exists(TournamentID) OR Revision = :revision',
+                    ExpressionAttributeValues={':revision': revision},
+                )
+                return
+            except ClientError as e:
+                if not is_condition_failure(e):
+                    raise
+
+    def top_scores(self, tournament_id, limit):
+        response = self.scores_table.query(
+            IndexName=TOURNAMENT_RANK_INDEX,
+            KeyConditionExpression=Key('TournamentID').eq(tournament_id),
+            ScanIndexForward=False,
+            Limit=limit,
+            ProjectionExpression='Username, Score',
+        )
+        return response.get('Items', [])
+
+
+class AWSQueuePublisher(QueuePublisher):
+    def __init__(self):
+        self.sqs = boto3.client('sqs')
+        self.sns = boto3.client('sns')
+        self.stepfunctions = boto3.client('stepfunctions')
+        self._queue_url = None
+
+    def prepare(self):
+        self.queue_url()
+
+    def queue_url(self):
+        if self._queue_url is None:
+            self._queue_url = self.sqs.get_queue_url(QueueName=SUBMISSION_QUEUE)['QueueUrl']
+        return self._queue_url
+
+    def publish_submission(self, message, attributes=None):
+        self.sqs.send_message(
+            QueueUrl=self.queue_url(),
+            MessageBody=codec.dumps(message),
+            MessageAttributes={
+                name: {'DataType': 'String', 'StringValue': value} for name, value in (attributes or {}).items()
+            },
+        )
+
+    def submission_backlog(self):
+        response = self.sqs.get_queue_attributes(
+            QueueUrl=self.queue_url(),
+            AttributeNames=['ApproximateNumberOfMessages', 'ApproximateNumberOfMessagesNotVisible'],
+        )
+        attributes = response['Attributes']
+        # messages being scored right now still count as backlog
+        return int(attributes['ApproximateNumberOfMessages']) + int(attributes['ApproximateNumberOfMessagesNotVisible'])
+
+    def publish_failed_write(self, message):
+        self.sns.publish(TopicArn=FAILED_WRITES_TOPIC_ARN, Message=codec.dumps(message))
+
+    def start_email(self, payload):
+        # execution names are unique per state machine, so a second start is rejected
+        try:
+            self.stepfunctions.start_execution(
+                stateMachineArn=EMAIL_STATE_MACHINE_ARN,
+                name=payload['SubmissionID'],
+                input=codec.dumps(payload)
+            )
+        except self.stepfunctions.exceptions.ExecutionAlreadyExists:
+            pass
+
+
+class S3SearchIndexStore(SearchIndexStore):
+    """The index object's ETag is its version; replacements are conditional writes on it."""
+
+    def __init__(self, s3=None, bucket=SEARCH_INDEX_BUCKET):
+        self._s3 = s3
+        self.bucket = bucket
+
+    @property
+    def s3(self):
+        # only the search functions use S3, so the client is created on first use
+        if self._s3 is None:
+            self._s3 = boto3.client('s3')
+        return self._s3
+
+    def get_index_version(self):
+        try:
+            return self.s3.head_object(Bucket=self.bucket, Key=SEARCH_INDEX_KEY)['ETag']
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def get_index(self):
+        try:
+            response = self.s3.get_object(Bucket=self.bucket, Key=SEARCH_INDEX_KEY)
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return None, None
+            raise
+        return response['ETag'], response['Body'].read()
+
+    def put_index(self, blob, expected_version):
+        condition = {'IfNoneMatch': '*'} if expected_version is None else {'IfMatch': expected_version}
+        try:
+            self.s3.put_object(
+                Bucket=self.bucket, Key=SEARCH_INDEX_KEY, Body=blob,
+                ContentType='application/gzip', **condition
+            )
+        except ParamValidationError as e:
+            # PutObject takes IfMatch from botocore 1.35.69 on
+            raise RuntimeError(
+                'Replacing the search index needs conditional S3 writes; install boto3>=1.35.69 '
+                '(see lambdas/common/requirements.txt)'
+            ) from e
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('PreconditionFailed', 'ConditionalRequestConflict'):
+                return False
+            raise
+        return True
+
+
+def create_storage():
+    dynamodb = ThreadLocalDynamoDB()
+    return Storage(
+        quizzes=DynamoDBQuizStore(dynamodb),
+        submissions=DynamoDBSubmissionStore(dynamodb),
+        leaderboard=DynamoDBLeaderboardReader(dynamodb),
+        snapshots=DynamoDBLeaderboardSnapshotStore(dynamodb),
+        publisher=AWSQueuePublisher(),
+        search_index=S3SearchIndexStore(),
+        tournaments=DynamoDBTournamentStore(dynamodb),
+    )
@@ -0,0 +1,336 @@
+"""In-process storage for local runs, microbenchmarks and profiling handler logic."""
+
+import copy
+import threading
+import time
+from decimal import Decimal
+
+from .. import admission
+from ..leaderboard import leaderboard_entry, leaderboard_key, leaderboard_order, merge_leaderboards
+from ..tournament import tournament_score
+from .base import (
+    USER_HISTORY_ATTRIBUTES,
+    LeaderboardReader,
+    LeaderboardSnapshotStore,
+    QueuePublisher,
+    QuizStore,
+    SearchIndexStore,
+    Storage,
+    SubmissionStore,
+    TournamentStore,
+)
+
+
+def to_dynamodb_types(value):
+    """Normalize a value the way boto3 does before writing it to DynamoDB."""
+    if isinstance(value, bool) or value is None or isinstance(value, (str, bytes, Decimal)):
+        return value
+    if isinstance(value, int):
+        return Decimal(value)
+    if isinstance(value, float):
+        raise TypeError('Float types are not supported. Use Decimal types instead.')
+    if isinstance(value, dict):
+        return {k: to_dynamodb_types(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_dynamodb_types(v) for v in value]
+    if isinstance(value, set):
+        return {to_dynamodb_types(v) for v in value}
+    raise TypeError(f'Unsupported type "{type(value)}" for value "{value}"')
+
+
+def project(item, attributes):
+    if item is None:
+        return None
+    if attributes:
+        item = {k: v for k, v in item.items() if k in attributes}
+    return copy.deepcopy(item)
+
+
+def user_history_key(item):
+    return (item['SubmittedAt'], item['SubmissionID'])
+
+
+def history_start_key(item):
+    """The `LastEvaluatedKey` DynamoDB returns for an item of the user history index."""
+    return {k: item[k] for k in ('SubmissionID', 'Username', 'SubmittedAt')}
+
+
+class MemoryQuizStore(QuizStore):
+    def __init__(self, lock):
+        self.lock = lock
+        self.quizzes = {}
+        self.versions = {}
+
+    def get_quiz(self, quiz_id, attributes=None, consistent=False):
+        with self.lock:
+            return project(self.quizzes.get(quiz_id), attributes)
+
+    def get_quiz_version(self, quiz_id, version, attributes=None):
+        with self.lock:
+            return project(self.versions.get((quiz_id, int(version))), attributes)
+
+    def batch_get_quizzes(self, quiz_ids, attributes=None):
+        with self.lock:
+            return [
+                project(self.quizzes[quiz_id], attributes)
+                for quiz_id in list(dict.fromkeys(quiz_ids))[:100]
+                if quiz_id in self.quizzes
+            ]
+
+    def put_quiz(self, item):
+        item = to_dynamodb_types(item)
+        with self.lock:
+            self.quizzes[item['QuizID']] = item
+
+    def put_quiz_if_absent(self, item):
+        item = to_dynamodb_types(item)
+        with self.lock:
+            if item['QuizID'] in self.quizzes:
+                return False
+            self.quizzes[item['QuizID']] = item
+            return True
+
+    def replace_quiz(self, updated, superseded, expected_version):
+        updated = to_dynamodb_types(updated)
+        superseded = to_dynamodb_types(superseded)
+        key = (superseded['QuizID'], int(superseded['Version']))
+        with self.lock:
+            current = self.quizzes.get(updated['QuizID'])
+            if current is None or int(current.get('Version', 1)) != expected_version:
+                return False
+            if key in self.versions:
+                return False
+            self.versions[key] = superseded
+            self.quizzes[updated['QuizID']] = updated
+            return True
+
+    def list_public_quizzes(self):
+        with self.lock:
+            return [
+                project(quiz, ('QuizID', 'Title', 'Visibility'))
+                for quiz in self.quizzes.values()
+                if quiz.get('Visibility') == 'Public'
+            ]
+
+
+class MemorySubmissionStore(SubmissionStore):
+    def __init__(self, lock):
+        self.lock = lock
+        self.submissions = {}
+        self.idempotency_keys = {}
+        self.admission_buckets = {}
+
+    def get_submission(self, submission_id):
+        with self.lock:
+            return project(self.submissions.get(submission_id), None)
+
+    def put_submission_if_absent(self, item):
+        item = to_dynamodb_types(item)
+        with self.lock:
+            if item['SubmissionID'] in self.submissions:
+                return False
+            self.submissions[item['SubmissionID']] = item
+            return True
+
+    def list_user_submissions(self, username, limit, start_key=None):
+        with self.lock:
+            # only submissions with a SubmittedAt are in the index
+            items = [
+                item for item in self.submissions.values()
+                if item.get('Username') == username and 'SubmittedAt' in item
+            ]
+            if start_key:
+                items = [item for item in items if user_history_key(item) < user_history_key(start_key)]
+            items.sort(key=user_history_key, reverse=True)
+            page = [project(item, USER_HISTORY_ATTRIBUTES) for item in items[:limit]]
+        last_key = history_start_key(page[-1]) if len(items) > limit else None
+        return page, last_key
+
+    def claim_idempotency_key(self, key, submission_id, ttl_seconds):
+        now = int(time.time())
+        with self.lock:
+            existing = self.idempotency_keys.get(key)
+            if existing is not None and existing[1] >= now:
+                return existing[0], False
+            self.idempotency_keys[key] = (submission_id, now + ttl_seconds)
+            return submission_id, True
+
+    def get_idempotency_key(self, key):
+        with self.lock:
+            existing = self.idempotency_keys.get(key)
+        if existing is not None and existing[1] >= int(time.time()):
+            return existing[0]
+        return None
+
+    def release_idempotency_key(self, key):
+        with self.lock:
+            self.idempotency_keys.pop(key, None)
+
+    def take_admission_token(self, bucket_key, interval, burst):
+        now = int(time.time() * 1000)
+        with self.lock:
+            full_at, wait = admission.take(self.admission_buckets.get(bucket_key), now, interval, burst)
+            self.admission_buckets[bucket_key] = full_at
+        return wait
+
+    def return_admission_token(self, bucket_key, interval):
+        with self.lock:
+            if bucket_key in self.admission_buckets:
+                self.admission_buckets[bucket_key] -= interval
+
+
+class MemoryLeaderboardReader(LeaderboardReader):
+    def __init__(self, submission_store):
+        self.submission_store = submission_store
+
+    def _ranked(self, quiz_id):
+        with self.submission_store.lock:
+            items = [
+                item for item in self.submission_store.submissions.values()
+                if item.get('QuizID') == quiz_id and 'Score' in item
+            ]
+        return sorted(items, key=leaderboard_order)
+
+    def top(self, quiz_id, limit):
+        return [copy.deepcopy(item) for item in self._ranked(quiz_id)[:limit]]
+
+    def page(self, quiz_id, limit, start_key=None, reverse=False):
+        items = self._ranked(quiz_id)
+        if reverse:
+            items.reverse()
+        if start_key:
+            position = start_key['ScoreRank']
+            if reverse:
+                items = [item for item in items if leaderboard_order(item) < position]
+            else:
+                items = [item for item in items if leaderboard_order(item) > position]
+        page = [leaderboard_entry(item) for item in items[:limit]]
+        last_key = leaderboard_key(quiz_id, page[-1]) if len(items) > limit else None
+        return page, last_key
+
+
+class MemoryLeaderboardSnapshotStore(LeaderboardSnapshotStore):
+    def __init__(self, lock):
+        self.lock = lock
+        self.snapshots = {}
+
+    def get_snapshot(self, quiz_id):
+        with self.lock:
+            return copy.deepcopy(self.snapshots.get(quiz_id, []))
+
+    def merge_snapshot(self, quiz_id, entries, size):
+        entries = to_dynamodb_types(entries)
+        with self.lock:
+            self.snapshots[quiz_id] = merge_leaderboards(self.snapshots.get(quiz_id, []) + entries, size)
+
+
+class MemoryQueuePublisher(QueuePublisher):
+    """Collects published messages; a local driver drains `submissions` into the scoring handler."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.submissions = []
+        self.failed_writes = []
+        self.emails = []
+        self.email_ids = set()
+
+    def publish_submission(self, message, attributes=None):
+        with self.lock:
+            self.submissions.append((copy.deepcopy(message), dict(attributes or {})))
+
+    def submission_backlog(self):
+        with self.lock:
+            return len(self.submissions)
+
+    def publish_failed_write(self, message):
+        with self.lock:
+            self.failed_writes.append(copy.deepcopy(message))
+
+    def start_email(self, payload):
+        with self.lock:
+            if payload['SubmissionID'] not in self.email_ids:
+                self.email_ids.add(payload['SubmissionID'])
+                self.emails.append(copy.deepcopy(payload))
+
+    def drain_submissions(self, with_attributes=False):
+        """Return the published messages, or (message, attributes) pairs."""
+        with self.lock:
+            messages, self.submissions = self.submissions, []
+        return messages if with_attributes else [message for message, _ in messages]
+
+
+class MemorySearchIndexStore(SearchIndexStore):
+    def __init__(self, lock):
+        self.lock = lock
+        self.version = 0
+        self.blob = None
+
+    def get_index_version(self):
+        with self.lock:
+            return str(self.version) if self.blob is not None else None
+
+    def get_index(self):
+        with self.lock:
+            if self.blob is None:
+                return None, None
+            return str(self.version), self.blob
+
+    def put_index(self, blob, expected_version):
+        with self.lock:
+            if expected_version != self.get_index_version():
+                return False
+            self.version += 1
+            self.blob = bytes(blob)
+            return True
+
+
+class MemoryTournamentStore(TournamentStore):
+    def __init__(self, lock):
+        self.lock = lock
+        self.tournaments = {}
+        # (TournamentID, Username) -> running score item
+        self.scores = {}
+
+    def get_tournament(self, tournament_id):
+        with self.lock:
+            return project(self.tournaments.get(tournament_id), None)
+
+    def put_tournament(self, item):
+        item = to_dynamodb_types(item)
+        with self.lock:
+            self.tournaments[item['TournamentID']] = item
+
+    def list_aggregated_tournaments(self):
+        with self.lock:
+            return [project(item, None) for item in self.tournaments.values() if item.get('Aggregated')]
+
+    def record_score(self, tournament, username, quiz_id, score):
+        score = to_dynamodb_types(score)
+        key = (tournament['TournamentID'], username)
+        with self.lock:
+            item = self.scores.get(key) or {'TournamentID': key[0], 'Username': username, 'Scores': {}}
+            if quiz_id in item['Scores'] and item['Scores'][quiz_id] >= score:
+                return
+            item['Scores'][quiz_id] = score
+            item['Score'] = tournament_score(tournament['Rule'], item['Scores'])
+            self.scores[key] = item
+
+    def top_scores(self, tournament_id, limit):
+        with self.lock:
+            items = [item for key, item in self.scores.items() if key[0] == tournament_id]
+        items.sort(key=lambda item: (-item['Score'], item['Username']))
+        return [{'Username': item['Username'], 'Score': item['Score']} for item in items[:limit]]
+
+
+def create_storage():
+    lock = threading.RLock()
+    submissions = MemorySubmissionStore(lock)
+    return Storage(
+        quizzes=MemoryQuizStore(lock),
+        submissions=submissions,
+        leaderboard=MemoryLeaderboardReader(submissions),
+        snapshots=MemoryLeaderboardSnapshotStore(lock),
+        publisher=MemoryQueuePublisher(),
+        search_index=MemorySearchIndexStore(lock),
+        tournaments=MemoryTournamentStore(lock),
+    )
@@ -0,0 +1,471 @@
+"""SQLite storage for running the app locally without DynamoDB.
+
+Items are stored as JSON documents; numbers are read back as `Decimal` like
+DynamoDB returns them, and binary attributes of an item (such as compressed
+quiz questions) are kept base64 encoded under a `BINARY_TAG` key. The leaderboard is served from an index on
+(quiz_id, score, submission_id) that mirrors the `QuizID-Score-index` GSI.
+"""
+
+import base64
+import json
+import sqlite3
+import threading
+import time
+from decimal import Decimal
+
+from .. import admission, codec
+from ..leaderboard import LEADERBOARD_ENTRY_ATTRIBUTES, leaderboard_key, merge_leaderboards, rank_score
+from ..tournament import tournament_score
+from .base import (
+    USER_HISTORY_ATTRIBUTES,
+    LeaderboardReader,
+    LeaderboardSnapshotStore,
+    QueuePublisher,
+    QuizStore,
+    SearchIndexStore,
+    Storage,
+    SubmissionStore,
+    TournamentStore,
+)
+from .memory import history_start_key, project, to_dynamodb_types
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quizzes (
+    quiz_id TEXT PRIMARY KEY,
+    visibility TEXT,
+    item TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS quiz_versions (
+    quiz_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    item TEXT NOT NULL,
+    PRIMARY KEY (quiz_id, version)
+);
+CREATE TABLE IF NOT EXISTS submissions (
+    submission_id TEXT PRIMARY KEY,
+    quiz_id TEXT,
+    score REAL,
+    username TEXT,
+    submitted_at TEXT,
+    item TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS submissions_quiz_score ON submissions (quiz_id, score DESC, submission_id);
+CREATE INDEX IF NOT EXISTS submissions_user_history ON submissions (username, submitted_at DESC, submission_id DESC);
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    idempotency_key TEXT PRIMARY KEY,
+    submission_id TEXT NOT NULL,
+    expires_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS admission_buckets (
+    bucket_key TEXT PRIMARY KEY,
+    full_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leaderboard_snapshots (
+    quiz_id TEXT PRIMARY KEY,
+    entries TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS search_index (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL,
+    blob BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tournaments (
+    tournament_id TEXT PRIMARY KEY,
+    aggregated INTEGER NOT NULL,
+    item TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tournament_scores (
+    tournament_id TEXT NOT NULL,
+    username TEXT NOT NULL,
+    score REAL NOT NULL,
+    item TEXT NOT NULL,
+    PRIMARY KEY (tournament_id, username)
+);
+CREATE INDEX IF NOT EXISTS tournament_scores_rank ON tournament_scores (tournament_id, score DESC, username);
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    body TEXT NOT NULL,
+    attributes TEXT
+);
+CREATE TABLE IF NOT EXISTS started_emails (
+    submission_id TEXT PRIMARY KEY
+);
+"""
+
+
+BINARY_TAG = '$binary'
+
+
+def dumps(item):
+    if isinstance(item, dict) and any(isinstance(value, bytes) for value in item.values()):
+        item = {
+            name: {BINARY_TAG: base64.b64encode(value).decode()} if isinstance(value, bytes) else value
+            for name, value in item.items()
+        }
+    # the shortest float repr round-trips any Decimal with up to 15 significant digits
+    return codec.dumps(item)
+
+
+def loads(document):
+    item = json.loads(document, parse_float=Decimal, parse_int=Decimal)
+    if isinstance(item, dict):
+        for name, value in item.items():
+            if isinstance(value, dict) and BINARY_TAG in value:
+                item[name] = base64.b64decode(value[BINARY_TAG])
+    return item
+
+
+class SQLiteDatabase:
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+        self.lock = threading.RLock()
+
+    def execute(self, sql, parameters=()):
+        with self.lock:
+            return self.connection.execute(sql, parameters).fetchall()
+
+    def transaction(self):
+        return _Transaction(self)
+
+
+class _Transaction:
+    def __init__(self, database):
+        self.database = database
+
+    def __enter__(self):
+        self.database.lock.acquire()
+        self.database.connection.execute('BEGIN IMMEDIATE')
+        return self.database.connection
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.database.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
+        finally:
+            self.database.lock.release()
+
+
+class SQLiteQuizStore(QuizStore):
+    def __init__(self, database):
+        self.database = database
+
+    def get_quiz(self, quiz_id, attributes=None, consistent=False):
+        rows = self.database.execute('SELECT item FROM quizzes WHERE quiz_id = ?', (quiz_id,))
+        return project(loads(rows[0][0]), attributes) if rows else None
+
+    def get_quiz_version(self, quiz_id, version, attributes=None):
+        rows = self.database.execute(
+            'SELECT item FROM quiz_versions WHERE quiz_id = ? AND version = ?', (quiz_id, int(version))
+        )
+        return project(loads(rows[0][0]), attributes) if rows else None
+
+    def batch_get_quizzes(self, quiz_ids, attributes=None):
+        quiz_ids = list(dict.fromkeys(quiz_ids))[:100]
+        if not quiz_ids:
+            return []
+        placeholders = ', '.join('?' for _ in quiz_ids)
+        rows = self.database.execute(f'SELECT item FROM quizzes WHERE quiz_id IN ({placeholders})', quiz_ids)
+        return [project(loads(row[0]), attributes) for row in rows]
+
+    def put_quiz(self, item):
+        item = to_dynamodb_types(item)
+        self.database.execute(
+            'INSERT OR REPLACE INTO quizzes (quiz_id, visibility, item) VALUES (?, ?, ?)',
+            (item['QuizID'], item.get('Visibility'), dumps(item)),
+        )
+
+    def put_quiz_if_absent(self, item):
+        item = to_dynamodb_types(item)
+        try:
+            self.database.execute(
+                'INSERT INTO quizzes (quiz_id, visibility, item) VALUES (?, ?, ?)',
+                (item['QuizID'], item.get('Visibility'), dumps(item)),
+            )
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def replace_quiz(self, updated, superseded, expected_version):
+        updated = to_dynamodb_types(updated)
+        superseded = to_dynamodb_types(superseded)
+        with self.database.transaction() as connection:
+            row = connection.execute(
+                'SELECT item FROM quizzes WHERE quiz_id = ?', (updated['QuizID'],)
+            ).fetchone()
+            if row is None or int(loads(row[0]).get('Version', 1)) != expected_version:
+                return False
+            try:
+                connection.execute(
+                    'INSERT INTO quiz_versions (quiz_id, version, item) VALUES (?, ?, ?)',
+                    (superseded['QuizID'], int(superseded['Version']), dumps(superseded)),
+                )
+            except sqlite3.IntegrityError:
+                return False
+            connection.execute(
+                'UPDATE quizzes SET visibility = ?, item = ? WHERE quiz_id = ?',
+                (updated.get('Visibility'), dumps(updated), updated['QuizID']),
+            )
+            return True
+
+    def list_public_quizzes(self):
+        rows = self.database.execute("SELECT item FROM quizzes WHERE visibility = 'Public'")
+        return [project(loads(row[0]), ('QuizID', 'Title', 'Visibility')) for row in rows]
+
+
+class SQLiteSubmissionStore(SubmissionStore):
+    def __init__(self, database):
+        self.database = database
+
+    def get_submission(self, submission_id):
+        rows = self.database.execute('SELECT item FROM submissions WHERE submission_id = ?', (submission_id,))
+        return loads(rows[0][0]) if rows else None
+
+    def put_submission_if_absent(self, item):
+        item = to_dynamodb_types(item)
+        score = item.get('Score')
+        try:
+            self.database.execute(
+                'INSERT INTO submissions (submission_id, quiz_id, score, username, submitted_at, item) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (
+                    item['SubmissionID'], item.get('QuizID'), None if score is None else float(score),
+                    item.get('Username'), item.get('SubmittedAt'), dumps(item),
+                ),
+            )
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def list_user_submissions(self, username, limit, start_key=None):
+        sql = 'SELECT item FROM submissions WHERE username = ? AND submitted_at IS NOT NULL'
+        parameters = [username]
+        if start_key:
+            sql += ' AND (submitted_at, submission_id) < (?, ?)'
+            parameters += [start_key['SubmittedAt'], start_key['SubmissionID']]
+        sql += ' ORDER BY submitted_at DESC, submission_id DESC LIMIT ?'
+        # one extra row tells whether another page follows
+        rows = self.database.execute(sql, parameters + [limit + 1])
+        page = [project(loads(row[0]), USER_HISTORY_ATTRIBUTES) for row in rows[:limit]]
+        last_key = history_start_key(page[-1]) if len(rows) > limit else None
+        return page, last_key
+
+    def claim_idempotency_key(self, key, submission_id, ttl_seconds):
+        now = int(time.time())
+        with self.database.transaction() as connection:
+            row = connection.execute(
+                'SELECT submission_id, expires_at FROM idempotency_keys WHERE idempotency_key = ?', (key,)
+            ).fetchone()
+            if row is not None and row[1] >= now:
+                return row[0], False
+            connection.execute(
+                'INSERT OR REPLACE INTO idempotency_keys (idempotency_key, submission_id, expires_at) VALUES (?, ?, ?)',
+                (key, submission_id, now + ttl_seconds),
+            )
+            return submission_id, True
+
+    def get_idempotency_key(self, key):
+        rows = self.database.execute(
+            'SELECT submission_id FROM idempotency_keys WHERE idempotency_key = ? AND expires_at >= ?',
+            (key, int(time.time())),
+        )
+        return rows[0][0] if rows else None
+
+    def release_idempotency_key(self, key):
+        self.database.execute('DELETE FROM idempotency_keys WHERE idempotency_key = ?', (key,))
+
+    def take_admission_token(self, bucket_key, interval, burst):
+        now = int(time.time() * 1000)
+        with self.database.transaction() as connection:
+            row = connection.execute(
+                'SELECT full_at FROM admission_buckets WHERE bucket_key = ?', (bucket_key,)
+            ).fetchone()
+            full_at, wait = admission.take(row[0] if row else None, now, interval, burst)
+            if not wait:
+                connection.execute(
+                    'INSERT OR REPLACE INTO admission_buckets (bucket_key, full_at) VALUES (?, ?)', (bucket_key, full_at)
+                )
+            return wait
+
+    def return_admission_token(self, bucket_key, interval):
+        self.database.execute(
+            'UPDATE admission_buckets SET full_at = full_at - ? WHERE bucket_key = ?', (interval, bucket_key)
+        )
+
+
+class SQLiteLeaderboardReader(LeaderboardReader):
+    def __init__(self, database):
+        self.database = database
+
+    def top(self, quiz_id, limit):
+        rows = self.database.execute(
+            'SELECT item FROM submissions WHERE quiz_id = ? AND score IS NOT NULL '
+            'ORDER BY score DESC, submission_id LIMIT ?',
+            (quiz_id, limit),
+        )
+        return [loads(row[0]) for row in rows]
+
+    def page(self, quiz_id, limit, start_key=None, reverse=False):
+        sql = 'SELECT item FROM submissions WHERE quiz_id = ? AND score IS NOT NULL'
+        parameters = [quiz_id]
+        if start_key:
+            score = float(rank_score(start_key['ScoreRank']))
+            if reverse:
+                sql += ' AND (score > ? OR (score = ? AND submission_id < ?))'
+            else:
+                sql += ' AND (score < ? OR (score = ? AND submission_id > ?))'
+            parameters += [score, score, start_key['SubmissionID']]
+        sql += ' ORDER BY score ASC, submission_id DESC' if reverse else ' ORDER BY score DESC, submission_id'
+        # one extra row tells whether more entries follow
+        rows = self.database.execute(sql + ' LIMIT ?', parameters + [limit + 1])
+        page = [project(loads(row[0]), LEADERBOARD_ENTRY_ATTRIBUTES) for row in rows[:limit]]
+        last_key = leaderboard_key(quiz_id, page[-1]) if len(rows) > limit else None
+        return page, last_key
+
+
+class SQLiteLeaderboardSnapshotStore(LeaderboardSnapshotStore):
+    def __init__(self, database):
+        self.database = database
+
+    def get_snapshot(self, quiz_id):
+        rows = self.database.execute('SELECT entries FROM leaderboard_snapshots WHERE quiz_id = ?', (quiz_id,))
+        return loads(rows[0][0]) if rows else []
+
+    def merge_snapshot(self, quiz_id, entries, size):
+        entries = to_dynamodb_types(entries)
+        with self.database.transaction() as connection:
+            row = connection.execute(
+                'SELECT entries FROM leaderboard_snapshots WHERE quiz_id = ?', (quiz_id,)
+            ).fetchone()
+            current = loads(row[0]) if row else []
+            connection.execute(
+                'INSERT OR REPLACE INTO leaderboard_snapshots (quiz_id, entries) VALUES (?, ?)',
+                (quiz_id, dumps(merge_leaderboards(current + entries, size))),
+            )
+
+
+class SQLiteQueuePublisher(QueuePublisher):
+    """Writes published messages to an outbox table that a local driver can drain."""
+
+    def __init__(self, database):
+        self.database = database
+
+    def _append(self, kind, message, attributes=None):
+        self.database.execute(
+            'INSERT INTO outbox (kind, body, attributes) VALUES (?, ?, ?)',
+            (kind, dumps(message), codec.dumps(attributes) if attributes else None),
+        )
+
+    def publish_submission(self, message, attributes=None):
+        self._append('submission', message, attributes)
+
+    def submission_backlog(self):
+        return self.database.execute("SELECT COUNT(*) FROM outbox WHERE kind = 'submission'")[0][0]
+
+    def publish_failed_write(self, message):
+        self._append('failed_write', message)
+
+    def start_email(self, payload):
+        with self.database.transaction() as connection:
+            started = connection.execute(
+                'INSERT OR IGNORE INTO started_emails (submission_id) VALUES (?)', (payload['SubmissionID'],)
+            ).rowcount
+            if started:
+                connection.execute(
+                    "INSERT INTO outbox (kind, body) VALUES ('email', ?)", (dumps(payload),)
+                )
+
+    def drain_submissions(self, with_attributes=False):
+        """Return the published messages, or (message, attributes) pairs."""
+        with self.database.transaction() as connection:
+            rows = connection.execute(
+                "SELECT id, body, attributes FROM outbox WHERE kind = 'submission' ORDER BY id"
+            ).fetchall()
+            if rows:
+                connection.execute("DELETE FROM outbox WHERE kind = 'submission' AND id <= ?", (rows[-1][0],))
+        if not with_attributes:
+            return [codec.loads(row[1]) for row in rows]
+        return [(codec.loads(row[1]), codec.loads(row[2]) if row[2] else {}) for row in rows]
+
+
+class SQLiteSearchIndexStore(SearchIndexStore):
+    def __init__(self, database):
+        self.database = database
+
+    def get_index_version(self):
+        rows = self.database.execute('SELECT version FROM search_index WHERE id = 1')
+        return str(rows[0][0]) if rows else None
+
+    def get_index(self):
+        rows = self.database.execute('SELECT version, blob FROM search_index WHERE id = 1')
+        return (str(rows[0][0]), bytes(rows[0][1])) if rows else (None, None)
+
+    def put_index(self, blob, expected_version):
+        with self.database.transaction() as connection:
+            row = connection.execute('SELECT version FROM search_index WHERE id = 1').fetchone()
+            if (str(row[0]) if row else None) != expected_version:
+                return False
+            connection.execute(
+                'INSERT OR REPLACE INTO search_index (id, version, blob) VALUES (1, ?, ?)',
+                ((row[0] if row else 0) + 1, bytes(blob)),
+            )
+            return True
+
+
+class SQLiteTournamentStore(TournamentStore):
+    def __init__(self, database):
+        self.database = database
+
+    def get_tournament(self, tournament_id):
+        rows = self.database.execute('SELECT item FROM tournaments WHERE tournament_id = ?', (tournament_id,))
+        return loads(rows[0][0]) if rows else None
+
+    def put_tournament(self, item):
+        item = to_dynamodb_types(item)
+        self.database.execute(
+            'INSERT OR REPLACE INTO tournaments (tournament_id, aggregated, item) VALUES (?, ?, ?)',
+            (item['TournamentID'], int(bool(item.get('Aggregated'))), dumps(item)),
+        )
+
+    def list_aggregated_tournaments(self):
+        rows = self.database.execute('SELECT item FROM tournaments WHERE aggregated = 1')
+        return [loads(row[0]) for row in rows]
+
+    def record_score(self, tournament, username, quiz_id, score):
+        score = to_dynamodb_types(score)
+        tournament_id = tournament['TournamentID']
+        with self.database.transaction() as connection:
+            row = connection.execute(
+                'SELECT item FROM tournament_scores WHERE tournament_id = ? AND username = ?',
+                (tournament_id, username),
+            ).fetchone()
+            item = loads(row[0]) if row else {'TournamentID': tournament_id, 'Username': username, 'Scores': {}}
+            if quiz_id in item['Scores'] and item['Scores'][quiz_id] >= score:
+                return
+            item['Scores'][quiz_id] = score
+            item['Score'] = tournament_score(tournament['Rule'], item['Scores'])
+            connection.execute(
+                'INSERT OR REPLACE INTO tournament_scores (tournament_id, username, score, item) VALUES (?, ?, ?, ?)',
+                (tournament_id, username, float(item['Score']), dumps(item)),
+            )
+
+    def top_scores(self, tournament_id, limit):
+        rows = self.database.execute(
+            'SELECT item FROM tournament_scores WHERE tournament_id = ? ORDER BY score DESC, username LIMIT ?',
+            (tournament_id, limit),
+        )
+        return [project(loads(row[0]), ('Username', 'Score')) for row in rows]
+
+
+def create_storage(path):
+    database = SQLiteDatabase(path)
+    return Storage(
+        quizzes=SQLiteQuizStore(database),
+        submissions=SQLiteSubmissionStore(database),
+        leaderboard=SQLiteLeaderboardReader(database),
+        snapshots=SQLiteLeaderboardSnapshotStore(database),
+        publisher=SQLiteQueuePublisher(database),
+        search_index=SQLiteSearchIndexStore(database),
+        tournaments=SQLiteTournamentStore(database),
+    )
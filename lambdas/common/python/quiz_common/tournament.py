@@ -0,0 +1,157 @@
+"""Tournaments: leaderboards combined over several quizzes.
+
+A tournament ranks players by Username. A player's score in one of its
+quizzes is the best score of their submissions to it, and the tournament
+score combines those with the tournament's rule: `sum` adds them up (quizzes
+not played count as 0), `best` takes the best one.
+
+Tournaments are ranked on read by streaming the quizzes' leaderboards page by
+page from the `QuizID-Score-index` and merging them with a heap (see `rank`),
+which stops as soon as the top of the ranking can no longer change.
+Tournaments created with `Aggregated` instead keep a running score per player
+in `TournamentScores`, updated whenever a submission to one of their quizzes
+is scored (see `TournamentCache`), so that large ones are ranked with a
+single index read.
+"""
+
+import heapq
+import time
+from decimal import Decimal
+
+from .leaderboard import leaderboard_order
+
+RULES = ('sum', 'best')
+MIN_QUIZZES = 2
+MAX_QUIZZES = 20
+# entries read from a quiz's leaderboard at a time
+PAGE_SIZE = 100
+
+
+def tournament_score(rule, scores):
+    """Combine a player's scores per quiz (QuizID -> score) with a tournament rule."""
+    if rule == 'best':
+        return max(scores.values(), default=Decimal(0))
+    return sum(scores.values(), Decimal(0))
+
+
+def quiz_entries(storage, quiz_id, snapshot, page_size=PAGE_SIZE):
+    """Yield the best entry of every player of a quiz, highest score first.
+
+    Live entries are read a page at a time, only as far as the caller
+    iterates, and merged with the quiz's archived `snapshot` entries.
+    """
+    def live():
+        start_key = None
+        while True:
+            entries, start_key = storage.leaderboard.page(quiz_id, page_size, start_key)
+            yield from entries
+            if start_key is None:
+                return
+
+    players = set()
+    for entry in heapq.merge(live(), snapshot, key=leaderboard_order):
+        if entry['Username'] not in players:
+            players.add(entry['Username'])
+            yield entry
+
+
+def rank(rule, streams, limit):
+    """Return the best `limit` players of a tournament as {'Username', 'Score'} entries.
+
+    `streams` maps each QuizID to its entries from `quiz_entries`. They are
+    merged on a heap holding the next entry of every quiz, so the entries
+    are consumed highest score first across all quizzes, and the head of
+    each quiz bounds what a player can still score in it. The merge stops
+    once the best `limit` players have their final score and neither a
+    partly read player nor an unread one can overtake the last of them.
+    Players tied with the last one are ordered by Username, so the merge
+    reads on until no such tie is left.
+    """
+    heads = {}
+    heap = []
+    for index, (quiz_id, stream) in enumerate(streams.items()):
+        _advance(heap, heads, index, quiz_id, iter(stream))
+
+    scores = {}
+    # checking costs a sort of the players read so far, so it is done every `limit` entries
+    check_every = max(limit, 1)
+    consumed = 0
+    while heap:
+        _, index, quiz_id, entry, iterator = heapq.heappop(heap)
+        scores.setdefault(entry['Username'], {})[quiz_id] = entry['Score']
+        _advance(heap, heads, index, quiz_id, iterator)
+        consumed += 1
+        if consumed % check_every == 0:
+            ranking = _settled(rule, scores, heads, limit)
+            if ranking is not None:
+                return ranking
+    return _ranking(rule, scores, limit)
+
+
+def _advance(heap, heads, index, quiz_id, iterator):
+    entry = next(iterator, None)
+    if entry is None:
+        heads.pop(quiz_id, None)
+        return
+    heads[quiz_id] = entry['Score']
+    # the index keeps the tuples comparable, as each quiz has at most one entry on the heap
+    heapq.heappush(heap, (leaderboard_order(entry), index, quiz_id, entry, iterator))
+
+
+def _ranking(rule, scores, limit):
+    totals = [(tournament_score(rule, player_scores), username) for username, player_scores in scores.items()]
+    totals.sort(key=lambda total: (-total[0], total[1]))
+    return [{'Username': username, 'Score': score} for score, username in totals[:limit]]
+
+
+def _settled(rule, scores, heads, limit):
+    """The final ranking if the entries read so far decide it, otherwise None."""
+    top = _ranking(rule, scores, limit)
+    if len(top) < limit:
+        return None
+    threshold = top[-1]['Score']
+
+    def upper_bound(player_scores):
+        unread = {quiz_id: head for quiz_id, head in heads.items() if quiz_id not in player_scores}
+        return tournament_score(rule, {**player_scores, **unread})
+
+    if any(upper_bound(scores[entry['Username']]) != entry['Score'] for entry in top):
+        return None
+    # a player not read yet can at most score the head of every quiz
+    if tournament_score(rule, heads) >= threshold:
+        return None
+    ranked = {entry['Username'] for entry in top}
+    if any(upper_bound(player_scores) >= threshold
+           for username, player_scores in scores.items() if username not in ranked):
+        return None
+    return top
+
+
+class TournamentCache:
+    """The aggregated tournaments of every quiz, read again every `ttl` seconds.
+
+    `record` keeps their running scores up to date for a scored submission;
+    tournaments created in the meantime only count submissions scored once
+    the cache has been refreshed.
+    """
+
+    def __init__(self, storage, ttl):
+        self.storage = storage
+        self.ttl = ttl
+        self.by_quiz = {}
+        self.expires_at = 0
+
+    def for_quiz(self, quiz_id):
+        now = time.monotonic()
+        if self.expires_at <= now:
+            by_quiz = {}
+            for tournament in self.storage.tournaments.list_aggregated_tournaments():
+                for member in tournament['QuizIDs']:
+                    by_quiz.setdefault(member, []).append(tournament)
+            self.by_quiz, self.expires_at = by_quiz, now + self.ttl
+        return self.by_quiz.get(quiz_id, [])
+
+    def record(self, item):
+        """Add a scored submission to the aggregated tournaments of its quiz."""
+        for tournament in self.for_quiz(item['QuizID']):
+            self.storage.tournaments.record_score(tournament, item['Username'], item['QuizID'], item['Score'])
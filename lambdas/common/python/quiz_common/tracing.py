@@ -0,0 +1,80 @@
+"""Latency tracing of a submission from /submitquiz to its score and email.
+
+`submit_quiz` mints a correlation ID for every submission and sends it, with
+the time the submission was enqueued, as SQS message attributes; `scoring`
+passes both on in the input of `SendEmailStateMachine`. Each stage prints
+one JSON line with its timestamps (epoch milliseconds) in CloudWatch's
+embedded metric format, so stage latencies become metrics in the `QuizApp`
+namespace without any API calls; the state machine records the email
+latency itself. bin/latency_report.py joins the lines of a test run by
+correlation ID.
+"""
+
+import sys
+import time
+import uuid
+
+from . import codec
+
+METRICS_NAMESPACE = 'QuizApp'
+
+
+def new_correlation_id():
+    return uuid.uuid4().hex
+
+
+def now_ms():
+    return int(time.time() * 1000)
+
+
+def message_attributes(correlation_id, enqueued_at):
+    """Attributes of a submission message, as name -> string value."""
+    return {'CorrelationId': correlation_id, 'EnqueuedAt': str(enqueued_at)}
+
+
+def record_attributes(record):
+    """Read the attributes of an SQS record in a Lambda event.
+
+    Returns (correlation ID, enqueued at, first received at); the ID is None
+    for messages sent before tracing was introduced, whose enqueue time is
+    taken from the message's SentTimestamp.
+    """
+    attributes = record.get('messageAttributes') or {}
+    system = record.get('attributes') or {}
+    correlation_id = (attributes.get('CorrelationId') or {}).get('stringValue')
+    enqueued_at = (attributes.get('EnqueuedAt') or {}).get('stringValue') or system.get('SentTimestamp')
+    received_at = system.get('ApproximateFirstReceiveTimestamp')
+    return (
+        correlation_id,
+        int(enqueued_at) if enqueued_at else None,
+        int(received_at) if received_at else None,
+    )
+
+
+def sqs_record(message, attributes=None):
+    """Wrap a drained message like the SQS event source does, for local drivers."""
+    return {
+        'messageId': str(uuid.uuid4()),
+        'body': codec.dumps(message),
+        'messageAttributes': {
+            name: {'stringValue': value, 'dataType': 'String'} for name, value in (attributes or {}).items()
+        },
+    }
+
+
+def log_stage(stage, correlation_id, submission_id, at, latencies=None, **fields):
+    """Print a stage of a submission; `latencies` (name -> ms) are also emitted as metrics."""
+    document = {'Stage': stage, 'CorrelationId': correlation_id, 'SubmissionID': submission_id, 'At': at}
+    document.update((name, value) for name, value in fields.items() if value is not None)
+    if latencies:
+        document['_aws'] = {
+            'Timestamp': at,
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [[]],
+                'Metrics': [{'Name': name, 'Unit': 'Milliseconds'} for name in latencies],
+            }],
+        }
+        document.update(latencies)
+    # a single write, so that lines printed by concurrent threads do not interleave
+    sys.stdout.write(codec.dumps(document) + '\n')
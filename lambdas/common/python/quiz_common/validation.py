@@ -0,0 +1,302 @@
+"""Request validation shared by the quiz handlers.
+
+The schemas below are built from small validator functions once, at import;
+validating a request is then a chain of plain function calls with no schema
+interpretation per request. Validators return the normalized value and raise
+`ValidationError`. The path of the offending field is only assembled while
+such an error propagates, so valid requests never pay for it.
+"""
+
+from .tournament import MAX_QUIZZES, MIN_QUIZZES, RULES
+
+MAX_TITLE_LENGTH = 200
+MAX_QUESTIONS = 100
+MIN_OPTIONS = 2
+MAX_OPTIONS = 10
+MAX_QUESTION_TEXT_LENGTH = 1000
+MAX_OPTION_LENGTH = 200
+MAX_TRIVIA_LENGTH = 2000
+MAX_TIMER_SECONDS = 86400
+MAX_VERSION = 1_000_000
+MAX_NAME_LENGTH = 128
+MAX_EMAIL_LENGTH = 254
+MAX_IDEMPOTENCY_KEY_LENGTH = 256
+MAX_TIME_TAKEN_SECONDS = 86400
+
+
+class ValidationError(ValueError):
+    def __init__(self, message, path=()):
+        super().__init__(message)
+        self.message = message
+        self.path = path
+
+    def __str__(self):
+        path = ''.join(f'[{part}]' if isinstance(part, int) else f'.{part}' for part in self.path)
+        return f'{path.lstrip(".")} {self.message}' if path else self.message
+
+
+def _nested(error, part):
+    error.path = (part,) + error.path
+    return error
+
+
+def string(min_length, max_length):
+    def check(value):
+        if not isinstance(value, str):
+            raise ValidationError('must be a string')
+        if len(value) < min_length:
+            raise ValidationError('must not be empty')
+        if len(value) > max_length:
+            raise ValidationError(f'must be at most {max_length} characters')
+        return value
+    return check
+
+
+def integer(minimum, maximum):
+    def check(value):
+        # numeric strings have always been accepted for integer fields
+        if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+            raise ValidationError('must be an integer')
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            raise ValidationError('must be an integer') from None
+        if not minimum <= number <= maximum:
+            raise ValidationError(f'must be between {minimum} and {maximum}')
+        return number
+    return check
+
+
+def number(minimum, maximum):
+    def check(value):
+        if isinstance(value, bool):
+            raise ValidationError('must be a number')
+        try:
+            parsed = float(value)
+        except (TypeError, ValueError):
+            raise ValidationError('must be a number') from None
+        # also rejects NaN, which fails every comparison
+        if not minimum <= parsed <= maximum:
+            raise ValidationError(f'must be between {minimum} and {maximum}')
+        # keep the value as sent; scoring converts it to a Decimal itself
+        return value
+    return check
+
+
+def boolean(value):
+    if not isinstance(value, bool):
+        raise ValidationError('must be true or false')
+    return value
+
+
+def one_of(*choices):
+    allowed = frozenset(choices)
+    message = 'must be ' + ' or '.join(f"'{choice}'" for choice in choices)
+
+    def check(value):
+        if not isinstance(value, str) or value not in allowed:
+            raise ValidationError(message)
+        return value
+    return check
+
+
+def array(item, min_items, max_items):
+    def check(value):
+        if not isinstance(value, list):
+            raise ValidationError('must be a list')
+        if not min_items <= len(value) <= max_items:
+            raise ValidationError(f'must have between {min_items} and {max_items} entries')
+        checked = []
+        for element in value:
+            try:
+                checked.append(item(element))
+            except ValidationError as e:
+                raise _nested(e, len(checked))
+        return checked
+    return check
+
+
+def index_mapping(item, min_items, max_items):
+    """An object keyed by list indices ("0", "1", ...) below `max_items`."""
+    index_keys = frozenset(str(index) for index in range(max_items))
+
+    def check(value):
+        if not isinstance(value, dict):
+            raise ValidationError('must be an object')
+        if not min_items <= len(value) <= max_items:
+            raise ValidationError(f'must have between {min_items} and {max_items} entries')
+        checked = {}
+        for key, element in value.items():
+            if key not in index_keys:
+                raise ValidationError(f'keys must be question indices below {max_items}, got {key!r}')
+            try:
+                checked[key] = item(element)
+            except ValidationError as e:
+                raise _nested(e, key)
+        return checked
+    return check
+
+
+def record(required, optional=None, allow_unknown=True):
+    """An object with the given fields. Returns only the known fields;
+    unknown fields are dropped, or rejected if `allow_unknown` is false."""
+    required = tuple(required.items())
+    optional = tuple((optional or {}).items())
+    known = frozenset(name for name, _ in required + optional)
+
+    def check(value):
+        if not isinstance(value, dict):
+            raise ValidationError('must be an object')
+        checked = {}
+        name = None
+        try:
+            for name, field in required:
+                if name not in value:
+                    raise ValidationError('is required')
+                checked[name] = field(value[name])
+            for name, field in optional:
+                # JSON null is treated like an absent field
+                if value.get(name) is not None:
+                    checked[name] = field(value[name])
+        except ValidationError as e:
+            raise _nested(e, name)
+        if not allow_unknown and len(checked) < len(value):
+            unknown = value.keys() - known
+            if unknown:
+                raise ValidationError(f'has unknown fields: {", ".join(sorted(map(str, unknown)))}')
+        return checked
+    return check
+
+
+_question_fields = record(
+    {
+        'QuestionText': string(1, MAX_QUESTION_TEXT_LENGTH),
+        'Options': array(string(1, MAX_OPTION_LENGTH), MIN_OPTIONS, MAX_OPTIONS),
+        'CorrectAnswer': string(1, MAX_OPTION_LENGTH),
+        'Trivia': string(0, MAX_TRIVIA_LENGTH),
+    },
+    allow_unknown=False,
+)
+
+
+def _question(value):
+    question = _question_fields(value)
+    if question['CorrectAnswer'] not in question['Options']:
+        raise ValidationError('must be one of the Options', ('CorrectAnswer',))
+    return question
+
+
+_questions = array(_question, 1, MAX_QUESTIONS)
+_visibility = one_of('Public', 'Private')
+_timer_seconds = integer(1, MAX_TIMER_SECONDS)
+
+_quiz = record(
+    {'Title': string(1, MAX_TITLE_LENGTH), 'Questions': _questions},
+    {'Visibility': _visibility, 'EnableTimer': boolean, 'TimerSeconds': _timer_seconds},
+)
+
+UPDATABLE_FIELDS = ('Title', 'Questions', 'Visibility', 'EnableTimer', 'TimerSeconds')
+
+_quiz_update = record(
+    {'QuizID': string(1, MAX_NAME_LENGTH), 'ExpectedVersion': integer(1, MAX_VERSION)},
+    {
+        'Title': string(1, MAX_TITLE_LENGTH),
+        'Questions': _questions,
+        'Visibility': _visibility,
+        'EnableTimer': boolean,
+        'TimerSeconds': _timer_seconds,
+    },
+)
+
+
+def _answer_value(value):
+    # unanswered questions are sent as an empty string when the timer runs out
+    if isinstance(value, str):
+        if len(value) > MAX_OPTION_LENGTH:
+            raise ValidationError(f'must be at most {MAX_OPTION_LENGTH} characters')
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    raise ValidationError('must be a string')
+
+
+_answer = record(
+    {'Answer': _answer_value, 'TimeTaken': number(0, MAX_TIME_TAKEN_SECONDS)},
+    allow_unknown=False,
+)
+
+_submission = record(
+    {
+        'Username': string(1, MAX_NAME_LENGTH),
+        'QuizID': string(1, MAX_NAME_LENGTH),
+        'Answers': index_mapping(_answer, 1, MAX_QUESTIONS),
+    },
+    {
+        'Email': string(1, MAX_EMAIL_LENGTH),
+        'Version': integer(1, MAX_VERSION),
+        'IdempotencyKey': string(1, MAX_IDEMPOTENCY_KEY_LENGTH),
+        'TimerExceeded': boolean,
+    },
+)
+
+
+_tournament = record(
+    {
+        'Title': string(1, MAX_TITLE_LENGTH),
+        'QuizIDs': array(string(1, MAX_NAME_LENGTH), MIN_QUIZZES, MAX_QUIZZES),
+    },
+    {'Rule': one_of(*RULES), 'Aggregated': boolean},
+    allow_unknown=False,
+)
+
+
+def _body(validator, data):
+    try:
+        return validator(data)
+    except ValidationError as e:
+        if not e.path:
+            e.message = f'Request body {e.message}'
+        raise
+
+
+def validate_quiz(data):
+    """Validate a /createquiz body; returns the quiz with defaults applied."""
+    quiz = _body(_quiz, data)
+    quiz.setdefault('Visibility', 'Private')
+    quiz.setdefault('EnableTimer', False)
+    if quiz['EnableTimer']:
+        if 'TimerSeconds' not in quiz:
+            raise ValidationError('is required when EnableTimer is true', ('TimerSeconds',))
+    else:
+        quiz.pop('TimerSeconds', None)
+    return quiz
+
+
+def validate_quiz_update(data):
+    """Validate an /updatequiz body; the timer is checked against the merged quiz by the handler."""
+    update = _body(_quiz_update, data)
+    if not any(field in update for field in UPDATABLE_FIELDS):
+        raise ValidationError(f"At least one of {', '.join(UPDATABLE_FIELDS)} must be provided")
+    return update
+
+
+def validate_submission(data):
+    """Validate a /submitquiz body."""
+    return _body(_submission, data)
+
+
+def validate_tournament(data):
+    """Validate a /createtournament body; returns the tournament with defaults applied."""
+    tournament = _body(_tournament, data)
+    if len(set(tournament['QuizIDs'])) < len(tournament['QuizIDs']):
+        raise ValidationError('must not repeat a quiz', ('QuizIDs',))
+    tournament.setdefault('Rule', 'sum')
+    tournament.setdefault('Aggregated', False)
+    return tournament
+
+
+def check_answer_indices(answers, question_count):
+    """Reject answers to questions the quiz does not have."""
+    for key in answers:
+        if int(key) >= question_count:
+            raise ValidationError(f'does not match a question; the quiz has {question_count}', ('Answers', key))
@@ -1,7 +1,10 @@
-import json
-import boto3
 import random
 
+from quiz_common import codec
+from quiz_common.quizzes import stored_quiz, with_public_body
+from quiz_common.storage import get_storage
+from quiz_common.validation import validate_quiz
+
 class IdSentence:
     """Generate human-readable IDs composed of adjectives, nouns, and verbs."""
 
@@ -73,74 +76,60 @@ class IdSentence:
             'wobbled', 'yawned', 'zipped', 'zoomed'
         ]
 
+# random IDs tried before giving up; there are about 3.5 million of them
+MAX_ID_ATTEMPTS = 5
+
+storage = get_storage()
+id_sentence = IdSentence()
+
+def new_quiz_id():
+    adjective = random.choice(id_sentence.adjectives)
+    noun = random.choice(id_sentence.nouns)
+    verb = random.choice(id_sentence.verbs)
+    return f"{adjective}-{noun}-{verb}"
+
 def lambda_handler(event, context):
-    try:
-        quiz_data = json.loads(event['body'])
-        title = quiz_data['Title']
-        questions = quiz_data['Questions']
-        visibility = quiz_data.get('Visibility', 'Private')
-        if visibility not in ('Public', 'Private'):
-            raise ValueError("Visibility must be 'Public' or 'Private'")
+    if event.get('warmup'):
+        # Clients are created at import time, nothing else to prime
+        return {'warmup': True}
 
-        enable_timer = quiz_data.get('EnableTimer', False)
-        timer_seconds = None
-        if enable_timer:
-            timer_seconds = int(quiz_data.get('TimerSeconds', 0))
-            if timer_seconds <= 0:
-                raise ValueError("TimerSeconds must be a positive integer")
-    except (KeyError, json.JSONDecodeError, ValueError, TypeError) as e:
+    try:
+        quiz_data = validate_quiz(codec.loads(event['body']))
+    except (KeyError, codec.JSONDecodeError, ValueError, TypeError) as e:
         return {
             'statusCode': 400,
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': '*',
             },
-            'body': json.dumps({
+            'body': codec.dumps({
                 'message': 'Invalid input data',
                 'error': str(e)
             })
         }
 
-    for question in questions:
-        if not all(k in question for k in ('QuestionText', 'Options', 'CorrectAnswer', 'Trivia')):
-            return {
-                'statusCode': 400,
-                'headers': {
-                    'Access-Control-Allow-Origin': '*',
-                    'Access-Control-Allow-Methods': '*',
-                },
-                'body': json.dumps({
-                    'message': 'Each question must contain QuestionText, Options, CorrectAnswer, and Trivia'
-                })
-            }
-
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table('Quizzes')
-    id_sentence = IdSentence()
-    adjective = random.choice(id_sentence.adjectives)
-    noun = random.choice(id_sentence.nouns)
-    verb = random.choice(id_sentence.verbs)
-    quiz_id = f"{adjective}-{noun}-{verb}"
-    quiz_data['QuizID'] = quiz_id
-    quiz_data['Visibility'] = visibility
-    quiz_data['EnableTimer'] = enable_timer
-    if enable_timer:
-        quiz_data['TimerSeconds'] = timer_seconds
+    quiz_data['Version'] = 1
+    # lets /submitquiz check answer indices without reading the questions
+    quiz_data['QuestionCount'] = len(quiz_data['Questions'])
 
     try:
-        table.put_item(Item=quiz_data)
+        # a taken ID belongs to another quiz, whose versions must not be overwritten
+        for _ in range(MAX_ID_ATTEMPTS):
+            quiz_id = quiz_data['QuizID'] = new_quiz_id()
+            # what /getquiz returns, sanitized once here instead of on every read
+            with_public_body(quiz_data)
+            if storage.quizzes.put_quiz_if_absent(stored_quiz(quiz_data)):
+                break
+        else:
+            raise RuntimeError(f'No free QuizID after {MAX_ID_ATTEMPTS} attempts')
     except Exception as e:
         message = {
             'TableName': 'Quizzes',
             'Item': quiz_data
         }
         print(f"Attempting to publish failed write to SNS: {message}")
-        sns = boto3.client('sns')
         try:
-            sns.publish(
-                TopicArn='arn:aws:sns:us-east-1:000000000000:QuizzesWriteFailures',
-                Message=json.dumps(message)
-            )
+            storage.publisher.publish_failed_write(message)
             print(f"Published failed write to SNS: {e}")
         except Exception as sns_e:
             print(f"Failed to publish to SNS: {sns_e}")
@@ -150,7 +139,7 @@ def lambda_handler(event, context):
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': '*',
             },
-            'body': json.dumps({
+            'body': codec.dumps({
                 'message': 'Error storing quiz data. It has been queued for retry.',
                 'error': str(e)
             })
@@ -162,5 +151,5 @@ def lambda_handler(event, context):
             'Access-Control-Allow-Origin': '*',
             'Access-Control-Allow-Methods': '*',
         },
-        'body': json.dumps({'QuizID': quiz_id})
+        'body': codec.dumps({'QuizID': quiz_id})
     }
@@ -0,0 +1,60 @@
+import uuid
+
+from quiz_common import codec
+from quiz_common.scoring import now_iso
+from quiz_common.storage import get_storage
+from quiz_common.validation import validate_tournament
+
+storage = get_storage()
+
+def lambda_handler(event, context):
+    if event.get('warmup'):
+        # Clients are created at import time, nothing else to prime
+        return {'warmup': True}
+
+    try:
+        tournament = validate_tournament(codec.loads(event['body']))
+    except (KeyError, codec.JSONDecodeError, ValueError, TypeError) as e:
+        return {
+            'statusCode': 400,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': '*',
+            },
+            'body': codec.dumps({'message': 'Invalid input data', 'error': str(e)})
+        }
+
+    try:
+        found = storage.quizzes.batch_get_quizzes(tournament['QuizIDs'], attributes=('QuizID',))
+        missing = set(tournament['QuizIDs']) - {quiz['QuizID'] for quiz in found}
+        if missing:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Methods': '*',
+                },
+                'body': codec.dumps({'message': f"QuizIDs do not exist: {', '.join(sorted(missing))}"})
+            }
+
+        tournament['TournamentID'] = str(uuid.uuid4())
+        tournament['CreatedAt'] = now_iso()
+        storage.tournaments.put_tournament(tournament)
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': '*',
+            },
+            'body': codec.dumps({'message': 'Error storing the tournament.', 'error': str(e)})
+        }
+
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': '*',
+        },
+        'body': codec.dumps({'TournamentID': tournament['TournamentID']})
+    }
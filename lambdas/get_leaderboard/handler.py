@@ -1,11 +1,119 @@
-import json
-import boto3
-from boto3.dynamodb.conditions import Key
+import base64
+import binascii
+import os
+import time
+from decimal import Decimal, InvalidOperation
+
+from quiz_common import codec
+from quiz_common.leaderboard import leaderboard_entry, leaderboard_key, leaderboard_order, merge_leaderboards
+from quiz_common.storage import get_storage
+
+QUIZ_CACHE_MAX_ENTRIES = int(os.environ.get('QUIZ_CACHE_MAX_ENTRIES', '256'))
+# snapshots only change when submissions are archived, so they are cached briefly
+SNAPSHOT_TTL_SECONDS = float(os.environ.get('SNAPSHOT_TTL_SECONDS', '60'))
+# leaderboards change with every scored submission, so caches keep them briefly
+LEADERBOARD_CACHE_SECONDS = int(os.environ.get('LEADERBOARD_CACHE_SECONDS', '5'))
+MAX_PAGE_SIZE = 100
+DEFAULT_AROUND_COUNT = 5
+MAX_AROUND_COUNT = 50
+
+storage = get_storage()
+
+# QuizID -> (snapshot entries, expiry)
+_snapshot_cache = {}
+
+def get_snapshot(quiz_id):
+    cached = _snapshot_cache.get(quiz_id)
+    if cached is not None and cached[1] > time.monotonic():
+        return cached[0]
+    entries = storage.snapshots.get_snapshot(quiz_id)
+    if len(_snapshot_cache) >= QUIZ_CACHE_MAX_ENTRIES:
+        _snapshot_cache.pop(next(iter(_snapshot_cache)))
+    _snapshot_cache[quiz_id] = (entries, time.monotonic() + SNAPSHOT_TTL_SECONDS)
+    return entries
+
+def encode_token(quiz_id, entry):
+    # the position is the last entry returned; Score is kept as a string to stay exact
+    position = {'QuizID': quiz_id, 'Score': str(entry['Score']), 'SubmissionID': entry['SubmissionID']}
+    return base64.urlsafe_b64encode(codec.dumps(position).encode()).decode()
+
+def decode_token(token, quiz_id):
+    try:
+        position = codec.loads(base64.urlsafe_b64decode(token.encode()))
+        if not isinstance(position, dict) or position.get('QuizID') != quiz_id:
+            raise ValueError("next_token does not belong to this quiz_id")
+        return {'Score': Decimal(position['Score']), 'SubmissionID': str(position['SubmissionID'])}
+    except (binascii.Error, UnicodeDecodeError, codec.JSONDecodeError, KeyError, InvalidOperation) as e:
+        raise ValueError(f"Invalid next_token: {e}")
+
+def bounded_int(params, name, default, maximum):
+    value = int(params.get(name, default))
+    if not 1 <= value <= maximum:
+        raise ValueError(f"{name} must be between 1 and {maximum}")
+    return value
+
+def response_entry(item):
+    return {
+        'Username': item['Username'],
+        'Score': float(item['Score']),
+        'SubmissionID': item['SubmissionID']
+    }
+
+def leaderboard_page(quiz_id, limit, position):
+    """Return the `limit` entries ranked after `position` (None: from the top) and the next position."""
+    start_key = leaderboard_key(quiz_id, position) if position else None
+    live, last_key = storage.leaderboard.page(quiz_id, limit, start_key)
+    archived = get_snapshot(quiz_id)
+    if position:
+        archived = [entry for entry in archived if leaderboard_order(entry) > leaderboard_order(position)]
+    entries = merge_leaderboards(live + archived, limit + 1)
+    page = entries[:limit]
+    more = len(entries) > limit or last_key is not None
+    return page, (page[-1] if more and page else None)
+
+def find_entry(quiz_id, submission_id):
+    submission = storage.submissions.get_submission(submission_id)
+    if submission is not None:
+        if submission.get('QuizID') != quiz_id or 'Score' not in submission:
+            return None
+        return leaderboard_entry(submission)
+    # archived submissions are only found in the snapshot
+    for entry in get_snapshot(quiz_id):
+        if entry['SubmissionID'] == submission_id:
+            return entry
+    return None
+
+def neighbourhood(quiz_id, entry, count):
+    """Return up to `count` entries ranked directly above and below `entry`, best first.
+
+    Each side is one index read of `count` entries starting at the entry
+    itself, so the cost does not depend on how far down the player is.
+    """
+    key = leaderboard_key(quiz_id, entry)
+    live_above, _ = storage.leaderboard.page(quiz_id, count, key, reverse=True)
+    live_below, _ = storage.leaderboard.page(quiz_id, count, key)
+    position = leaderboard_order(entry)
+    archived = [other for other in get_snapshot(quiz_id) if other['SubmissionID'] != entry['SubmissionID']]
+    above = [other for other in archived if leaderboard_order(other) < position]
+    below = [other for other in archived if leaderboard_order(other) > position]
+    above = merge_leaderboards(live_above + above, len(live_above) + len(above))[-count:]
+    below = merge_leaderboards(live_below + below, count)
+    return above, below
 
 def lambda_handler(event, context):
+    if event.get('warmup'):
+        # Clients are created at import time; submissions are never read here
+        return {'warmup': True}
+
     try:
-        quiz_id = event['queryStringParameters']['quiz_id']
-        top = int(event['queryStringParameters'].get('top', 10))
+        params = event['queryStringParameters']
+        quiz_id = params['quiz_id']
+        top = int(params.get('top', 10))
+        submission_id = params.get('submission_id')
+        count = bounded_int(params, 'count', DEFAULT_AROUND_COUNT, MAX_AROUND_COUNT)
+        paginated = 'limit' in params or 'next_token' in params
+        limit = bounded_int(params, 'limit', 10, MAX_PAGE_SIZE)
+        position = decode_token(params['next_token'], quiz_id) if params.get('next_token') else None
     except (KeyError, TypeError, ValueError) as e:
         return {
             'statusCode': 400,
@@ -13,34 +121,45 @@ def lambda_handler(event, context):
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': '*',
             },
-            'body': json.dumps({'message': 'quiz_id is required and top should be an integer', 'error': str(e)})
+            'body': codec.dumps({'message': 'quiz_id is required and top, limit and count should be integers', 'error': str(e)})
         }
 
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table('UserSubmissions')
-
     try:
-        response = table.query(
-            IndexName='QuizID-Score-index',
-            KeyConditionExpression=Key('QuizID').eq(quiz_id),
-            ScanIndexForward=False,
-            Limit=top
-        )
-        items = response.get('Items', [])
-        leaderboard = [
-            {
-                'Username': item['Username'],
-                'Score': float(item['Score']),
-                'SubmissionID': item['SubmissionID']
-            } for item in items
-        ]
+        if submission_id:
+            entry = find_entry(quiz_id, submission_id)
+            if entry is None:
+                return {
+                    'statusCode': 404,
+                    'headers': {
+                        'Access-Control-Allow-Origin': '*',
+                        'Access-Control-Allow-Methods': '*',
+                    },
+                    'body': codec.dumps({'message': 'Submission not found on this leaderboard'})
+                }
+            above, below = neighbourhood(quiz_id, entry, count)
+            body = {
+                'Above': [response_entry(item) for item in above],
+                'Entry': response_entry(entry),
+                'Below': [response_entry(item) for item in below],
+            }
+        elif paginated:
+            page, next_position = leaderboard_page(quiz_id, limit, position)
+            body = {
+                'Leaderboard': [response_entry(item) for item in page],
+                'NextToken': encode_token(quiz_id, next_position) if next_position else None,
+            }
+        else:
+            # archived submissions only remain in the quiz's leaderboard snapshot
+            items = merge_leaderboards(storage.leaderboard.top(quiz_id, top) + get_snapshot(quiz_id), top)
+            body = [response_entry(item) for item in items]
         return {
             'statusCode': 200,
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': '*',
+                'Cache-Control': f'public, max-age={LEADERBOARD_CACHE_SECONDS}',
             },
-            'body': json.dumps(leaderboard)
+            'body': codec.dumps(body)
         }
     except Exception as e:
         return {
@@ -49,5 +168,5 @@ def lambda_handler(event, context):
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': '*',
             },
-            'body': json.dumps({'message': 'Error retrieving leaderboard', 'error': str(e)})
+            'body': codec.dumps({'message': 'Error retrieving leaderboard', 'error': str(e)})
         }
@@ -1,49 +1,128 @@
-import json
-import boto3
-from decimal import Decimal
-
-def convert_decimal(obj):
-    if isinstance(obj, list):
-        return [convert_decimal(item) for item in obj]
-    elif isinstance(obj, dict):
-        return {k: convert_decimal(v) for k, v in obj.items()}
-    elif isinstance(obj, Decimal):
-        if obj % 1 == 0:
-            return int(obj)
+import os
+import time
+
+from quiz_common import codec
+from quiz_common.quizzes import PUBLIC_ATTRIBUTES, PUBLIC_BODY, public_body, stored_public_body
+from quiz_common.storage import get_storage
+
+QUIZ_CACHE_MAX_ENTRIES = int(os.environ.get('QUIZ_CACHE_MAX_ENTRIES', '256'))
+LATEST_VERSION_TTL_SECONDS = float(os.environ.get('LATEST_VERSION_TTL_SECONDS', '5'))
+# Edge caches may keep the latest version for an hour: a player served a stale
+# one submits its Version and is scored against it. Browsers re-check sooner.
+QUIZ_EDGE_CACHE_SECONDS = int(os.environ.get('QUIZ_EDGE_CACHE_SECONDS', '3600'))
+LATEST_CACHE_CONTROL = f'public, max-age=60, s-maxage={QUIZ_EDGE_CACHE_SECONDS}'
+# a version never changes once written
+VERSIONED_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+storage = get_storage()
+
+# Public quiz bodies keyed by (QuizID, Version). A version is never modified
+# once written, so entries stay valid for the container lifetime.
+_quiz_body_cache = {}
+# QuizID -> (latest Version, expiry); short-lived because /updatequiz can bump it
+_latest_version_cache = {}
+
+def quiz_version(quiz):
+    # quizzes created before versioning was introduced are implicitly version 1
+    return int(quiz.get('Version', 1))
+
+def cache_quiz_body(quiz):
+    version = quiz_version(quiz)
+    # the body is stored with the quiz, except for quizzes written before that
+    body = stored_public_body(quiz) or public_body(quiz)
+    if len(_quiz_body_cache) >= QUIZ_CACHE_MAX_ENTRIES:
+        _quiz_body_cache.pop(next(iter(_quiz_body_cache)))
+    _quiz_body_cache[(quiz['QuizID'], version)] = body
+    return body
+
+def cache_latest(quiz):
+    version = quiz_version(quiz)
+    if len(_latest_version_cache) >= QUIZ_CACHE_MAX_ENTRIES:
+        _latest_version_cache.pop(next(iter(_latest_version_cache)))
+    _latest_version_cache[quiz['QuizID']] = (version, time.monotonic() + LATEST_VERSION_TTL_SECONDS)
+    return cache_quiz_body(quiz)
+
+# Only the stored public body is read, never the answers; quizzes written
+# before it was stored are read in full and sanitized in cache_quiz_body
+def read_latest(quiz_id):
+    quiz = storage.quizzes.get_quiz(quiz_id, attributes=PUBLIC_ATTRIBUTES)
+    if quiz is not None and PUBLIC_BODY not in quiz:
+        quiz = storage.quizzes.get_quiz(quiz_id)
+    return quiz
+
+def read_version(quiz_id, version):
+    quiz = storage.quizzes.get_quiz_version(quiz_id, version, attributes=PUBLIC_ATTRIBUTES)
+    if quiz is not None and PUBLIC_BODY not in quiz:
+        quiz = storage.quizzes.get_quiz_version(quiz_id, version)
+    return quiz
+
+def get_latest_body(quiz_id):
+    cached = _latest_version_cache.get(quiz_id)
+    if cached is not None and cached[1] > time.monotonic():
+        body = _quiz_body_cache.get((quiz_id, cached[0]))
+        if body is not None:
+            return body
+    quiz = read_latest(quiz_id)
+    if quiz is None:
+        return None
+    return cache_latest(quiz)
+
+def get_versioned_body(quiz_id, version):
+    body = _quiz_body_cache.get((quiz_id, version))
+    if body is not None:
+        return body
+    # the requested version is most likely the current one
+    quiz = read_latest(quiz_id)
+    if quiz is not None and quiz_version(quiz) == version:
+        return cache_latest(quiz)
+    quiz = read_version(quiz_id, version)
+    if quiz is None:
+        return None
+    return cache_quiz_body(quiz)
+
+def warm_up(quiz_ids):
+    # Only quiz definitions are read here, never user submissions
+    missing = [quiz_id for quiz_id in quiz_ids if quiz_id not in _latest_version_cache]
+    for quiz in storage.quizzes.batch_get_quizzes(missing, attributes=PUBLIC_ATTRIBUTES):
+        if PUBLIC_BODY in quiz:
+            cache_latest(quiz)
         else:
-            return float(obj)
-    else:
-        return obj
+            get_latest_body(quiz['QuizID'])
+    return {'warmup': True, 'cached_quizzes': len(_quiz_body_cache)}
 
 def lambda_handler(event, context):
+    if event.get('warmup'):
+        return warm_up(event.get('quiz_ids') or [])
+
     try:
         quiz_id = event['queryStringParameters']['quiz_id']
-    except (KeyError, TypeError) as e:
+        version = event['queryStringParameters'].get('version')
+        if version is not None:
+            version = int(version)
+    except (KeyError, TypeError, ValueError) as e:
         return {
             'statusCode': 400,
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': '*',
             },
-            'body': json.dumps({'message': 'quiz_id is required', 'error': str(e)})
+            'body': codec.dumps({'message': 'quiz_id is required and version should be an integer', 'error': str(e)})
         }
 
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table('Quizzes')
-    response = table.get_item(Key={'QuizID': quiz_id})
+    if version is None:
+        body = get_latest_body(quiz_id)
+    else:
+        body = get_versioned_body(quiz_id, version)
 
-    if 'Item' in response:
-        quiz = response['Item']
-        for question in quiz['Questions']:
-            question.pop('CorrectAnswer', None)
-        quiz = convert_decimal(quiz)
+    if body is not None:
         return {
             'statusCode': 200,
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': '*',
+                'Cache-Control': LATEST_CACHE_CONTROL if version is None else VERSIONED_CACHE_CONTROL,
             },
-            'body': json.dumps(quiz)
+            'body': body
         }
     else:
         return {
@@ -52,5 +131,5 @@ def lambda_handler(event, context):
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': '*',
             },
-            'body': json.dumps({'message': 'Quiz not found'})
+            'body': codec.dumps({'message': 'Quiz not found'})
         }
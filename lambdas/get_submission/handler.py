@@ -1,22 +1,32 @@
-import json
-import boto3
-from decimal import Decimal
-
-def convert_decimal(obj):
-    if isinstance(obj, list):
-        return [convert_decimal(item) for item in obj]
-    elif isinstance(obj, dict):
-        return {k: convert_decimal(v) for k, v in obj.items()}
-    elif isinstance(obj, Decimal):
-        # Convert Decimal to int or float
-        if obj % 1 == 0:
-            return int(obj)
-        else:
-            return float(obj)
-    else:
-        return obj
+import os
+
+from quiz_common import codec
+from quiz_common.scoring import AnswerKeyCache, expand_answers
+from quiz_common.storage import get_storage
+
+QUIZ_CACHE_MAX_ENTRIES = int(os.environ.get('QUIZ_CACHE_MAX_ENTRIES', '256'))
+
+storage = get_storage()
+# the options that stored answers index into, per quiz version
+answer_keys = AnswerKeyCache(storage, QUIZ_CACHE_MAX_ENTRIES)
+
+
+def api_submission(submission):
+    """The submission with its answers expanded to the submitted `UserAnswers` map."""
+    if 'UserAnswers' in submission or 'AnswerChoices' not in submission:
+        return submission
+    version = submission.get('QuizVersion')
+    _, key = answer_keys.get(submission['QuizID'], int(version) if version is not None else None)
+    expanded = {name: value for name, value in submission.items() if name not in ('AnswerChoices', 'AnswerMillis')}
+    expanded['UserAnswers'] = expand_answers(submission, key)
+    return expanded
+
 
 def lambda_handler(event, context):
+    if event.get('warmup'):
+        # Clients are created at import time; submissions are never read here
+        return {'warmup': True}
+
     try:
         submission_id = event['queryStringParameters']['submission_id']
     except (KeyError, TypeError) as e:
@@ -27,17 +37,12 @@ def lambda_handler(event, context):
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': '*',
             },
-            'body': json.dumps({'message': 'submission_id is required', 'error': str(e)})
+            'body': codec.dumps({'message': 'submission_id is required', 'error': str(e)})
         }
 
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table('UserSubmissions')
-    response = table.get_item(Key={'SubmissionID': submission_id})
+    submission = storage.submissions.get_submission(submission_id)
 
-    if 'Item' in response:
-        submission = response['Item']
-        # Convert Decimal objects to int or float
-        submission = convert_decimal(submission)
+    if submission is not None:
         return {
             'statusCode': 200,
             'headers': {
@@ -45,7 +50,7 @@ def lambda_handler(event, context):
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': '*',
             },
-            'body': json.dumps(submission)
+            'body': codec.dumps(api_submission(submission))
         }
     else:
         return {
@@ -55,5 +60,5 @@ def lambda_handler(event, context):
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': '*',
             },
-            'body': json.dumps({'message': 'Submission not found'})
+            'body': codec.dumps({'message': 'Submission not found'})
         }
@@ -0,0 +1,109 @@
+import os
+import time
+
+from quiz_common import codec
+from quiz_common.storage import get_storage
+from quiz_common.tournament import quiz_entries, rank
+
+QUIZ_CACHE_MAX_ENTRIES = int(os.environ.get('QUIZ_CACHE_MAX_ENTRIES', '256'))
+# snapshots only change when submissions are archived, so they are cached briefly
+SNAPSHOT_TTL_SECONDS = float(os.environ.get('SNAPSHOT_TTL_SECONDS', '60'))
+MAX_LIMIT = 100
+
+storage = get_storage()
+
+# Tournament definitions are never modified once written
+_tournaments = {}
+# QuizID -> (snapshot entries, expiry)
+_snapshot_cache = {}
+
+def get_tournament(tournament_id):
+    tournament = _tournaments.get(tournament_id)
+    if tournament is None:
+        tournament = storage.tournaments.get_tournament(tournament_id)
+        if tournament is None:
+            return None
+        if len(_tournaments) >= QUIZ_CACHE_MAX_ENTRIES:
+            _tournaments.pop(next(iter(_tournaments)))
+        _tournaments[tournament_id] = tournament
+    return tournament
+
+def get_snapshot(quiz_id):
+    cached = _snapshot_cache.get(quiz_id)
+    if cached is not None and cached[1] > time.monotonic():
+        return cached[0]
+    entries = storage.snapshots.get_snapshot(quiz_id)
+    if len(_snapshot_cache) >= QUIZ_CACHE_MAX_ENTRIES:
+        _snapshot_cache.pop(next(iter(_snapshot_cache)))
+    _snapshot_cache[quiz_id] = (entries, time.monotonic() + SNAPSHOT_TTL_SECONDS)
+    return entries
+
+def tournament_leaderboard(tournament, limit):
+    if tournament.get('Aggregated'):
+        # kept up to date by the scoring functions
+        return storage.tournaments.top_scores(tournament['TournamentID'], limit)
+    streams = {
+        quiz_id: quiz_entries(storage, quiz_id, get_snapshot(quiz_id), page_size=max(limit, 25))
+        for quiz_id in tournament['QuizIDs']
+    }
+    return rank(tournament['Rule'], streams, limit)
+
+def lambda_handler(event, context):
+    if event.get('warmup'):
+        # Clients are created at import time; submissions are never read here
+        return {'warmup': True}
+
+    try:
+        params = event['queryStringParameters']
+        tournament_id = params['tournament_id']
+        limit = int(params.get('limit', 10))
+        if not 1 <= limit <= MAX_LIMIT:
+            raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+    except (KeyError, TypeError, ValueError) as e:
+        return {
+            'statusCode': 400,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': '*',
+            },
+            'body': codec.dumps({'message': 'tournament_id is required and limit should be an integer', 'error': str(e)})
+        }
+
+    try:
+        tournament = get_tournament(tournament_id)
+        if tournament is None:
+            return {
+                'statusCode': 404,
+                'headers': {
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Methods': '*',
+                },
+                'body': codec.dumps({'message': 'Tournament not found'})
+            }
+        leaderboard = [
+            {'Username': entry['Username'], 'Score': float(entry['Score'])}
+            for entry in tournament_leaderboard(tournament, limit)
+        ]
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': '*',
+            },
+            'body': codec.dumps({
+                'TournamentID': tournament_id,
+                'Title': tournament['Title'],
+                'Rule': tournament['Rule'],
+                'QuizIDs': tournament['QuizIDs'],
+                'Leaderboard': leaderboard,
+            })
+        }
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': '*',
+            },
+            'body': codec.dumps({'message': 'Error reading the tournament leaderboard.', 'error': str(e)})
+        }
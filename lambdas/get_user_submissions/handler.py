@@ -0,0 +1,76 @@
+import base64
+import binascii
+import os
+
+from quiz_common import codec
+from quiz_common.storage import get_storage
+
+DEFAULT_PAGE_SIZE = int(os.environ.get('USER_SUBMISSIONS_PAGE_SIZE', '20'))
+MAX_PAGE_SIZE = 100
+
+storage = get_storage()
+
+def encode_token(last_key):
+    # The index key only holds strings, so it round-trips through JSON unchanged
+    return base64.urlsafe_b64encode(codec.dumps(last_key).encode()).decode()
+
+def decode_token(token, username):
+    try:
+        start_key = codec.loads(base64.urlsafe_b64decode(token.encode()))
+    except (binascii.Error, UnicodeDecodeError, codec.JSONDecodeError) as e:
+        raise ValueError(f"Invalid next_token: {e}")
+    if not isinstance(start_key, dict) or start_key.get('Username') != username:
+        raise ValueError("next_token does not belong to this username")
+    return start_key
+
+def lambda_handler(event, context):
+    if event.get('warmup'):
+        # Clients are created at import time; submissions are never read here
+        return {'warmup': True}
+
+    try:
+        params = event['queryStringParameters']
+        username = params['username']
+        if not username:
+            raise ValueError("username must not be empty")
+        limit = int(params.get('limit', DEFAULT_PAGE_SIZE))
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        start_key = None
+        if params.get('next_token'):
+            start_key = decode_token(params['next_token'], username)
+    except (KeyError, TypeError, ValueError) as e:
+        return {
+            'statusCode': 400,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': '*',
+            },
+            'body': codec.dumps({'message': 'username is required and limit should be an integer', 'error': str(e)})
+        }
+
+    try:
+        items, last_key = storage.submissions.list_user_submissions(username, limit, start_key)
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': '*',
+            },
+            'body': codec.dumps({
+                'Submissions': items,
+                'NextToken': encode_token(last_key) if last_key else None,
+            })
+        }
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': '*',
+            },
+            'body': codec.dumps({'message': 'Error retrieving user submissions', 'error': str(e)})
+        }
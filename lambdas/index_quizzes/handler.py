@@ -0,0 +1,54 @@
+import os
+
+from boto3.dynamodb.types import TypeDeserializer
+from quiz_common.search import SearchIndex
+from quiz_common.storage import get_storage
+
+# question texts make the index several times larger, so only titles are indexed by default
+SEARCH_INDEX_QUESTIONS = os.environ.get('SEARCH_INDEX_QUESTIONS', 'false').lower() == 'true'
+MAX_WRITE_ATTEMPTS = 5
+
+storage = get_storage()
+deserializer = TypeDeserializer()
+
+def latest_changes(records):
+    """QuizID -> the quiz as last written in the batch, or None if it was deleted."""
+    changes = {}
+    for record in records:
+        keys = record['dynamodb']['Keys']
+        quiz_id = deserializer.deserialize(keys['QuizID'])
+        image = record['dynamodb'].get('NewImage')
+        if record['eventName'] == 'REMOVE' or not image:
+            changes[quiz_id] = None
+        else:
+            changes[quiz_id] = {k: deserializer.deserialize(v) for k, v in image.items()}
+    return changes
+
+def apply_changes(index, changes):
+    for quiz_id, quiz in changes.items():
+        if quiz is None:
+            index.remove(quiz_id)
+        else:
+            index.add(quiz, include_questions=SEARCH_INDEX_QUESTIONS)
+    index.compact()
+
+def lambda_handler(event, context):
+    if event.get('warmup'):
+        return {'warmup': True}
+
+    changes = latest_changes(event['Records'])
+    if not changes:
+        return {'indexed': 0}
+
+    # the index is replaced as a whole; a concurrent writer means reading it again
+    for attempt in range(1, MAX_WRITE_ATTEMPTS + 1):
+        version, blob = storage.search_index.get_index()
+        index = SearchIndex.from_blob(blob) if blob is not None else SearchIndex()
+        apply_changes(index, changes)
+        if storage.search_index.put_index(index.to_blob(), version):
+            print(f"Indexed {len(changes)} quiz changes, {len(index)} quizzes searchable")
+            return {'indexed': len(changes)}
+        print(f"Search index was replaced concurrently, retrying (attempt {attempt})")
+
+    # failing the batch makes the event source mapping retry it
+    raise RuntimeError(f"Could not update the search index after {MAX_WRITE_ATTEMPTS} attempts")
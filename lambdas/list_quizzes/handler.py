@@ -1,26 +1,29 @@
-import json
-import boto3
-from boto3.dynamodb.conditions import Attr
+import os
+
+from quiz_common import codec
+from quiz_common.storage import get_storage
+
+# new public quizzes show up in the catalog after at most this long
+CATALOG_CACHE_SECONDS = int(os.environ.get('CATALOG_CACHE_SECONDS', '30'))
+
+storage = get_storage()
 
 def lambda_handler(event, context):
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table('Quizzes')
+    if event.get('warmup'):
+        # Clients are created at import time, nothing else to prime
+        return {'warmup': True}
 
     try:
-        response = table.scan(
-            FilterExpression=Attr('Visibility').eq('Public'),
-            ProjectionExpression='QuizID, Title, Visibility'
-        )
-
-        quizzes = response.get('Items', [])
+        quizzes = storage.quizzes.list_public_quizzes()
 
         return {
             'statusCode': 200,
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': '*',
+                'Cache-Control': f'public, max-age={CATALOG_CACHE_SECONDS}',
             },
-            'body': json.dumps({'Quizzes': quizzes})
+            'body': codec.dumps({'Quizzes': quizzes})
         }
 
     except Exception as e:
@@ -31,5 +34,5 @@ def lambda_handler(event, context):
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': '*',
             },
-            'body': json.dumps({'message': 'Error retrieving public quizzes', 'error': str(e)})
+            'body': codec.dumps({'message': 'Error retrieving public quizzes', 'error': str(e)})
         }
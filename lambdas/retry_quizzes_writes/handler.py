@@ -1,24 +1,37 @@
-import json
-import boto3
 from botocore.exceptions import ClientError
+from quiz_common import codec
+from quiz_common.quizzes import PUBLIC_BODY, stored_quiz, with_public_body
+from quiz_common.storage import get_storage
+
+storage = get_storage()
 
 def lambda_handler(event, context):
-    dynamodb = boto3.resource('dynamodb')
-    
+    if event.get('warmup'):
+        # Clients are created at import time, nothing else to prime
+        return {'warmup': True}
+
     for record in event['Records']:
         try:
             # Parse the SQS message body (SNS notification)
-            sns_notification = json.loads(record['body'])
-            message = json.loads(sns_notification['Message'])
+            sns_notification = codec.loads(record['body'])
+            message = codec.loads(sns_notification['Message'])
             
             # Get table name and item from the message
             table_name = message['TableName']
             item = message['Item']
             
-            # Try to write to DynamoDB
-            table = dynamodb.Table(table_name)
-            table.put_item(Item=item)
-            print(f"Successfully wrote item to {table_name}: {item.get('QuizID')}")
+            # Only quiz writes are routed through the failure topic
+            if table_name != 'Quizzes':
+                raise ValueError(f"Unexpected table in failed write: {table_name}")
+            if PUBLIC_BODY not in item:
+                # queued before quizzes were written with their public body
+                with_public_body(item)
+            # only creates are retried; once the quiz exists, this write is
+            # either done already or stale next to a newer version
+            if storage.quizzes.put_quiz_if_absent(stored_quiz(item)):
+                print(f"Successfully wrote item to {table_name}: {item.get('QuizID')}")
+            else:
+                print(f"Dropping stale write to {table_name}, the quiz already exists: {item.get('QuizID')}")
             
         except ClientError as e:
             print(f"DynamoDB service error, message will be retried: {str(e)}")
@@ -29,5 +42,5 @@ def lambda_handler(event, context):
             
     return {
         'statusCode': 200,
-        'body': json.dumps('Processed messages')
+        'body': codec.dumps('Processed messages')
     }
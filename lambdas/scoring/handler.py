@@ -1,90 +1,102 @@
-import json
-import boto3
-from decimal import Decimal, getcontext
+import os
+from concurrent.futures import ThreadPoolExecutor
 
-def lambda_handler(event, context):
-    # raise Exception()
-    getcontext().prec = 6
+from quiz_common import codec, tracing
+from quiz_common.scoring import AnswerKeyCache, email_input, scored_submission
+from quiz_common.storage import get_storage
+from quiz_common.tournament import TournamentCache
 
-    dynamodb = boto3.resource('dynamodb')
-    quizzes_table = dynamodb.Table('Quizzes')
-    submissions_table = dynamodb.Table('UserSubmissions')
-    stepfunctions = boto3.client('stepfunctions')
+QUIZ_CACHE_MAX_ENTRIES = int(os.environ.get('QUIZ_CACHE_MAX_ENTRIES', '256'))
+# how long new aggregated tournaments may go unnoticed
+TOURNAMENT_CACHE_TTL_SECONDS = float(os.environ.get('TOURNAMENT_CACHE_TTL_SECONDS', '60'))
+# records of a batch scored at the same time so that their storage round trips
+# overlap; 1 scores them one after another
+SCORING_RECORD_CONCURRENCY = max(1, int(os.environ.get('SCORING_RECORD_CONCURRENCY', '10')))
 
-    for record in event['Records']:
-        try:
-            message_body = json.loads(record['body'])
-            submission_id = message_body['SubmissionID']
-            username = message_body['Username']
-            quiz_id = message_body['QuizID']
-            user_answers = message_body['Answers']
-            email = message_body.get('Email')
+storage = get_storage()
+answer_keys = AnswerKeyCache(storage, QUIZ_CACHE_MAX_ENTRIES)
+tournaments = TournamentCache(storage, TOURNAMENT_CACHE_TTL_SECONDS)
+# the threads are kept for the lifetime of the container
+executor = ThreadPoolExecutor(SCORING_RECORD_CONCURRENCY) if SCORING_RECORD_CONCURRENCY > 1 else None
 
-            if not all([submission_id, username, quiz_id, user_answers]):
-                print(f"Invalid message data: {message_body}")
-                continue
+def warm_up(quiz_ids):
+    # Only quiz definitions are read here, never user submissions
+    answer_keys.warm_up(quiz_ids)
+    return {'warmup': True, 'cached_quizzes': len(answer_keys)}
 
-            response = quizzes_table.get_item(Key={'QuizID': quiz_id})
-            if 'Item' not in response:
-                print(f"QuizID not found: {quiz_id}")
-                continue
+def score_record(record):
+    """Score one SQS record; errors are logged so that the rest of the batch is still scored.
 
-            quiz = response['Item']
-            correct_answers = [q['CorrectAnswer'] for q in quiz['Questions']]
-            total_questions = len(correct_answers)
+    Returns False if the record has to be delivered again: the score is
+    stored but its email could not be started.
+    """
+    try:
+        message_body = codec.loads(record['body'])
+        correlation_id, enqueued_at, received_at = tracing.record_attributes(record)
+        submission_id = message_body['SubmissionID']
+        username = message_body['Username']
+        quiz_id = message_body['QuizID']
+        user_answers = message_body['Answers']
+        email = message_body.get('Email')
+        version = message_body.get('Version')
+        if version is not None:
+            version = int(version)
 
-            enable_timer = quiz.get('EnableTimer', False)
-            timer_seconds = quiz.get('TimerSeconds', None)
+        if not all([submission_id, username, quiz_id, user_answers]):
+            print(f"Invalid message data: {message_body}")
+            return True
 
-            score = Decimal('0.0')
-            for idx, correct in enumerate(correct_answers):
-                question_idx = str(idx)
-                if question_idx in user_answers:
-                    user_answer_data = user_answers[question_idx]
-                    user_answer = user_answer_data['Answer']
-                    time_taken = Decimal(str(user_answer_data['TimeTaken']))
-                    if str(user_answer) == str(correct):
-                        if enable_timer and timer_seconds is not None:
-                            timer_seconds_decimal = Decimal(str(timer_seconds))
-                            if time_taken > timer_seconds_decimal:
-                                question_score = Decimal('0.0')
-                            else:
-                                max_score = Decimal('100.0')
-                                question_score = max_score * (Decimal('1.0') - (time_taken / timer_seconds_decimal))
-                                if question_score < Decimal('0.0'):
-                                    question_score = Decimal('0.0')
-                        else:
-                            question_score = Decimal('100.0')
-                        score += question_score
-                    else:
-                        pass
-                else:
-                    pass
+        version, answer_key = answer_keys.get(quiz_id, version)
+        if answer_key is None:
+            print(f"QuizID not found: {quiz_id} (version {version})")
+            return True
 
-            submissions_table.put_item(Item={
-                'SubmissionID': submission_id,
-                'Username': username,
-                'QuizID': quiz_id,
-                'UserAnswers': user_answers,
-                'Score': score,
-                'TotalQuestions': Decimal(total_questions)
-            })
+        item = scored_submission(message_body, version, answer_key)
 
-            if email:
-                state_machine_arn = 'arn:aws:states:us-east-1:000000000000:stateMachine:SendEmailStateMachine'
-                input_data = {
-                    'SubmissionID': submission_id,
-                    'Username': username,
-                    'Email': email,
-                    'Score': float(score),
-                    'TotalQuestions': total_questions
-                }
+        # SQS delivers at least once, so only the first delivery of a
+        # submission may write the score
+        scored_at = None
+        if storage.submissions.put_submission_if_absent(item):
+            scored_at = tracing.now_ms()
+            latencies = {'EnqueueToScoredLatency': scored_at - enqueued_at} if enqueued_at else None
+            tracing.log_stage(
+                'scored', correlation_id, submission_id, scored_at, latencies,
+                EnqueuedAt=enqueued_at, ReceivedAt=received_at,
+            )
 
-                stepfunctions.start_execution(
-                    stateMachineArn=state_machine_arn,
-                    input=json.dumps(input_data, default=str)
-                )
+            # the score is stored, so a failed update must not skip the email
+            try:
+                tournaments.record(item)
+            except Exception as e:
+                print(f"Failed to update tournament scores for {submission_id}: {e}")
+        else:
+            print(f"Submission {submission_id} already scored, only making sure its email was started")
 
+    except Exception as e:
+        print(f"Error processing record {record}: {e}")
+        return True
+
+    # an earlier delivery may have stored the score and failed here; starting
+    # the email is idempotent per submission, so a redelivery sends it once
+    if email:
+        try:
+            storage.publisher.start_email(email_input(item, email, correlation_id, scored_at))
         except Exception as e:
-            print(f"Error processing record {record}: {e}")
-            continue
+            print(f"Failed to start email for {submission_id}, retrying the record: {e}")
+            return False
+    return True
+
+def lambda_handler(event, context):
+    if event.get('warmup'):
+        return warm_up(event.get('quiz_ids') or [])
+
+    records = event['Records']
+    if executor is None or len(records) == 1:
+        scored = [score_record(record) for record in records]
+    else:
+        # score_record never raises, so this only waits for the whole batch
+        scored = list(executor.map(score_record, records))
+    # partial batch response: only the failed records are delivered again
+    return {'batchItemFailures': [
+        {'itemIdentifier': record['messageId']} for record, ok in zip(records, scored) if not ok
+    ]}
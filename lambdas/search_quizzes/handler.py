@@ -0,0 +1,85 @@
+import gc
+import os
+import time
+
+from quiz_common import codec
+from quiz_common.search import SearchIndex
+from quiz_common.storage import get_storage
+
+# how long a loaded index is used before checking whether a newer one was written
+SEARCH_INDEX_TTL_SECONDS = float(os.environ.get('SEARCH_INDEX_TTL_SECONDS', '5'))
+MAX_QUERY_LENGTH = 200
+MAX_LIMIT = 50
+
+storage = get_storage()
+
+# (version, index, time of the next version check)
+_index_cache = (None, SearchIndex(), 0.0)
+_gc_frozen = False
+
+def get_index():
+    global _index_cache, _gc_frozen
+    version, index, check_at = _index_cache
+    now = time.monotonic()
+    if now < check_at:
+        return index
+    latest = storage.search_index.get_index_version()
+    if latest is None:
+        index = SearchIndex()
+    elif latest != version:
+        latest, blob = storage.search_index.get_index()
+        index = SearchIndex.from_blob(blob) if blob is not None else SearchIndex()
+        # the index holds hundreds of thousands of objects; rescanning them in every full collection
+        # would add milliseconds to random requests. Only the first index is frozen: frozen objects
+        # are never collected, so freezing every reload would keep each replaced index's cycles.
+        if not _gc_frozen:
+            gc.freeze()
+            _gc_frozen = True
+        print(f"Loaded search index version {latest} with {len(index)} quizzes")
+    _index_cache = (latest, index, now + SEARCH_INDEX_TTL_SECONDS)
+    return index
+
+def lambda_handler(event, context):
+    if event.get('warmup'):
+        # loading the index is the expensive part of a cold start
+        get_index()
+        return {'warmup': True}
+
+    try:
+        params = event.get('queryStringParameters') or {}
+        query = params['q']
+        limit = int(params.get('limit', 20))
+        include_questions = params.get('questions', 'false').lower() == 'true'
+        if not query.strip() or len(query) > MAX_QUERY_LENGTH:
+            raise ValueError(f'q must be between 1 and {MAX_QUERY_LENGTH} characters')
+        if not 1 <= limit <= MAX_LIMIT:
+            raise ValueError(f'limit must be between 1 and {MAX_LIMIT}')
+    except (KeyError, TypeError, ValueError) as e:
+        return {
+            'statusCode': 400,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': '*',
+            },
+            'body': codec.dumps({'message': 'q is required and limit should be an integer', 'error': str(e)})
+        }
+
+    try:
+        results = get_index().search(query, limit, include_questions)
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': '*',
+            },
+            'body': codec.dumps({'Quizzes': [{'QuizID': quiz_id, 'Title': title} for quiz_id, title in results]})
+        }
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': '*',
+            },
+            'body': codec.dumps({'message': 'Error searching quizzes', 'error': str(e)})
+        }
@@ -1,47 +1,261 @@
-import json
-import boto3
+import math
+import os
+import random
+import time
 import uuid
 
+from quiz_common import admission, codec, tracing
+from quiz_common.scoring import AnswerKeyCache, email_input, now_iso, scored_submission
+from quiz_common.storage import get_storage
+from quiz_common.tournament import TournamentCache
+from quiz_common.validation import check_answer_indices, validate_submission
+
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', '3600'))
+QUIZ_CACHE_MAX_ENTRIES = int(os.environ.get('QUIZ_CACHE_MAX_ENTRIES', '256'))
+# Inline scoring: small quizzes are scored in the request while the queue is
+# nearly empty, everything else goes through QuizSubmissionQueue
+INLINE_SCORING_ENABLED = os.environ.get('INLINE_SCORING_ENABLED', 'false').lower() == 'true'
+INLINE_SCORING_MAX_QUESTIONS = int(os.environ.get('INLINE_SCORING_MAX_QUESTIONS', '20'))
+INLINE_SCORING_MAX_BACKLOG = int(os.environ.get('INLINE_SCORING_MAX_BACKLOG', '10'))
+BACKLOG_TTL_SECONDS = float(os.environ.get('BACKLOG_TTL_SECONDS', '5'))
+TOURNAMENT_CACHE_TTL_SECONDS = float(os.environ.get('TOURNAMENT_CACHE_TTL_SECONDS', '60'))
+# Admission control: submissions are turned away with 429 while more than
+# ADMISSION_MAX_BACKLOG wait in QuizSubmissionQueue, or once a player's or a
+# quiz's token bucket is empty (rates in submissions per second); 0 disables
+ADMISSION_MAX_BACKLOG = int(os.environ.get('ADMISSION_MAX_BACKLOG', '0'))
+ADMISSION_BACKLOG_RETRY_SECONDS = int(os.environ.get('ADMISSION_BACKLOG_RETRY_SECONDS', '10'))
+ADMISSION_USER_RATE = float(os.environ.get('ADMISSION_USER_RATE', '0'))
+ADMISSION_USER_BURST = int(os.environ.get('ADMISSION_USER_BURST', '5'))
+ADMISSION_QUIZ_RATE = float(os.environ.get('ADMISSION_QUIZ_RATE', '0'))
+ADMISSION_QUIZ_BURST = int(os.environ.get('ADMISSION_QUIZ_BURST', '100'))
+
+storage = get_storage()
+answer_keys = AnswerKeyCache(storage, QUIZ_CACHE_MAX_ENTRIES)
+tournaments = TournamentCache(storage, TOURNAMENT_CACHE_TTL_SECONDS)
+# (approximate queue backlog, expiry); refreshed at most every BACKLOG_TTL_SECONDS
+_submission_backlog = None
+
+# Quiz versions are never modified once written, so the question count of a
+# (QuizID, Version) seen once stays valid; None for quizzes stored without one
+_known_quiz_versions = {}
+
+def remember_quiz_version(quiz_id, version, question_count):
+    if len(_known_quiz_versions) >= QUIZ_CACHE_MAX_ENTRIES:
+        _known_quiz_versions.pop(next(iter(_known_quiz_versions)))
+    _known_quiz_versions[(quiz_id, version)] = question_count
+
+def question_count(quiz):
+    # quizzes created before QuestionCount was stored are only checked against the global limit
+    count = quiz.get('QuestionCount')
+    return None if count is None else int(count)
+
+def resolve_quiz_version(quiz_id, version):
+    """Return (version, question count) a submission is scored against, or (None, None)
+    if it does not exist.
+
+    Without an explicit version the submission targets the current version.
+    """
+    if version is not None and (quiz_id, version) in _known_quiz_versions:
+        return version, _known_quiz_versions[(quiz_id, version)]
+    quiz = storage.quizzes.get_quiz(quiz_id, attributes=('QuizID', 'Version', 'QuestionCount'))
+    if quiz is None:
+        return None, None
+    # quizzes created before versioning was introduced are implicitly version 1
+    current_version = int(quiz.get('Version', 1))
+    remember_quiz_version(quiz_id, current_version, question_count(quiz))
+    if version is None or version == current_version:
+        return current_version, question_count(quiz)
+    if version > current_version:
+        return None, None
+    quiz = storage.quizzes.get_quiz_version(quiz_id, version, attributes=('QuizID', 'QuestionCount'))
+    if quiz is None:
+        return None, None
+    remember_quiz_version(quiz_id, version, question_count(quiz))
+    return version, question_count(quiz)
+
+def submission_backlog():
+    global _submission_backlog
+    now = time.monotonic()
+    if _submission_backlog is None or _submission_backlog[1] <= now:
+        _submission_backlog = (storage.publisher.submission_backlog(), now + BACKLOG_TTL_SECONDS)
+    return _submission_backlog[0]
+
+def retry_after(seconds):
+    # spread the retries of players turned away together over twice the wait
+    seconds = max(1, math.ceil(seconds))
+    return random.randint(seconds, 2 * seconds)
+
+def admission_wait(username, quiz_id):
+    """Return the seconds a submission has to wait before it is admitted, or 0 to admit it.
+
+    The player's bucket is checked first, so that a player retrying in a
+    loop does not use up the quiz's tokens; if the quiz's bucket then turns
+    the submission away, the player's token is put back. Admission fails
+    open: a storage error admits the submission.
+    """
+    if ADMISSION_MAX_BACKLOG and submission_backlog() > ADMISSION_MAX_BACKLOG:
+        return ADMISSION_BACKLOG_RETRY_SECONDS
+    buckets = (
+        (f'user#{username}', ADMISSION_USER_RATE, ADMISSION_USER_BURST),
+        (f'quiz#{quiz_id}', ADMISSION_QUIZ_RATE, ADMISSION_QUIZ_BURST),
+    )
+    taken = []
+    for bucket_key, rate, burst in buckets:
+        if not rate:
+            continue
+        try:
+            wait = storage.submissions.take_admission_token(bucket_key, admission.interval_ms(rate), burst)
+        except Exception as e:
+            print(f"Failed to take an admission token from {bucket_key}, admitting: {e}")
+            continue
+        if wait:
+            for taken_key, taken_rate in taken:
+                try:
+                    storage.submissions.return_admission_token(taken_key, admission.interval_ms(taken_rate))
+                except Exception as e:
+                    print(f"Failed to return an admission token to {taken_key}: {e}")
+            return wait / 1000
+        taken.append((bucket_key, rate))
+    return 0
+
+def score_inline(message_body, correlation_id):
+    """Score and store a submission right away.
+
+    Returns the stored item, or None if the submission should go through the
+    queue instead: inline scoring is disabled, the quiz is large, the queue is
+    backing up, or scoring or starting the email failed. A submission whose
+    score is already stored is then only emailed by the scoring function.
+    """
+    if not INLINE_SCORING_ENABLED or len(message_body['Answers']) > INLINE_SCORING_MAX_QUESTIONS:
+        return None
+    try:
+        # the queue absorbs load spikes, so defer to it as soon as it builds up
+        if submission_backlog() > INLINE_SCORING_MAX_BACKLOG:
+            return None
+        version, answer_key = answer_keys.get(message_body['QuizID'], message_body['Version'])
+        if answer_key is None or len(answer_key['CorrectAnswers']) > INLINE_SCORING_MAX_QUESTIONS:
+            return None
+        item = scored_submission(message_body, version, answer_key)
+        is_new = storage.submissions.put_submission_if_absent(item)
+    except Exception as e:
+        print(f"Inline scoring of {message_body['SubmissionID']} failed, deferring to the queue: {e}")
+        return None
+
+    scored_at = tracing.now_ms()
+    if is_new:
+        # the score is in the response, so there is no enqueue-to-scored latency to record
+        tracing.log_stage('scored', correlation_id, item['SubmissionID'], scored_at, Inline=True)
+        try:
+            tournaments.record(item)
+        except Exception as e:
+            print(f"Failed to update tournament scores for {item['SubmissionID']}: {e}")
+    email = message_body.get('Email')
+    if email:
+        # idempotent per submission, so a retry of a stored submission starts it at most once
+        try:
+            storage.publisher.start_email(email_input(item, email, correlation_id, scored_at if is_new else None))
+        except Exception as e:
+            print(f"Failed to start email for {item['SubmissionID']}, deferring to the queue: {e}")
+            return None
+    return item
+
+def warm_up(quiz_ids):
+    # Only quiz definitions are read here, never user submissions
+    storage.publisher.prepare()
+    if INLINE_SCORING_ENABLED:
+        answer_keys.warm_up(quiz_ids)
+    for quiz in storage.quizzes.batch_get_quizzes(quiz_ids, attributes=('QuizID', 'Version', 'QuestionCount')):
+        remember_quiz_version(quiz['QuizID'], int(quiz.get('Version', 1)), question_count(quiz))
+    return {'warmup': True, 'cached_quizzes': len(_known_quiz_versions)}
+
+def get_idempotency_key(event, submission):
+    # Clients may send the key either in the body or as an `Idempotency-Key` header
+    key = submission.get('IdempotencyKey')
+    if key:
+        return str(key)
+    for header, value in (event.get('headers') or {}).items():
+        if header.lower() == 'idempotency-key' and value:
+            return str(value)
+    return None
+
+def already_received(submission_id):
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': '*',
+        },
+        'body': codec.dumps({'message': 'Submission already received', 'SubmissionID': submission_id})
+    }
+
 def lambda_handler(event, context):
+    if event.get('warmup'):
+        return warm_up(event.get('quiz_ids') or [])
+
+    received_at = tracing.now_ms()
     try:
-        submission = json.loads(event['body'])
+        submission = validate_submission(codec.loads(event['body']))
         username = submission['Username']
         quiz_id = submission['QuizID']
         answers = submission['Answers']
         email = submission.get('Email')
-
-        if not username or not quiz_id or not answers:
-            raise ValueError("Username, QuizID, and Answers are required.")
-
-        for question_idx, answer_data in answers.items():
-            if 'Answer' not in answer_data or 'TimeTaken' not in answer_data:
-                raise ValueError(f"Answer for question {question_idx} must include 'Answer' and 'TimeTaken'")
-            time_taken = float(answer_data['TimeTaken'])
-            if time_taken < 0:
-                raise ValueError(f"TimeTaken for question {question_idx} must be non-negative")
-    except (KeyError, json.JSONDecodeError, ValueError, TypeError) as e:
+        version = submission.get('Version')
+        idempotency_key = get_idempotency_key(event, submission)
+    except (KeyError, codec.JSONDecodeError, ValueError, TypeError) as e:
         return {
             'statusCode': 400,
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': '*',
             },
-            'body': json.dumps({'message': 'Invalid input data', 'error': str(e)})
+            'body': codec.dumps({'message': 'Invalid input data', 'error': str(e)})
         }
 
-    dynamodb = boto3.resource('dynamodb')
-    quizzes_table = dynamodb.Table('Quizzes')
+    dedup_key = f"{quiz_id}#{username}#{idempotency_key}" if idempotency_key else None
+    if dedup_key:
+        # a retry of an accepted submission gets its SubmissionID back and takes
+        # no admission tokens; the claim below still settles concurrent retries
+        try:
+            existing_id = storage.submissions.get_idempotency_key(dedup_key)
+        except Exception as e:
+            print(f"Failed to look up idempotency key {dedup_key}: {e}")
+            existing_id = None
+        if existing_id is not None:
+            return already_received(existing_id)
 
     try:
-        response = quizzes_table.get_item(Key={'QuizID': quiz_id})
-        if 'Item' not in response:
+        wait = admission_wait(username, quiz_id)
+    except Exception as e:
+        print(f"Admission check failed, admitting: {e}")
+        wait = 0
+    if wait:
+        seconds = retry_after(wait)
+        print(f"Turned away a submission of {username} to {quiz_id}, retry after {seconds}s")
+        return {
+            'statusCode': 429,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': '*',
+                'Access-Control-Expose-Headers': 'Retry-After',
+                'Retry-After': str(seconds),
+            },
+            'body': codec.dumps({'message': 'Too many submissions, please retry later.', 'RetryAfter': seconds})
+        }
+
+    try:
+        resolved_version, total_questions = resolve_quiz_version(quiz_id, version)
+        if resolved_version is None:
+            if version is None:
+                message = f'QuizID "{quiz_id}" does not exist.'
+            else:
+                message = f'Version {version} of QuizID "{quiz_id}" does not exist.'
             return {
                 'statusCode': 400,
                 'headers': {
                     'Access-Control-Allow-Origin': '*',
                     'Access-Control-Allow-Methods': '*',
                 },
-                'body': json.dumps({'message': f'QuizID "{quiz_id}" does not exist.'})
+                'body': codec.dumps({'message': message})
             }
     except Exception as e:
         return {
@@ -50,36 +264,91 @@ def lambda_handler(event, context):
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': '*',
             },
-            'body': json.dumps({'message': 'Error accessing the Quizzes table.', 'error': str(e)})
+            'body': codec.dumps({'message': 'Error accessing the Quizzes table.', 'error': str(e)})
         }
 
-    sqs = boto3.client('sqs')
-    queue_url = sqs.get_queue_url(QueueName='QuizSubmissionQueue')['QueueUrl']
+    if total_questions is not None:
+        try:
+            check_answer_indices(answers, total_questions)
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Methods': '*',
+                },
+                'body': codec.dumps({'message': 'Invalid input data', 'error': str(e)})
+            }
+
+    submission_id = str(uuid.uuid4())
+    if dedup_key:
+        try:
+            submission_id, is_new = storage.submissions.claim_idempotency_key(
+                dedup_key, submission_id, IDEMPOTENCY_TTL_SECONDS
+            )
+        except Exception as e:
+            return {
+                'statusCode': 500,
+                'headers': {
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Methods': '*',
+                },
+                'body': codec.dumps({'message': 'Error recording idempotency key.', 'error': str(e)})
+            }
+        if not is_new:
+            return already_received(submission_id)
 
     message_body = {
-        'SubmissionID': str(uuid.uuid4()),
+        'SubmissionID': submission_id,
         'Username': username,
         'QuizID': quiz_id,
+        'Version': resolved_version,
         'Answers': answers,
+        'SubmittedAt': now_iso(),
     }
 
     if email:
         message_body['Email'] = email
 
+    correlation_id = tracing.new_correlation_id()
+    item = score_inline(message_body, correlation_id)
+    if item is not None:
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': '*',
+            },
+            'body': codec.dumps({
+                'message': 'Submission scored',
+                'SubmissionID': submission_id,
+                'CorrelationId': correlation_id,
+                'Score': float(item['Score']),
+                'TotalQuestions': int(item['TotalQuestions']),
+                'QuizVersion': int(item['QuizVersion']),
+            })
+        }
+
     try:
-        sqs.send_message(
-            QueueUrl=queue_url,
-            MessageBody=json.dumps(message_body)
+        storage.publisher.publish_submission(
+            message_body, tracing.message_attributes(correlation_id, tracing.now_ms())
         )
     except Exception as e:
+        if dedup_key is not None:
+            # Release the key so that a client retry can enqueue the submission again
+            try:
+                storage.submissions.release_idempotency_key(dedup_key)
+            except Exception as delete_e:
+                print(f"Failed to release idempotency key {dedup_key}: {delete_e}")
         return {
             'statusCode': 500,
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': '*',
             },
-            'body': json.dumps({'message': 'Error sending message to SQS.', 'error': str(e)})
+            'body': codec.dumps({'message': 'Error sending message to SQS.', 'error': str(e)})
         }
+    tracing.log_stage('enqueued', correlation_id, submission_id, tracing.now_ms(), ReceivedAt=received_at)
 
     return {
         'statusCode': 200,
@@ -87,5 +356,9 @@ def lambda_handler(event, context):
             'Access-Control-Allow-Origin': '*',
             'Access-Control-Allow-Methods': '*',
         },
-        'body': json.dumps({'message': 'Submission received', 'SubmissionID': message_body['SubmissionID']})
+        'body': codec.dumps({
+            'message': 'Submission received',
+            'SubmissionID': message_body['SubmissionID'],
+            'CorrelationId': correlation_id,
+        })
     }
@@ -0,0 +1,120 @@
+
+from quiz_common import codec
+from quiz_common.quizzes import quiz_questions, stored_quiz, with_public_body
+from quiz_common.storage import get_storage
+from quiz_common.validation import UPDATABLE_FIELDS, validate_quiz_update
+
+storage = get_storage()
+
+def lambda_handler(event, context):
+    if event.get('warmup'):
+        # Clients are created at import time, nothing else to prime
+        return {'warmup': True}
+
+    try:
+        update_data = validate_quiz_update(codec.loads(event['body']))
+        quiz_id = update_data['QuizID']
+        expected_version = update_data['ExpectedVersion']
+    except (KeyError, codec.JSONDecodeError, ValueError, TypeError) as e:
+        return {
+            'statusCode': 400,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': '*',
+            },
+            'body': codec.dumps({
+                'message': 'Invalid input data',
+                'error': str(e)
+            })
+        }
+
+    try:
+        current = storage.quizzes.get_quiz(quiz_id, consistent=True)
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': '*',
+            },
+            'body': codec.dumps({'message': 'Error accessing the Quizzes table.', 'error': str(e)})
+        }
+
+    if current is None:
+        return {
+            'statusCode': 404,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': '*',
+            },
+            'body': codec.dumps({'message': 'Quiz not found'})
+        }
+
+    # quizzes created before versioning was introduced are implicitly version 1
+    current_version = int(current.get('Version', 1))
+    if current_version != expected_version:
+        return conflict_response(quiz_id, current_version)
+
+    updated = dict(current)
+    for field in UPDATABLE_FIELDS:
+        if field in update_data:
+            updated[field] = update_data[field]
+    if updated.get('EnableTimer'):
+        updated['TimerSeconds'] = int(updated.get('TimerSeconds') or 0)
+        if updated['TimerSeconds'] <= 0:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Methods': '*',
+                },
+                'body': codec.dumps({'message': 'Invalid input data', 'error': 'TimerSeconds must be a positive integer'})
+            }
+    else:
+        updated.pop('TimerSeconds', None)
+    updated['Version'] = current_version + 1
+    updated['QuestionCount'] = len(quiz_questions(updated))
+    with_public_body(updated)
+
+    snapshot = dict(current)
+    snapshot['Version'] = current_version
+    # also covers quizzes stored before they had a public body
+    with_public_body(snapshot)
+
+    # Archive the superseded version and swap in the new one atomically; this
+    # fails if a concurrent update already replaced the expected version
+    try:
+        replaced = storage.quizzes.replace_quiz(stored_quiz(updated), stored_quiz(snapshot), current_version)
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': '*',
+            },
+            'body': codec.dumps({'message': 'Error updating quiz data.', 'error': str(e)})
+        }
+    if not replaced:
+        return conflict_response(quiz_id, None)
+
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': '*',
+        },
+        'body': codec.dumps({'QuizID': quiz_id, 'Version': updated['Version']})
+    }
+
+def conflict_response(quiz_id, current_version):
+    body = {'message': f'Quiz "{quiz_id}" was modified by another update. Reload it and try again.'}
+    if current_version is not None:
+        body['CurrentVersion'] = current_version
+    return {
+        'statusCode': 409,
+        'headers': {
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': '*',
+        },
+        'body': codec.dumps(body)
+    }
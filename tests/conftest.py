@@ -0,0 +1,36 @@
+"""Helpers shared by the unit tests, which run the handlers in process on the in-memory storage."""
+
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+LAMBDAS_ROOT = os.path.join(ROOT, 'lambdas')
+sys.path.insert(0, os.path.join(LAMBDAS_ROOT, 'common', 'python'))
+
+from quiz_common.handlers import import_handler  # noqa: E402
+from quiz_common.storage import create_storage, set_storage  # noqa: E402
+
+
+def load_handler(package):
+    """A fresh copy of a handler module, bound to the storage set at that moment."""
+    return import_handler(LAMBDAS_ROOT, package)
+
+
+def load_script(name):
+    """Import `bin/<name>.py` as a module."""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, 'bin', f'{name}.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def storage():
+    """In-memory storage, installed as the process-wide storage the handlers bind at import."""
+    storage = create_storage('memory')
+    set_storage(storage)
+    yield storage
+    set_storage(None)
@@ -52,10 +52,24 @@ curl -X POST "$API_ENDPOINT/createquiz" \
     ]
 }'
 
+# Update a quiz; ExpectedVersion must match the current version
+
+curl -X POST "$API_ENDPOINT/updatequiz" \
+-H "Content-Type: application/json" \
+-d '{
+    "QuizID": "astonishing-dinosaurs-glided",
+    "ExpectedVersion": 1,
+    "Title": "Sample Quiz (fixed typo)"
+}'
+
 # List Quizzes; Private quiz is not listed
 
 curl -X GET "$API_ENDPOINT/listquizzes"
 
+# Search public quizzes; the last word also matches as a prefix
+
+curl -X GET "$API_ENDPOINT/searchquizzes?q=sample%20qu&limit=10"
+
 # Get the quiz; Change the ID below
 
 curl -X GET "$API_ENDPOINT/getquiz?quiz_id=astonishing-dinosaurs-glided"
@@ -104,6 +118,30 @@ curl -X GET "$API_ENDPOINT/getsubmission?submission_id=2c5cb81f-7b21-4ef0-a4a5-6
 
 curl -X GET "$API_ENDPOINT/getleaderboard?quiz_id=astonishing-dinosaurs-glided&top=3"
 
+# Page through the leaderboard (pass NextToken back as next_token for the next page)
+
+curl -X GET "$API_ENDPOINT/getleaderboard?quiz_id=astonishing-dinosaurs-glided&limit=10"
+
+# Get the entries ranked around a submission
+
+curl -X GET "$API_ENDPOINT/getleaderboard?quiz_id=astonishing-dinosaurs-glided&submission_id=2c5cb81f-7b21-4ef0-a4a5-69f8fc359dd0&count=5"
+
+# Create a tournament over two quizzes and rank the players by their summed best scores
+
+curl -X POST "$API_ENDPOINT/createtournament" \
+-H "Content-Type: application/json" \
+-d '{
+    "Title": "Sample Tournament",
+    "QuizIDs": ["astonishing-dinosaurs-glided", "enchanted-hamsters-hopped"],
+    "Rule": "sum"
+}'
+
+curl -X GET "$API_ENDPOINT/gettournamentleaderboard?tournament_id=<TournamentID>&limit=10"
+
+# Get a user's submission history (pass NextToken back as next_token for the next page)
+
+curl -X GET "$API_ENDPOINT/getusersubmissions?username=user1&limit=10"
+
 # Check SES
 curl -s http://localhost.localstack.cloud:4566/_aws/ses
 
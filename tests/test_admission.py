@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+from quiz_common import admission
+
+from tests.conftest import load_handler
+
+QUIZ = {
+    'QuizID': 'busy-quiz',
+    'Title': 'Busy Quiz',
+    'Visibility': 'Public',
+    'Version': 1,
+    'QuestionCount': 1,
+    'Questions': [{'QuestionText': 'Q1', 'Options': ['A. 1', 'B. 2'], 'CorrectAnswer': 'A. 1'}],
+}
+
+
+@pytest.fixture
+def storage(storage):
+    storage.quizzes.put_quiz(QUIZ)
+    return storage
+
+
+def submit(handler, username, **fields):
+    body = {'Username': username, 'QuizID': 'busy-quiz', 'Answers': {'0': {'Answer': 'A. 1', 'TimeTaken': 1}}, **fields}
+    return handler.lambda_handler({'body': json.dumps(body)}, None)
+
+
+def test_bucket_admits_a_burst_then_one_token_per_interval():
+    full_at, wait = admission.take(None, 1000, 100, 3)
+    assert (full_at, wait) == (1100, 0)
+    full_at, _ = admission.take(full_at, 1000, 100, 3)
+    full_at, _ = admission.take(full_at, 1000, 100, 3)
+    assert full_at == 1300
+    assert admission.take(full_at, 1000, 100, 3) == (1300, 100)
+    # one interval later a token is back; a bucket idle for long is full again
+    assert admission.take(full_at, 1100, 100, 3) == (1400, 0)
+    assert admission.take(full_at, 5000, 100, 3) == (5100, 0)
+    assert admission.interval_ms(0.5) == 2000
+
+
+def test_players_are_turned_away_once_their_bucket_is_empty(storage, monkeypatch):
+    monkeypatch.setenv('ADMISSION_USER_RATE', '0.01')
+    monkeypatch.setenv('ADMISSION_USER_BURST', '2')
+    handler = load_handler('submit_quiz')
+
+    assert [submit(handler, 'alice')['statusCode'] for _ in range(3)] == [200, 200, 429]
+    response = submit(handler, 'alice')
+    assert 100 <= int(response['headers']['Retry-After']) <= 200
+    assert json.loads(response['body'])['RetryAfter'] == int(response['headers']['Retry-After'])
+    # other players have buckets of their own, and nothing was enqueued for the rejected ones
+    assert submit(handler, 'bob')['statusCode'] == 200
+    assert len(storage.publisher.drain_submissions()) == 3
+
+
+def test_quiz_bucket_and_backlog_bound_the_queue(storage, monkeypatch):
+    monkeypatch.setenv('ADMISSION_QUIZ_RATE', '0.01')
+    monkeypatch.setenv('ADMISSION_QUIZ_BURST', '2')
+    handler = load_handler('submit_quiz')
+    assert [submit(handler, name)['statusCode'] for name in ('a', 'b', 'c')] == [200, 200, 429]
+
+    monkeypatch.setenv('ADMISSION_QUIZ_RATE', '0')
+    monkeypatch.setenv('ADMISSION_MAX_BACKLOG', '1')
+    monkeypatch.setenv('ADMISSION_BACKLOG_RETRY_SECONDS', '3')
+    # the two admitted submissions are still waiting to be scored
+    response = submit(load_handler('submit_quiz'), 'd')
+    assert response['statusCode'] == 429 and 3 <= int(response['headers']['Retry-After']) <= 6
+
+
+def test_players_keep_their_token_when_the_quiz_turns_them_away(storage, monkeypatch):
+    monkeypatch.setenv('ADMISSION_USER_RATE', '0.01')
+    monkeypatch.setenv('ADMISSION_USER_BURST', '2')
+    monkeypatch.setenv('ADMISSION_QUIZ_RATE', '0.01')
+    monkeypatch.setenv('ADMISSION_QUIZ_BURST', '1')
+    handler = load_handler('submit_quiz')
+    assert submit(handler, 'bob')['statusCode'] == 200
+    assert [submit(handler, 'alice')['statusCode'] for _ in range(3)] == [429, 429, 429]
+
+    # alice's bucket is still full once the quiz's has room again
+    monkeypatch.setenv('ADMISSION_QUIZ_RATE', '0')
+    handler = load_handler('submit_quiz')
+    assert [submit(handler, 'alice')['statusCode'] for _ in range(3)] == [200, 200, 429]
+
+
+def test_retries_of_accepted_submissions_take_no_tokens(storage, monkeypatch):
+    monkeypatch.setenv('ADMISSION_USER_RATE', '0.01')
+    monkeypatch.setenv('ADMISSION_USER_BURST', '1')
+    handler = load_handler('submit_quiz')
+    first = json.loads(submit(handler, 'alice', IdempotencyKey='k1')['body'])
+
+    # the bucket is empty, yet the retries get the SubmissionID they were given
+    for _ in range(3):
+        response = submit(handler, 'alice', IdempotencyKey='k1')
+        assert response['statusCode'] == 200
+        assert json.loads(response['body'])['SubmissionID'] == first['SubmissionID']
+    assert submit(handler, 'alice', IdempotencyKey='k2')['statusCode'] == 429
+
+
+def test_admission_fails_open(storage, monkeypatch):
+    monkeypatch.setenv('ADMISSION_USER_RATE', '1')
+
+    def unavailable(*args):
+        raise RuntimeError('table unavailable')
+    monkeypatch.setattr(storage.submissions, 'take_admission_token', unavailable)
+    assert submit(load_handler('submit_quiz'), 'alice')['statusCode'] == 200
@@ -0,0 +1,53 @@
+import json
+from decimal import Decimal
+
+from quiz_common.archive import decode_items, encode_items, file_key, open_archive, partition, quiz_prefix
+
+from tests.conftest import load_handler
+
+
+def make_submission(submission_id, score, submitted_at='2026-03-01T10:00:00.000+00:00'):
+    return {
+        'SubmissionID': submission_id,
+        'Username': f'user-{submission_id}',
+        'QuizID': 'q1',
+        'SubmittedAt': submitted_at,
+        'UserAnswers': {'0': {'Answer': 'A. 1', 'TimeTaken': Decimal(3)}},
+        'Score': Decimal(score),
+        'TotalQuestions': Decimal(1),
+    }
+
+
+def test_items_round_trip_with_decimals():
+    items = [make_submission('s1', '87.5'), make_submission('s2', '100')]
+    assert list(decode_items(encode_items(items))) == items
+
+
+def test_partitions_by_quiz_and_day():
+    assert partition(make_submission('s1', '1')) == ('q1', '2026-03-01')
+    assert partition({'QuizID': 'q1'}) == ('q1', 'undated')
+    assert file_key('q1', '2026-03-01', '42') == 'submissions/quiz_id=q1/date=2026-03-01/42.jsonl.gz'
+
+
+def test_local_archive_lists_quiz_files(tmp_path):
+    archive = open_archive(str(tmp_path))
+    archive.put(file_key('q1', '2026-03-01', '1'), encode_items([make_submission('s1', '1')]))
+    archive.put(file_key('q1', '2026-03-02', '2'), encode_items([make_submission('s2', '2')]))
+    archive.put(file_key('q10', '2026-03-02', '3'), encode_items([make_submission('s3', '3')]))
+
+    keys = archive.list(quiz_prefix('q1'))
+    assert keys == [file_key('q1', '2026-03-01', '1'), file_key('q1', '2026-03-02', '2')]
+    assert [item['SubmissionID'] for item in decode_items(archive.get(keys[1]))] == ['s2']
+
+
+def test_leaderboard_includes_archived_submissions(storage):
+    handler = load_handler('get_leaderboard')
+    storage.submissions.put_submission_if_absent(make_submission('live', '50'))
+    storage.snapshots.merge_snapshot('q1', [
+        {'SubmissionID': 'archived-1', 'Username': 'old', 'Score': Decimal('90')},
+        {'SubmissionID': 'archived-2', 'Username': 'older', 'Score': Decimal('10')},
+    ], size=100)
+
+    response = handler.lambda_handler({'queryStringParameters': {'quiz_id': 'q1', 'top': '2'}}, None)
+    assert response['statusCode'] == 200
+    assert [entry['SubmissionID'] for entry in json.loads(response['body'])] == ['archived-1', 'live']
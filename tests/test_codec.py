@@ -0,0 +1,47 @@
+import json
+import os
+import sys
+from decimal import Decimal
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambdas', 'common', 'python'))
+
+from quiz_common.codec import JSONDecodeError, StdlibCodec, create_codec  # noqa: E402
+
+CODECS = [StdlibCodec()]
+try:
+    CODECS.append(create_codec('orjson'))
+except ImportError:
+    pass
+
+
+@pytest.fixture(params=CODECS, ids=lambda codec: codec.name)
+def codec(request):
+    return request.param
+
+
+def test_decimals_encode_as_numbers(codec):
+    item = {'Score': Decimal('87.5'), 'TotalQuestions': Decimal(10), 'Tags': {'b', 'a'}, 'Title': 'Café'}
+    assert json.loads(codec.dumps(item)) == {'Score': 87.5, 'TotalQuestions': 10, 'Tags': ['a', 'b'], 'Title': 'Café'}
+    assert codec.dumps({'a': [1, 2]}) == '{"a":[1,2]}'
+
+
+def test_loads_accepts_str_and_bytes(codec):
+    assert codec.loads('{"Answers":{"0":{"TimeTaken":1.5}}}') == {'Answers': {'0': {'TimeTaken': 1.5}}}
+    assert codec.loads(b'[1]') == [1]
+
+
+def test_invalid_json_raises_json_decode_error(codec):
+    with pytest.raises(JSONDecodeError):
+        codec.loads('{"Username": ')
+
+
+def test_unsupported_types_raise_type_error(codec):
+    with pytest.raises(TypeError):
+        codec.dumps({'value': object()})
+
+
+def test_unknown_codec_name():
+    with pytest.raises(ValueError):
+        create_codec('yaml')
@@ -0,0 +1,85 @@
+import json
+
+from quiz_common import quizzes
+from quiz_common.quizzes import PUBLIC_BODY
+from quiz_common.scoring import AnswerKeyCache
+
+from tests.conftest import load_handler
+
+QUESTION = {'QuestionText': 'Q?', 'Options': ['A. 1', 'B. 2'], 'CorrectAnswer': 'A. 1', 'Trivia': 'T'}
+
+
+def call(handler, payload=None, **params):
+    event = {'body': json.dumps(payload)} if payload is not None else {'queryStringParameters': params}
+    response = handler.lambda_handler(event, None)
+    return response['statusCode'], json.loads(response['body'])
+
+
+def test_serves_the_public_body_stored_with_each_version(storage):
+    create_quiz, update_quiz, get_quiz = (load_handler(name) for name in ('create_quiz', 'update_quiz', 'get_quiz'))
+    _, created = call(create_quiz, {'Title': 'Quiz', 'Questions': [QUESTION]})
+    quiz_id = created['QuizID']
+    stored = storage.quizzes.get_quiz(quiz_id)
+    assert 'CorrectAnswer' not in stored[PUBLIC_BODY]
+
+    status, body = call(get_quiz, quiz_id=quiz_id)
+    assert status == 200
+    assert body == json.loads(stored[PUBLIC_BODY])
+    assert body['Version'] == 1 and body['Questions'] == [{'QuestionText': 'Q?', 'Options': ['A. 1', 'B. 2'], 'Trivia': 'T'}]
+
+    assert call(update_quiz, {'QuizID': quiz_id, 'ExpectedVersion': 1, 'Title': 'Renamed'})[0] == 200
+    _, body = call(get_quiz, quiz_id=quiz_id, version='2')
+    assert (body['Title'], body['Version']) == ('Renamed', 2)
+    _, body = call(get_quiz, quiz_id=quiz_id, version='1')
+    assert (body['Title'], body['Version']) == ('Quiz', 1)
+
+
+def test_sanitizes_quizzes_stored_without_a_public_body(storage):
+    get_quiz = load_handler('get_quiz')
+    storage.quizzes.put_quiz({'QuizID': 'legacy', 'Title': 'Old', 'Questions': [QUESTION]})
+    status, body = call(get_quiz, quiz_id='legacy')
+    assert status == 200
+    assert body['Version'] == 1 and 'CorrectAnswer' not in body['Questions'][0]
+    assert get_quiz.warm_up(['legacy']) == {'warmup': True, 'cached_quizzes': 1}
+
+
+def test_compressed_quizzes_are_read_like_maps(storage, monkeypatch):
+    create_quiz, update_quiz, get_quiz = (load_handler(name) for name in ('create_quiz', 'update_quiz', 'get_quiz'))
+    monkeypatch.setattr(quizzes, 'QUIZ_STORAGE_FORMAT', 'compressed')
+    _, created = call(create_quiz, {'Title': 'Quiz', 'Questions': [QUESTION]})
+    quiz_id = created['QuizID']
+    stored = storage.quizzes.get_quiz(quiz_id)
+    assert isinstance(stored['Questions'], bytes) and stored['Questions'][0] == quizzes.COMPRESSED_V1
+
+    # an update writes the new and the superseded version in the current format
+    monkeypatch.setattr(quizzes, 'QUIZ_STORAGE_FORMAT', 'map')
+    assert call(update_quiz, {'QuizID': quiz_id, 'ExpectedVersion': 1, 'Title': 'Renamed'})[0] == 200
+    assert isinstance(storage.quizzes.get_quiz(quiz_id)['Questions'], list)
+    assert isinstance(storage.quizzes.get_quiz_version(quiz_id, 1)['Questions'], list)
+
+    _, body = call(get_quiz, quiz_id=quiz_id, version='1')
+    assert body['Questions'] == [{'QuestionText': 'Q?', 'Options': ['A. 1', 'B. 2'], 'Trivia': 'T'}]
+    monkeypatch.setattr(quizzes, 'QUIZ_STORAGE_FORMAT', 'compressed')
+    assert call(update_quiz, {'QuizID': quiz_id, 'ExpectedVersion': 2, 'Title': 'Again'})[0] == 200
+    assert AnswerKeyCache(storage, max_entries=4).get(quiz_id, 3)[1]['CorrectAnswers'] == ['A. 1']
+
+
+def test_creates_never_overwrite_an_existing_quiz(storage, monkeypatch):
+    create_quiz, update_quiz, retry_writes = (
+        load_handler(name) for name in ('create_quiz', 'update_quiz', 'retry_quizzes_writes')
+    )
+    _, created = call(create_quiz, {'Title': 'Quiz', 'Questions': [QUESTION]})
+    quiz_id = created['QuizID']
+    assert call(update_quiz, {'QuizID': quiz_id, 'ExpectedVersion': 1, 'Title': 'Renamed'})[0] == 200
+
+    # a late retry of the create from QuizzesWriteFailures is dropped
+    item = {'QuizID': quiz_id, 'Title': 'Quiz', 'Version': 1, 'Questions': [QUESTION]}
+    notification = {'Message': json.dumps({'TableName': 'Quizzes', 'Item': item})}
+    retry_writes.lambda_handler({'Records': [{'body': json.dumps(notification)}]}, None)
+    assert (storage.quizzes.get_quiz(quiz_id)['Title'], storage.quizzes.get_quiz(quiz_id)['Version']) == ('Renamed', 2)
+
+    # a colliding random ID is replaced by another one
+    ids = iter([quiz_id, 'fresh-quiz-id'])
+    monkeypatch.setattr(create_quiz, 'new_quiz_id', lambda: next(ids))
+    assert call(create_quiz, {'Title': 'Other', 'Questions': [QUESTION]}) == (200, {'QuizID': 'fresh-quiz-id'})
+    assert storage.quizzes.get_quiz(quiz_id)['Title'] == 'Renamed'
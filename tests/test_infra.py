@@ -1,9 +1,9 @@
 import pytest
 import boto3
 import requests
-import localstack.sdk.aws
 import json
-import time
+
+from tests.waiters import api_ready, leaderboard_filled, ses_messages, submission_scored, wait_until
 
 API_NAME = 'QuizAPI'
 STAGE_NAME = "prod"
@@ -26,7 +26,7 @@ def api_endpoint():
 
     print(f"API Endpoint: {API_ENDPOINT}")
 
-    time.sleep(2)
+    api_ready(API_ENDPOINT)
 
     return API_ENDPOINT
 
@@ -154,27 +154,8 @@ def test_quiz_workflow(api_endpoint):
 
         print(f"{user['Username']} submitted quiz with SubmissionID: {submission_response['SubmissionID']}")
 
-    time.sleep(5)
-
-    leaderboard_url = f"{api_endpoint}/getleaderboard?quiz_id={quiz_id}&top=3"
-    response = requests.get(leaderboard_url)
-    leaderboard = None
-
-    if response.json():
-        assert response.status_code == 200
-        leaderboard = response.json()
-    else:
-        # If the response is empty, retry it for 5 times with a 2 second delay.
-        # TODO: This is a hack to get around the fact that the leaderboard is not available immediately.
-        for _ in range(5):
-            time.sleep(2)
-            response = requests.get(leaderboard_url)
-            if response.json():
-                assert response.status_code == 200
-                leaderboard = response.json()
-                break
-
-    assert leaderboard is not None, "Failed to retrieve leaderboard data after retries"
+    # submissions are scored asynchronously
+    leaderboard = leaderboard_filled(api_endpoint, quiz_id, 3)
     assert len(leaderboard) == 3
     expected_scores = {
         "user1": None,
@@ -226,25 +207,198 @@ def test_quiz_workflow(api_endpoint):
 
         print(f"Verified submission for {submission['Username']} with Score: {actual_score}")
 
-    client = localstack.sdk.aws.AWSClient()
+    # the email is sent by the state machine after scoring
     sender_email = "sender@example.com"
-    messages = client.get_ses_messages(email_filter=sender_email)
+    messages = ses_messages(sender_email)
 
-    email_found = False
     for message in messages:
-        if message.source == sender_email:
-            email_found = True
-            assert hasattr(message, 'id')
-            assert hasattr(message, 'region')
-            assert hasattr(message, 'timestamp')
-            assert hasattr(message, 'destination')
-            assert hasattr(message, 'subject')
-            assert hasattr(message, 'body')
-
-            body = message.body
-            assert hasattr(body, 'html_part')
-            html_content = body.html_part
-
-            print(f"Email content: {html_content}")
-
-    assert email_found, f"No email found sent from {sender_email}"
+        for field in ('Id', 'Region', 'Timestamp', 'Destination', 'Subject', 'Body'):
+            assert field in message
+        html_content = message['Body']['html_part']
+
+        print(f"Email content: {html_content}")
+
+
+def test_submit_quiz_idempotency(api_endpoint):
+    create_quiz_payload = {
+        "Title": "Idempotency Quiz",
+        "Visibility": "Private",
+        "Questions": [
+            {
+                "QuestionText": "What is 2 + 2?",
+                "Options": ["A. 3", "B. 4", "C. 5", "D. 6"],
+                "CorrectAnswer": "B. 4",
+                "Trivia": "Addition is commutative."
+            }
+        ]
+    }
+    response = requests.post(
+        f"{api_endpoint}/createquiz",
+        headers={"Content-Type": "application/json"},
+        data=json.dumps(create_quiz_payload)
+    )
+    assert response.status_code == 200
+    quiz_id = response.json()['QuizID']
+
+    submission_payload = {
+        "Username": "retrying-user",
+        "QuizID": quiz_id,
+        "IdempotencyKey": "attempt-1",
+        "Answers": {"0": {"Answer": "B. 4", "TimeTaken": 3}}
+    }
+    submission_ids = []
+    for _ in range(3):
+        response = requests.post(
+            f"{api_endpoint}/submitquiz",
+            headers={"Content-Type": "application/json"},
+            data=json.dumps(submission_payload)
+        )
+        assert response.status_code == 200
+        submission_ids.append(response.json()['SubmissionID'])
+
+    assert len(set(submission_ids)) == 1
+
+    # a different key is a new attempt
+    submission_payload["IdempotencyKey"] = "attempt-2"
+    response = requests.post(
+        f"{api_endpoint}/submitquiz",
+        headers={"Content-Type": "application/json"},
+        data=json.dumps(submission_payload)
+    )
+    assert response.status_code == 200
+    assert response.json()['SubmissionID'] not in submission_ids
+
+
+def test_update_quiz_versioning(api_endpoint):
+    create_quiz_payload = {
+        "Title": "Versioned Quiz",
+        "Visibility": "Private",
+        "Questions": [
+            {
+                "QuestionText": "What is the capital of Italy?",
+                "Options": ["A. Rome", "B. Milan", "C. Naples", "D. Turin"],
+                "CorrectAnswer": "A. Rome",
+                "Trivia": "Rome is known as the Eternal City."
+            }
+        ]
+    }
+    response = requests.post(
+        f"{api_endpoint}/createquiz",
+        headers={"Content-Type": "application/json"},
+        data=json.dumps(create_quiz_payload)
+    )
+    assert response.status_code == 200
+    quiz_id = response.json()['QuizID']
+
+    response = requests.get(f"{api_endpoint}/getquiz?quiz_id={quiz_id}")
+    assert response.status_code == 200
+    assert response.json()['Version'] == 1
+
+    update_payload = {"QuizID": quiz_id, "ExpectedVersion": 1, "Title": "Versioned Quiz v2"}
+    response = requests.post(
+        f"{api_endpoint}/updatequiz",
+        headers={"Content-Type": "application/json"},
+        data=json.dumps(update_payload)
+    )
+    assert response.status_code == 200
+    assert response.json() == {"QuizID": quiz_id, "Version": 2}
+
+    # a stale update is rejected
+    response = requests.post(
+        f"{api_endpoint}/updatequiz",
+        headers={"Content-Type": "application/json"},
+        data=json.dumps(update_payload)
+    )
+    assert response.status_code == 409
+
+    response = requests.get(f"{api_endpoint}/getquiz?quiz_id={quiz_id}&version=2")
+    assert response.status_code == 200
+    assert response.json()['Title'] == "Versioned Quiz v2"
+
+    response = requests.get(f"{api_endpoint}/getquiz?quiz_id={quiz_id}&version=1")
+    assert response.status_code == 200
+    assert response.json()['Title'] == "Versioned Quiz"
+
+    response = requests.get(f"{api_endpoint}/getquiz?quiz_id={quiz_id}&version=3")
+    assert response.status_code == 404
+
+    # submissions against a superseded version are still accepted
+    submission_payload = {
+        "Username": "versioned-user",
+        "QuizID": quiz_id,
+        "Version": 1,
+        "Answers": {"0": {"Answer": "A. Rome", "TimeTaken": 2}}
+    }
+    response = requests.post(
+        f"{api_endpoint}/submitquiz",
+        headers={"Content-Type": "application/json"},
+        data=json.dumps(submission_payload)
+    )
+    assert response.status_code == 200
+    submission_id = response.json()['SubmissionID']
+
+    submission_data = submission_scored(api_endpoint, submission_id)
+    assert submission_data['QuizVersion'] == 1
+
+
+def test_user_submission_history(api_endpoint):
+    create_quiz_payload = {
+        "Title": "History Quiz",
+        "Visibility": "Private",
+        "Questions": [
+            {
+                "QuestionText": "What is 3 x 3?",
+                "Options": ["A. 6", "B. 9", "C. 12", "D. 33"],
+                "CorrectAnswer": "B. 9",
+                "Trivia": "Multiplication is repeated addition."
+            }
+        ]
+    }
+    response = requests.post(
+        f"{api_endpoint}/createquiz",
+        headers={"Content-Type": "application/json"},
+        data=json.dumps(create_quiz_payload)
+    )
+    assert response.status_code == 200
+    quiz_id = response.json()['QuizID']
+
+    username = f"history-user-{quiz_id}"
+    submission_ids = []
+    for answer in ["A. 6", "B. 9", "C. 12"]:
+        submission_payload = {
+            "Username": username,
+            "QuizID": quiz_id,
+            "Answers": {"0": {"Answer": answer, "TimeTaken": 1}}
+        }
+        response = requests.post(
+            f"{api_endpoint}/submitquiz",
+            headers={"Content-Type": "application/json"},
+            data=json.dumps(submission_payload)
+        )
+        assert response.status_code == 200
+        submission_ids.append(response.json()['SubmissionID'])
+
+    def read_history():
+        response = requests.get(f"{api_endpoint}/getusersubmissions?username={username}&limit=2")
+        assert response.status_code == 200
+        page = response.json()
+        history = page['Submissions']
+        if page['NextToken']:
+            response = requests.get(
+                f"{api_endpoint}/getusersubmissions",
+                params={"username": username, "limit": 2, "next_token": page['NextToken']}
+            )
+            assert response.status_code == 200
+            history += response.json()['Submissions']
+        return history if len(history) == 3 else None
+
+    # the history is read from a GSI, which is updated asynchronously
+    history = wait_until(read_history, f"the submission history of {username}")
+
+    assert sorted(item['SubmissionID'] for item in history) == sorted(submission_ids)
+    # newest first, projected fields only
+    assert [item['SubmittedAt'] for item in history] == sorted((item['SubmittedAt'] for item in history), reverse=True)
+    assert all('UserAnswers' not in item for item in history)
+
+    response = requests.get(f"{api_endpoint}/getusersubmissions?username={username}&next_token=not-a-token")
+    assert response.status_code == 400
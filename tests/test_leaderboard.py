@@ -0,0 +1,71 @@
+import json
+from decimal import Decimal
+
+import pytest
+
+from tests.conftest import load_handler
+
+
+@pytest.fixture
+def storage(storage):
+    for idx, score in enumerate([90, 80, 70, 70, 60, 50, 40]):
+        storage.submissions.put_submission_if_absent({
+            'SubmissionID': f's{idx}',
+            'Username': f'user-{idx}',
+            'QuizID': 'q1',
+            'Score': Decimal(score),
+            'TotalQuestions': Decimal(1),
+        })
+    storage.snapshots.merge_snapshot('q1', [{'SubmissionID': 'archived', 'Username': 'old', 'Score': Decimal(65)}], size=100)
+    return storage
+
+
+@pytest.fixture
+def handler(storage):
+    return load_handler('get_leaderboard')
+
+
+def get(handler, **params):
+    response = handler.lambda_handler({'queryStringParameters': {'quiz_id': 'q1', **params}}, None)
+    return response['statusCode'], json.loads(response['body'])
+
+
+def test_pages_cover_live_and_archived_entries_once(handler):
+    seen = []
+    status, body = get(handler, limit='3')
+    while True:
+        assert status == 200
+        seen.extend(entry['SubmissionID'] for entry in body['Leaderboard'])
+        if not body['NextToken']:
+            break
+        status, body = get(handler, limit='3', next_token=body['NextToken'])
+    assert seen == ['s0', 's1', 's2', 's3', 'archived', 's4', 's5', 's6']
+
+
+def test_rejects_tokens_of_other_quizzes(handler):
+    _, body = get(handler, limit='2')
+    response = handler.lambda_handler(
+        {'queryStringParameters': {'quiz_id': 'q2', 'next_token': body['NextToken']}}, None
+    )
+    assert response['statusCode'] == 400
+    assert get(handler, next_token='not-a-token')[0] == 400
+    assert get(handler, limit='0')[0] == 400
+
+
+def test_around_me_window(handler):
+    status, body = get(handler, submission_id='s4', count='2')
+    assert status == 200
+    assert [entry['SubmissionID'] for entry in body['Above']] == ['s3', 'archived']
+    assert body['Entry'] == {'Username': 'user-4', 'Score': 60.0, 'SubmissionID': 's4'}
+    assert [entry['SubmissionID'] for entry in body['Below']] == ['s5', 's6']
+
+    _, body = get(handler, submission_id='s0', count='2')
+    assert body['Above'] == []
+    assert get(handler, submission_id='missing')[0] == 404
+
+
+def test_only_successful_responses_are_cacheable(handler):
+    response = handler.lambda_handler({'queryStringParameters': {'quiz_id': 'q1', 'top': '3'}}, None)
+    assert response['headers']['Cache-Control'] == f'public, max-age={handler.LEADERBOARD_CACHE_SECONDS}'
+    response = handler.lambda_handler({'queryStringParameters': {'quiz_id': 'q1', 'submission_id': 'missing'}}, None)
+    assert 'Cache-Control' not in response['headers']
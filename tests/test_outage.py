@@ -1,13 +1,15 @@
 import pytest
-import time
 import boto3
 import json
 import requests
+from botocore.exceptions import ClientError
 
 import localstack.sdk.chaos
 from localstack.sdk.models import FaultRule
 from localstack.sdk.chaos.managers import fault_configuration
 
+from tests.waiters import api_ready, quiz_in_catalog, wait_until
+
 LOCALSTACK_ENDPOINT = "http://localhost.localstack.cloud:4566"
 API_NAME = "QuizAPI"
 STAGE_NAME = "prod"
@@ -33,18 +35,27 @@ def api_endpoint(apigateway_client):
 
     print(f"API Endpoint: {API_ENDPOINT}")
 
-    time.sleep(2)
+    api_ready(API_ENDPOINT)
 
     return API_ENDPOINT
 
+def dynamodb_unavailable(dynamodb_client):
+    try:
+        dynamodb_client.list_tables(Limit=1)
+    except ClientError:
+        return True
+    return False
+
+
 def test_dynamodb_outage(api_endpoint):
     outage_rule = FaultRule(region="us-east-1", service="dynamodb")
+    dynamodb_client = boto3.client('dynamodb', endpoint_url=LOCALSTACK_ENDPOINT)
 
     # Using fault_configuration context manager to apply and automatically clean up the fault rule
     with fault_configuration(fault_rules=[outage_rule]):
         print("DynamoDB outage initiated within context.")
 
-        time.sleep(2) # Add a 2-second delay
+        wait_until(lambda: dynamodb_unavailable(dynamodb_client), "the DynamoDB outage to start", timeout=10)
 
         # Attempt to create a quiz during the outage
         create_quiz_payload = {
@@ -75,12 +86,6 @@ def test_dynamodb_outage(api_endpoint):
 
     # After the context manager exits, the outage should be resolved
     print("Waiting for the system to process the queued request...")
-    time.sleep(15)
-
     # Check if the quiz was eventually created successfully
-    response = requests.get(f"{api_endpoint}/listquizzes")
-    assert response.status_code == 200
-    quizzes_list = response.json().get('Quizzes', [])
-    quiz_titles = [quiz['Title'] for quiz in quizzes_list]
-    assert "Outage Test Quiz" in quiz_titles
+    quiz_in_catalog(api_endpoint, "Outage Test Quiz", timeout=60)
     print("Quiz successfully created after outage resolved.")
@@ -1,13 +1,12 @@
 import pytest
-import time
 import boto3
 import json
-import requests
-import localstack.sdk.aws
 import localstack.sdk.chaos
 from localstack.sdk.models import FaultRule
 from localstack.sdk.chaos.managers import fault_configuration
 
+from tests.waiters import queue_drained, ses_messages
+
 LOCALSTACK_ENDPOINT = "http://localhost.localstack.cloud:4566"
 QUEUE_NAME = "QuizSubmissionQueue"
 SENDER_EMAIL = "admin@localstack.com"
@@ -39,37 +38,25 @@ class TestLocalStackClient:
             assert response["ResponseMetadata"]["HTTPStatusCode"] == 200
             print(f"Message sent to SQS queue {QUEUE_NAME}: {message_body}")
 
+            # the message moves to the DLQ once it has failed to be processed
             print("Waiting for system to process message during Lambda outage...")
-            time.sleep(15)
+            queue_drained(sqs_client, queue_url, timeout=90)
 
         print("Outage resolved, checking SES for notifications...")
 
-        ses_url = f"{LOCALSTACK_ENDPOINT}/_aws/ses"
-        response = requests.get(ses_url)
-        response.raise_for_status()
-        messages_data = response.json()
-
-        email_found = False
         expected_subject = "SNS-Subscriber-Endpoint"
         expected_body_text_part_contains = "QuizSubmissionQueue"
-        SENDER_EMAIL = "admin@localstack.com"
-
-        messages = messages_data.get("messages", [])
 
-        for message in messages:
-            if message["Source"] == SENDER_EMAIL:
-                email_found = True
-                assert message["Subject"] == expected_subject, f"Subject mismatch. Expected: {expected_subject}, Found: {message['Subject']}"
-                assert "Body" in message, "Message body missing."
-                
-                body = message["Body"]
-                assert "text_part" in body, "Text part missing in body."
-                text_part = body["text_part"]
-                assert expected_body_text_part_contains in text_part, f"Expected content not found in text part: {expected_body_text_part_contains}"
+        # the pipe forwards the DLQ message to SNS, which emails the subscriber
+        message = ses_messages(SENDER_EMAIL, endpoint=LOCALSTACK_ENDPOINT, timeout=60)[0]
+        assert message["Subject"] == expected_subject, f"Subject mismatch. Expected: {expected_subject}, Found: {message['Subject']}"
+        assert "Body" in message, "Message body missing."
 
-                print(f"Email found with subject '{expected_subject}' and matching body content.")
-                break
+        body = message["Body"]
+        assert "text_part" in body, "Text part missing in body."
+        text_part = body["text_part"]
+        assert expected_body_text_part_contains in text_part, f"Expected content not found in text part: {expected_body_text_part_contains}"
 
-        assert email_found, f"No email found sent from {SENDER_EMAIL} with subject '{expected_subject}'."
+        print(f"Email found with subject '{expected_subject}' and matching body content.")
 
         print("Test completed successfully.")
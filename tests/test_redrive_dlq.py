@@ -0,0 +1,69 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from tests.conftest import load_script
+
+redrive_dlq = load_script('redrive_dlq')
+
+
+class FakeSQS:
+    def __init__(self, messages, failed_deletes=()):
+        self.queue = list(messages)
+        self.failed_deletes = set(failed_deletes)
+        self.sent = []
+        self.deleted = []
+
+    def receive_message(self, **kwargs):
+        batch, self.queue = self.queue[:kwargs['MaxNumberOfMessages']], self.queue[kwargs['MaxNumberOfMessages']:]
+        return {'Messages': batch}
+
+    def send_message_batch(self, QueueUrl, Entries):
+        self.sent.extend(entry['MessageBody'] for entry in Entries)
+        return {'Successful': [{'Id': entry['Id']} for entry in Entries]}
+
+    def delete_message_batch(self, QueueUrl, Entries):
+        failed = [entry for entry in Entries if entry['ReceiptHandle'] in self.failed_deletes]
+        self.deleted.extend(entry['ReceiptHandle'] for entry in Entries if entry not in failed)
+        return {
+            'Successful': [{'Id': entry['Id']} for entry in Entries if entry not in failed],
+            'Failed': [{'Id': entry['Id'], 'Code': 'ReceiptHandleIsInvalid', 'Message': 'gone'} for entry in failed],
+        }
+
+
+def message(index):
+    return {'MessageId': f'm{index}', 'ReceiptHandle': f'r{index}', 'Body': f'{{"QuizID": "q{index}"}}'}
+
+
+def run_receiver(sqs, dry_run=False):
+    args = SimpleNamespace(empty_polls=1, max_messages=0, visibility_timeout=30, quiz_id=None, dry_run=dry_run)
+    stats, held = redrive_dlq.Stats(), []
+    redrive_dlq.receiver(
+        sqs, 'dlq', 'queue', args, redrive_dlq.RateLimiter(0), stats, held, threading.Lock()
+    )
+    return stats, held
+
+
+def test_rate_below_the_batch_size_still_admits_a_batch():
+    limiter = redrive_dlq.RateLimiter(5)
+    started = time.monotonic()
+    limiter.acquire(10)
+    limiter.acquire(1)
+    # the first batch fits the bucket, the next message waits for one refill
+    assert 0.1 < time.monotonic() - started < 1
+
+
+def test_messages_not_deleted_from_the_dlq_count_as_failed():
+    sqs = FakeSQS([message(index) for index in range(3)], failed_deletes={'r1'})
+    stats, _ = run_receiver(sqs)
+    assert len(sqs.sent) == 3
+    assert sqs.deleted == ['r0', 'r2']
+    assert (stats.received, stats.redriven, stats.failed) == (3, 2, 1)
+
+
+def test_dry_run_counts_messages_it_would_redrive():
+    sqs = FakeSQS([message(index) for index in range(3)])
+    stats, held = run_receiver(sqs, dry_run=True)
+    assert sqs.sent == [] and sqs.deleted == []
+    assert (stats.redriven, stats.would_redrive) == (0, 3)
+    assert len(held) == 3
@@ -0,0 +1,222 @@
+import json
+import threading
+import time
+from decimal import Decimal
+
+import pytest
+
+from quiz_common.scoring import AnswerKeyCache, score_answers
+from quiz_common.tracing import sqs_record
+
+from tests.conftest import load_handler
+
+QUIZ = {
+    'QuizID': 'timed-quiz',
+    'Title': 'Timed Quiz',
+    'Visibility': 'Public',
+    'Version': 1,
+    'EnableTimer': True,
+    'TimerSeconds': 10,
+    'Questions': [
+        {'QuestionText': 'Q1', 'Options': ['A. 1', 'B. 2'], 'CorrectAnswer': 'A. 1'},
+        {'QuestionText': 'Q2', 'Options': ['A. 1', 'B. 2'], 'CorrectAnswer': 'B. 2'},
+        {'QuestionText': 'Q3', 'Options': ['A. 1', 'B. 2'], 'CorrectAnswer': 'A. 1'},
+    ],
+}
+
+
+@pytest.fixture
+def storage(storage):
+    storage.quizzes.put_quiz(QUIZ)
+    return storage
+
+
+def test_timer_scales_score():
+    key = {'CorrectAnswers': ['A. 1', 'B. 2', 'A. 1'], 'EnableTimer': True, 'TimerSeconds': Decimal(10)}
+    answers = {
+        '0': {'Answer': 'A. 1', 'TimeTaken': 2},   # 80 points
+        '1': {'Answer': 'A. 1', 'TimeTaken': 1},   # wrong
+        '2': {'Answer': 'A. 1', 'TimeTaken': 11},  # too late
+    }
+    assert score_answers(key, answers) == Decimal('80')
+
+
+def test_untimed_quiz_scores_correct_answers():
+    key = {'CorrectAnswers': ['A. 1', 'B. 2'], 'EnableTimer': False, 'TimerSeconds': None}
+    assert score_answers(key, {'0': {'Answer': 'A. 1', 'TimeTaken': 30}, '1': {'Answer': 'B. 2', 'TimeTaken': 0}}) == Decimal('200')
+    assert score_answers(key, {}) == Decimal('0')
+
+
+def test_answer_key_cache_reads_each_version_once(storage):
+    cache = AnswerKeyCache(storage, max_entries=2)
+    assert cache.get('timed-quiz', None) == (1, {
+        'CorrectAnswers': ['A. 1', 'B. 2', 'A. 1'],
+        'Options': [['A. 1', 'B. 2']] * 3,
+        'EnableTimer': True,
+        'TimerSeconds': Decimal(10),
+    })
+    storage.quizzes.put_quiz(dict(QUIZ, Title='Changed'))
+    assert cache.get('timed-quiz', 1)[1] is cache.get('timed-quiz', 1)[1]
+    assert cache.get('missing', None) == (None, None)
+    assert cache.get('timed-quiz', 5) == (5, None)
+
+
+def submit(handler, username, answers):
+    body = {'Username': username, 'QuizID': 'timed-quiz', 'Answers': answers, 'Email': 'user@example.com'}
+    response = handler.lambda_handler({'body': json.dumps(body)}, None)
+    assert response['statusCode'] == 200
+    return json.loads(response['body'])
+
+
+def test_inline_scoring_stores_score_immediately(storage, monkeypatch):
+    monkeypatch.setenv('INLINE_SCORING_ENABLED', 'true')
+    handler = load_handler('submit_quiz')
+
+    result = submit(handler, 'fast', {'0': {'Answer': 'A. 1', 'TimeTaken': 5}})
+    assert result['message'] == 'Submission scored'
+    assert result['Score'] == 50
+    assert result['TotalQuestions'] == 3
+
+    stored = storage.submissions.get_submission(result['SubmissionID'])
+    assert stored['Score'] == Decimal(50)
+    assert result['QuizVersion'] == stored['QuizVersion']
+    assert storage.publisher.drain_submissions() == []
+    assert [email['SubmissionID'] for email in storage.publisher.emails] == [result['SubmissionID']]
+
+
+def test_inline_scoring_defers_to_queue(storage, monkeypatch):
+    monkeypatch.setenv('INLINE_SCORING_ENABLED', 'true')
+    monkeypatch.setenv('INLINE_SCORING_MAX_QUESTIONS', '2')
+    handler = load_handler('submit_quiz')
+
+    # the quiz has more questions than are scored inline
+    result = submit(handler, 'large', {'0': {'Answer': 'A. 1', 'TimeTaken': 5}})
+    assert result['message'] == 'Submission received'
+    assert [message['SubmissionID'] for message in storage.publisher.drain_submissions()] == [result['SubmissionID']]
+    assert storage.submissions.get_submission(result['SubmissionID']) is None
+
+
+def test_inline_scoring_defers_while_queue_backs_up(storage, monkeypatch):
+    monkeypatch.setenv('INLINE_SCORING_ENABLED', 'true')
+    monkeypatch.setenv('INLINE_SCORING_MAX_BACKLOG', '0')
+    handler = load_handler('submit_quiz')
+    storage.publisher.publish_submission({'SubmissionID': 'waiting'})
+
+    result = submit(handler, 'busy', {'0': {'Answer': 'A. 1', 'TimeTaken': 5}})
+    assert result['message'] == 'Submission received'
+    assert storage.publisher.submission_backlog() == 2
+
+
+def test_correlation_id_follows_submission_to_email(storage, capsys):
+    result = submit(load_handler('submit_quiz'), 'traced', {'0': {'Answer': 'A. 1', 'TimeTaken': 5}})
+    [(message, attributes)] = storage.publisher.drain_submissions(with_attributes=True)
+    assert attributes['CorrelationId'] == result['CorrelationId']
+
+    load_handler('scoring').lambda_handler({'Records': [sqs_record(message, attributes)]}, None)
+    [email] = storage.publisher.emails
+    assert email['CorrelationId'] == result['CorrelationId']
+
+    stages = {}
+    for line in capsys.readouterr().out.splitlines():
+        stage = json.loads(line)
+        stages[stage['Stage']] = stage
+    assert stages['enqueued']['CorrelationId'] == stages['scored']['CorrelationId'] == result['CorrelationId']
+    assert stages['scored']['At'] == email['ScoredAt']
+    assert stages['scored']['EnqueueToScoredLatency'] == email['ScoredAt'] - int(attributes['EnqueuedAt'])
+    assert stages['scored']['_aws']['CloudWatchMetrics'][0]['Metrics'] == [
+        {'Name': 'EnqueueToScoredLatency', 'Unit': 'Milliseconds'}
+    ]
+
+
+def test_answers_are_stored_compactly_and_expanded_on_read(storage, monkeypatch):
+    monkeypatch.setenv('INLINE_SCORING_ENABLED', 'true')
+    answers = {'0': {'Answer': 'A. 1', 'TimeTaken': 2.5}, '2': {'Answer': '', 'TimeTaken': 10}}
+    result = submit(load_handler('submit_quiz'), 'compact', answers)
+
+    item = storage.submissions.get_submission(result['SubmissionID'])
+    assert 'UserAnswers' not in item
+    assert (item['AnswerChoices'], item['AnswerMillis']) == ([0, None, ''], [2500, None, 10000])
+
+    get_submission = load_handler('get_submission')
+    response = get_submission.lambda_handler({'queryStringParameters': {'submission_id': result['SubmissionID']}}, None)
+    body = json.loads(response['body'])
+    assert body['UserAnswers'] == answers
+    assert 'AnswerChoices' not in body and body['Score'] == 75
+
+    # submissions scored before answers were compacted are returned as stored
+    legacy_answers = {'0': {'Answer': 'A. 1', 'TimeTaken': Decimal('2.5')}}
+    storage.submissions.put_submission_if_absent(dict(item, SubmissionID='legacy', UserAnswers=legacy_answers))
+    response = get_submission.lambda_handler({'queryStringParameters': {'submission_id': 'legacy'}}, None)
+    assert json.loads(response['body'])['UserAnswers'] == {'0': {'Answer': 'A. 1', 'TimeTaken': 2.5}}
+
+
+def test_batch_records_are_scored_concurrently(storage, monkeypatch):
+    monkeypatch.setenv('SCORING_RECORD_CONCURRENCY', '4')
+    handler = load_handler('scoring')
+    put_submission = storage.submissions.put_submission_if_absent
+    in_flight, peak, lock = [0], [0], threading.Lock()
+
+    def slow_put(item):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.05)
+        with lock:
+            in_flight[0] -= 1
+        return put_submission(item)
+    monkeypatch.setattr(storage.submissions, 'put_submission_if_absent', slow_put)
+
+    messages = [
+        {'SubmissionID': f's{idx}', 'Username': f'u{idx}', 'QuizID': 'timed-quiz', 'Answers': {'0': {'Answer': 'A. 1', 'TimeTaken': 1}}}
+        for idx in range(8)
+    ]
+    records = [sqs_record(message) for message in messages]
+    # a broken record does not affect the rest of the batch
+    records.insert(3, {'body': 'not json'})
+    handler.lambda_handler({'Records': records}, None)
+
+    assert all(storage.submissions.get_submission(f's{idx}')['Score'] == 90 for idx in range(8))
+    assert peak[0] == 4
+
+
+
+def test_email_that_failed_to_start_is_started_on_redelivery(storage, monkeypatch):
+    handler = load_handler('scoring')
+    answers = {'0': {'Answer': 'A. 1', 'TimeTaken': 1}}
+    records = [
+        sqs_record({'SubmissionID': 's0', 'Username': 'u0', 'QuizID': 'timed-quiz', 'Answers': answers}),
+        sqs_record({'SubmissionID': 's1', 'Username': 'u1', 'QuizID': 'timed-quiz', 'Answers': answers,
+                    'Email': 'u1@example.com'}),
+    ]
+    start_email = storage.publisher.start_email
+
+    def unavailable(payload):
+        raise RuntimeError('throttled')
+    monkeypatch.setattr(storage.publisher, 'start_email', unavailable)
+    # both scores are stored, and only the record without its email is delivered again
+    response = handler.lambda_handler({'Records': records}, None)
+    assert response == {'batchItemFailures': [{'itemIdentifier': records[1]['messageId']}]}
+    assert storage.submissions.get_submission('s1')['Score'] == 90
+
+    monkeypatch.setattr(storage.publisher, 'start_email', start_email)
+    for _ in range(2):
+        assert handler.lambda_handler({'Records': [records[1]]}, None) == {'batchItemFailures': []}
+    assert [email['SubmissionID'] for email in storage.publisher.emails] == ['s1']
+
+
+def test_inline_scoring_defers_to_queue_when_the_email_cannot_start(storage, monkeypatch):
+    monkeypatch.setenv('INLINE_SCORING_ENABLED', 'true')
+    start_email = storage.publisher.start_email
+
+    def unavailable(payload):
+        raise RuntimeError('throttled')
+    monkeypatch.setattr(storage.publisher, 'start_email', unavailable)
+    result = submit(load_handler('submit_quiz'), 'fast', {'0': {'Answer': 'A. 1', 'TimeTaken': 5}})
+    assert result['message'] == 'Submission received'
+    assert storage.submissions.get_submission(result['SubmissionID'])['Score'] == Decimal(50)
+
+    # the scoring function finds the score stored and starts the email
+    monkeypatch.setattr(storage.publisher, 'start_email', start_email)
+    [message] = storage.publisher.drain_submissions()
+    load_handler('scoring').lambda_handler({'Records': [sqs_record(message)]}, None)
+    assert [email['SubmissionID'] for email in storage.publisher.emails] == [result['SubmissionID']]
@@ -0,0 +1,103 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambdas', 'common', 'python'))
+
+from quiz_common.search import SearchIndex, tokenize  # noqa: E402
+
+from tests.conftest import load_handler  # noqa: E402
+
+
+def make_quiz(quiz_id, title, visibility='Public', questions=()):
+    return {
+        'QuizID': quiz_id,
+        'Title': title,
+        'Visibility': visibility,
+        'Questions': [{'QuestionText': text} for text in questions],
+    }
+
+
+def ids(results):
+    return [quiz_id for quiz_id, _ in results]
+
+
+def build_index(include_questions=False):
+    index = SearchIndex()
+    for quiz in [
+        make_quiz('capitals', 'World Capitals', questions=['What is the capital of France?']),
+        make_quiz('europe', 'Capital Cities of Europe', questions=['Which river flows through Vienna?']),
+        make_quiz('secret', 'Secret Capitals', visibility='Private'),
+        make_quiz('planets', 'Planets and Moons', questions=['Which planet has the most moons?']),
+    ]:
+        index.add(quiz, include_questions=include_questions)
+    return index
+
+
+def test_tokenize_casefolds_and_truncates():
+    assert tokenize('Straße, WORLD-war 2!') == ['strasse', 'world', 'war', '2']
+    assert tokenize('x' * 40) == ['x' * 24]
+
+
+def test_words_are_anded_and_last_word_is_a_prefix():
+    index = build_index()
+    assert ids(index.search('capital')) == ['europe', 'capitals']
+    assert ids(index.search('capital ')) == ['europe']
+    assert ids(index.search('cities capital')) == ['europe']
+    assert ids(index.search('EUROPE cap')) == ['europe']
+    assert ids(index.search('moons pla')) == ['planets']
+    assert index.search('capital moons') == []
+    assert index.search('secret') == []
+    assert index.search('!!!') == []
+    assert ids(index.search('c', limit=1)) == ['europe']
+
+
+def test_questions_are_only_searched_when_indexed_and_asked_for():
+    assert build_index().search('vienna', include_questions=True) == []
+    index = build_index(include_questions=True)
+    assert index.search('vienna') == []
+    assert ids(index.search('vienna', include_questions=True)) == ['europe']
+    assert ids(index.search('world fra', include_questions=True)) == ['capitals']
+
+
+def test_changed_quizzes_move_to_the_front_and_private_ones_disappear():
+    index = build_index()
+    index.add(make_quiz('capitals', 'World Capitals Revisited'))
+    assert ids(index.search('capital')) == ['capitals', 'europe']
+    assert ids(index.search('revisited')) == ['capitals']
+
+    index.add(make_quiz('europe', 'Capital Cities of Europe', visibility='Private'))
+    index.remove('planets')
+    assert ids(index.search('c')) == ['capitals']
+    assert len(index) == 1
+
+
+def test_compaction_and_blob_round_trip_keep_results():
+    index = build_index(include_questions=True)
+    index.add(make_quiz('history', 'History'))
+    index.add(make_quiz('music', 'Music'))
+    index.remove('planets')
+    assert not index.compact()
+    index.add(make_quiz('capitals', 'World Capitals Revisited'))
+    assert index.compact()
+    assert ids(index.docs) == ['europe', 'history', 'music', 'capitals']
+
+    loaded = SearchIndex.from_blob(index.to_blob())
+    for query in ('capital', 'capitals re', 'c', 'moons'):
+        assert loaded.search(query) == index.search(query)
+    assert ids(loaded.search('vienna', include_questions=True)) == ['europe']
+    loaded.add(make_quiz('new', 'New Capitals'))
+    assert ids(loaded.search('capitals')) == ['new', 'capitals']
+
+
+def test_search_handler_freezes_the_garbage_collector_once(storage, monkeypatch):
+    monkeypatch.setenv('SEARCH_INDEX_TTL_SECONDS', '0')
+    handler = load_handler('search_quizzes')
+    freezes = []
+    monkeypatch.setattr(handler.gc, 'freeze', lambda: freezes.append(True))
+
+    version = None
+    for include_questions in (False, True):
+        storage.search_index.put_index(build_index(include_questions).to_blob(), version)
+        version = storage.search_index.get_index_version()
+        assert ids(handler.get_index().search('capital', 10)) == ['europe', 'capitals']
+    assert len(freezes) == 1
@@ -0,0 +1,284 @@
+import os
+import sys
+import threading
+from decimal import Decimal
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambdas', 'common', 'python'))
+
+from quiz_common.leaderboard import leaderboard_key, rank_score, score_rank  # noqa: E402
+from quiz_common.storage import create_storage  # noqa: E402
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def storage(request, tmp_path):
+    return create_storage(request.param, sqlite_path=str(tmp_path / 'quiz_app.sqlite3'))
+
+
+def make_quiz(quiz_id, version=1, visibility='Public'):
+    return {
+        'QuizID': quiz_id,
+        'Title': f'Quiz {quiz_id}',
+        'Visibility': visibility,
+        'Version': version,
+        'EnableTimer': False,
+        'Questions': [{'QuestionText': 'Q1', 'Options': ['A. 1', 'B. 2'], 'CorrectAnswer': 'A. 1'}],
+    }
+
+
+def make_submission(submission_id, quiz_id, score):
+    return {
+        'SubmissionID': submission_id,
+        'Username': f'user-{submission_id}',
+        'QuizID': quiz_id,
+        'Score': Decimal(score),
+        'ScoreRank': score_rank(Decimal(score), submission_id),
+        'TotalQuestions': Decimal(1),
+    }
+
+
+def test_quiz_round_trip_uses_decimal(storage):
+    storage.quizzes.put_quiz(make_quiz('q1'))
+
+    quiz = storage.quizzes.get_quiz('q1')
+    assert quiz['Version'] == Decimal(1)
+    assert isinstance(quiz['Version'], Decimal)
+    assert storage.quizzes.get_quiz('q1', attributes=['QuizID', 'Version']) == {'QuizID': 'q1', 'Version': Decimal(1)}
+    assert storage.quizzes.get_quiz('missing') is None
+
+    with pytest.raises(TypeError):
+        storage.quizzes.put_quiz({'QuizID': 'q2', 'TimerSeconds': 1.5})
+
+
+def test_binary_attributes_round_trip(storage):
+    storage.quizzes.put_quiz(dict(make_quiz('q1'), Questions=b'\x01compressed'))
+    assert bytes(storage.quizzes.get_quiz('q1')['Questions']) == b'\x01compressed'
+    assert storage.quizzes.get_quiz('q1', attributes=['Questions']) == {'Questions': b'\x01compressed'}
+
+
+def test_list_and_batch_get(storage):
+    storage.quizzes.put_quiz(make_quiz('public'))
+    storage.quizzes.put_quiz(make_quiz('private', visibility='Private'))
+
+    assert storage.quizzes.list_public_quizzes() == [{'QuizID': 'public', 'Title': 'Quiz public', 'Visibility': 'Public'}]
+    found = storage.quizzes.batch_get_quizzes(['public', 'private', 'missing', 'public'], attributes=['QuizID'])
+    assert sorted(quiz['QuizID'] for quiz in found) == ['private', 'public']
+
+
+def test_replace_quiz_checks_expected_version(storage):
+    storage.quizzes.put_quiz(make_quiz('q1'))
+    updated = make_quiz('q1', version=2)
+    updated['Title'] = 'Renamed'
+
+    assert storage.quizzes.replace_quiz(updated, make_quiz('q1'), expected_version=1)
+    assert storage.quizzes.get_quiz('q1')['Title'] == 'Renamed'
+    assert storage.quizzes.get_quiz_version('q1', 1)['Title'] == 'Quiz q1'
+
+    assert not storage.quizzes.replace_quiz(make_quiz('q1', version=2), make_quiz('q1'), expected_version=1)
+    assert storage.quizzes.get_quiz('q1')['Title'] == 'Renamed'
+
+
+def test_submission_written_once(storage):
+    assert storage.submissions.put_submission_if_absent(make_submission('s1', 'q1', 50))
+    assert not storage.submissions.put_submission_if_absent(make_submission('s1', 'q1', 90))
+    assert storage.submissions.get_submission('s1')['Score'] == Decimal(50)
+    assert storage.submissions.get_submission('missing') is None
+
+
+def test_leaderboard_ordered_by_score(storage):
+    for submission_id, quiz_id, score in [('s1', 'q1', '50'), ('s2', 'q1', '150.5'), ('s3', 'q2', '300'), ('s4', 'q1', '99')]:
+        storage.submissions.put_submission_if_absent(make_submission(submission_id, quiz_id, score))
+
+    top = storage.leaderboard.top('q1', 2)
+    assert [item['SubmissionID'] for item in top] == ['s2', 's4']
+    assert top[0]['Score'] == Decimal('150.5')
+
+
+def test_leaderboard_pages_from_a_key(storage):
+    for submission_id, score in [('s1', '50'), ('s2', '90'), ('s3', '70'), ('s4', '70'), ('s5', '10')]:
+        storage.submissions.put_submission_if_absent(make_submission(submission_id, 'q1', score))
+
+    page, last_key = storage.leaderboard.page('q1', 2)
+    assert [item['SubmissionID'] for item in page] == ['s2', 's3']
+    assert last_key == leaderboard_key('q1', {'Score': Decimal(70), 'SubmissionID': 's3'})
+    page, last_key = storage.leaderboard.page('q1', 2, last_key)
+    assert [item['SubmissionID'] for item in page] == ['s4', 's1']
+    page, last_key = storage.leaderboard.page('q1', 2, last_key)
+    assert ([item['SubmissionID'] for item in page], last_key) == (['s5'], None)
+
+    key = leaderboard_key('q1', {'Score': Decimal(70), 'SubmissionID': 's4'})
+    above, _ = storage.leaderboard.page('q1', 5, key, reverse=True)
+    assert [item['SubmissionID'] for item in above] == ['s3', 's2']
+    assert set(above[0]) == {'SubmissionID', 'Username', 'Score'}
+
+
+def test_tied_leaderboard_entries_page_once_each(storage):
+    submission_ids = [f's{index}' for index in range(7)]
+    for submission_id in reversed(submission_ids):
+        storage.submissions.put_submission_if_absent(make_submission(submission_id, 'q1', '50'))
+    storage.submissions.put_submission_if_absent(make_submission('t', 'q1', '50.5'))
+
+    seen, last_key = [], None
+    while True:
+        page, last_key = storage.leaderboard.page('q1', 3, last_key)
+        seen.extend(item['SubmissionID'] for item in page)
+        if last_key is None:
+            break
+    assert seen == ['t'] + submission_ids
+
+
+def test_score_rank_orders_best_first():
+    ranks = [score_rank(Decimal(score), 's1') for score in ['1000', '99.5', '99.25', '0', '-3']]
+    assert ranks == sorted(ranks)
+    assert score_rank(Decimal(50), 'a') < score_rank(Decimal(50), 'b')
+    assert rank_score(score_rank(Decimal('99.25'), 's#1')) == Decimal('99.25')
+
+
+def test_tournament_scores_keep_best_per_quiz(storage):
+    tournament = {'TournamentID': 't1', 'Title': 'Cup', 'QuizIDs': ['q1', 'q2'], 'Rule': 'sum', 'Aggregated': True}
+    storage.tournaments.put_tournament(tournament)
+    storage.tournaments.put_tournament({**tournament, 'TournamentID': 't2', 'Aggregated': False})
+    assert [item['TournamentID'] for item in storage.tournaments.list_aggregated_tournaments()] == ['t1']
+
+    storage.tournaments.record_score(tournament, 'ann', 'q1', Decimal('50'))
+    storage.tournaments.record_score(tournament, 'ann', 'q1', Decimal('20'))
+    storage.tournaments.record_score(tournament, 'ann', 'q2', Decimal('30.5'))
+    storage.tournaments.record_score(tournament, 'bob', 'q2', Decimal('90'))
+    assert storage.tournaments.top_scores('t1', 5) == [
+        {'Username': 'bob', 'Score': Decimal('90')},
+        {'Username': 'ann', 'Score': Decimal('80.5')},
+    ]
+    assert storage.tournaments.top_scores('t1', 1) == [{'Username': 'bob', 'Score': Decimal('90')}]
+
+
+def test_quiz_is_only_created_once(storage):
+    assert storage.quizzes.put_quiz_if_absent(make_quiz('q1'))
+    assert not storage.quizzes.put_quiz_if_absent(make_quiz('q1', visibility='Private'))
+    assert storage.quizzes.get_quiz('q1')['Visibility'] == 'Public'
+
+
+def test_idempotency_key_claim_and_release(storage):
+    assert storage.submissions.get_idempotency_key('k1') is None
+    assert storage.submissions.claim_idempotency_key('k1', 'first', 3600) == ('first', True)
+    assert storage.submissions.get_idempotency_key('k1') == 'first'
+    assert storage.submissions.claim_idempotency_key('k1', 'second', 3600) == ('first', False)
+
+    storage.submissions.release_idempotency_key('k1')
+    assert storage.submissions.claim_idempotency_key('k1', 'third', 3600) == ('third', True)
+
+
+def test_expired_idempotency_key_can_be_reclaimed(storage):
+    storage.submissions.claim_idempotency_key('k1', 'first', -1)
+    assert storage.submissions.get_idempotency_key('k1') is None
+    assert storage.submissions.claim_idempotency_key('k1', 'second', 3600) == ('second', True)
+
+
+def test_admission_buckets_refill_over_time(storage):
+    # a bucket of 2 tokens regaining one every minute
+    assert storage.submissions.take_admission_token('user#alice', 60000, 2) == 0
+    assert storage.submissions.take_admission_token('user#alice', 60000, 2) == 0
+    assert 59000 < storage.submissions.take_admission_token('user#alice', 60000, 2) <= 60000
+    assert storage.submissions.take_admission_token('user#bob', 60000, 2) == 0
+    assert storage.submissions.take_admission_token('user#carol', 1, 2) == 0
+    # a token put back can be taken again
+    storage.submissions.return_admission_token('user#alice', 60000)
+    assert storage.submissions.take_admission_token('user#alice', 60000, 2) == 0
+
+
+def test_published_submissions_are_drained_in_order(storage):
+    storage.publisher.publish_submission({'SubmissionID': 's1'})
+    storage.publisher.publish_submission({'SubmissionID': 's2'})
+
+    assert [message['SubmissionID'] for message in storage.publisher.drain_submissions()] == ['s1', 's2']
+    assert storage.publisher.drain_submissions() == []
+
+    storage.publisher.publish_submission({'SubmissionID': 's3'}, {'CorrelationId': 'c3'})
+    storage.publisher.publish_submission({'SubmissionID': 's4'})
+    assert storage.publisher.drain_submissions(with_attributes=True) == [
+        ({'SubmissionID': 's3'}, {'CorrelationId': 'c3'}),
+        ({'SubmissionID': 's4'}, {}),
+    ]
+
+
+def test_user_history_is_paginated_newest_first(storage):
+    for idx in range(5):
+        submission = make_submission(f's{idx}', 'q1', 10 * idx)
+        submission['Username'] = 'alice'
+        submission['SubmittedAt'] = f'2026-01-0{idx + 1}T00:00:00.000+00:00'
+        submission['UserAnswers'] = {'0': {'Answer': 'A. 1', 'TimeTaken': 1}}
+        storage.submissions.put_submission_if_absent(submission)
+    # submissions scored before SubmittedAt existed are not in the index
+    storage.submissions.put_submission_if_absent(dict(make_submission('legacy', 'q1', 0), Username='alice'))
+
+    page, last_key = storage.submissions.list_user_submissions('alice', 2)
+    assert [item['SubmissionID'] for item in page] == ['s4', 's3']
+    assert 'UserAnswers' not in page[0]
+    assert last_key == {'SubmissionID': 's3', 'Username': 'alice', 'SubmittedAt': '2026-01-04T00:00:00.000+00:00'}
+
+    page, last_key = storage.submissions.list_user_submissions('alice', 2, last_key)
+    assert [item['SubmissionID'] for item in page] == ['s2', 's1']
+    page, last_key = storage.submissions.list_user_submissions('alice', 2, last_key)
+    assert [item['SubmissionID'] for item in page] == ['s0']
+    assert last_key is None
+    assert storage.submissions.list_user_submissions('bob', 2) == ([], None)
+
+
+def test_leaderboard_snapshot_keeps_best_entries(storage):
+    assert storage.snapshots.get_snapshot('q1') == []
+
+    storage.snapshots.merge_snapshot('q1', [
+        {'SubmissionID': 's1', 'Username': 'a', 'Score': Decimal('10')},
+        {'SubmissionID': 's2', 'Username': 'b', 'Score': Decimal('30')},
+    ], size=2)
+    # the same submission archived twice is counted once
+    storage.snapshots.merge_snapshot('q1', [
+        {'SubmissionID': 's2', 'Username': 'b', 'Score': Decimal('30')},
+        {'SubmissionID': 's3', 'Username': 'c', 'Score': Decimal('20.5')},
+    ], size=2)
+
+    assert [entry['SubmissionID'] for entry in storage.snapshots.get_snapshot('q1')] == ['s2', 's3']
+    assert storage.snapshots.get_snapshot('q1')[1]['Score'] == Decimal('20.5')
+
+
+def test_search_index_replacement_checks_version(storage):
+    assert storage.search_index.get_index_version() is None
+    assert storage.search_index.get_index() == (None, None)
+
+    assert storage.search_index.put_index(b'first', None)
+    # a second writer that also saw no index loses
+    assert not storage.search_index.put_index(b'other', None)
+    version, blob = storage.search_index.get_index()
+    assert blob == b'first'
+    assert storage.search_index.get_index_version() == version
+
+    assert storage.search_index.put_index(b'second', version)
+    assert not storage.search_index.put_index(b'stale', version)
+    assert storage.search_index.get_index()[1] == b'second'
+    assert storage.search_index.get_index_version() != version
+
+
+def test_dynamodb_tables_are_per_thread(monkeypatch):
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    from quiz_common.storage.dynamodb import QUIZZES_TABLE, ThreadLocalDynamoDB
+
+    table = ThreadLocalDynamoDB().Table(QUIZZES_TABLE)
+    clients = [table.meta.client]
+    thread = threading.Thread(target=lambda: clients.append(table.meta.client))
+    thread.start()
+    thread.join()
+    assert table.table_name == QUIZZES_TABLE
+    assert table.meta.client is clients[0]
+    assert clients[1] is not clients[0]
+
+
+def test_search_index_writes_need_a_boto3_with_conditional_writes():
+    from botocore.exceptions import ParamValidationError
+    from quiz_common.storage.dynamodb import S3SearchIndexStore
+
+    class OldS3:
+        def put_object(self, **kwargs):
+            raise ParamValidationError(report='Unknown parameter in input: "IfMatch"')
+
+    with pytest.raises(RuntimeError, match='boto3>=1.35.69'):
+        S3SearchIndexStore(s3=OldS3()).put_index(b'index', '"etag"')
@@ -0,0 +1,129 @@
+import json
+import random
+from decimal import Decimal
+
+import pytest
+
+from quiz_common.storage import create_storage
+from quiz_common.tournament import quiz_entries, rank, tournament_score
+from quiz_common.tracing import sqs_record
+
+from tests.conftest import load_handler
+
+
+def put_score(storage, submission_id, username, quiz_id, score):
+    storage.submissions.put_submission_if_absent({
+        'SubmissionID': submission_id,
+        'Username': username,
+        'QuizID': quiz_id,
+        'Score': Decimal(score),
+        'TotalQuestions': Decimal(1),
+    })
+
+
+def brute_force(storage, rule, quiz_ids, limit):
+    scores = {}
+    for quiz_id in quiz_ids:
+        for entry in storage.leaderboard.top(quiz_id, 10**6) + storage.snapshots.get_snapshot(quiz_id):
+            best = scores.setdefault(entry['Username'], {})
+            best[quiz_id] = max(best.get(quiz_id, entry['Score']), entry['Score'])
+    totals = sorted((-tournament_score(rule, best), username) for username, best in scores.items())
+    return [{'Username': username, 'Score': -score} for score, username in totals[:limit]]
+
+
+@pytest.mark.parametrize('rule', ['sum', 'best'])
+def test_rank_matches_reading_every_leaderboard(rule):
+    rng = random.Random(7)
+    storage = create_storage('memory')
+    quiz_ids = ['q1', 'q2', 'q3']
+    for idx in range(300):
+        # few distinct scores, so players tie and play some quizzes several times
+        put_score(storage, f's{idx}', f'player{rng.randrange(60)}', rng.choice(quiz_ids), rng.randrange(0, 400, 25))
+    storage.snapshots.merge_snapshot('q2', [
+        {'SubmissionID': 'archived', 'Username': 'player3', 'Score': Decimal(500)},
+    ], size=100)
+
+    for limit in (1, 5, 20, 100):
+        streams = {
+            quiz_id: quiz_entries(storage, quiz_id, storage.snapshots.get_snapshot(quiz_id), page_size=7)
+            for quiz_id in quiz_ids
+        }
+        assert rank(rule, streams, limit) == brute_force(storage, rule, quiz_ids, limit)
+
+
+def test_rank_stops_reading_once_the_top_is_decided():
+    storage = create_storage('memory')
+    for idx in range(500):
+        for quiz_id in ('q1', 'q2'):
+            put_score(storage, f'{quiz_id}-{idx}', f'player{idx}', quiz_id, 1000 - idx)
+    pages = []
+    page = storage.leaderboard.page
+    storage.leaderboard.page = lambda *args: pages.append(args) or page(*args)
+
+    streams = {quiz_id: quiz_entries(storage, quiz_id, [], page_size=10) for quiz_id in ('q1', 'q2')}
+    ranking = rank('sum', streams, 3)
+    assert ranking == [
+        {'Username': 'player0', 'Score': Decimal(2000)},
+        {'Username': 'player1', 'Score': Decimal(1998)},
+        {'Username': 'player2', 'Score': Decimal(1996)},
+    ]
+    assert len(pages) == 2
+
+
+@pytest.fixture
+def storage(storage):
+    for quiz_id in ('q1', 'q2'):
+        storage.quizzes.put_quiz({
+            'QuizID': quiz_id,
+            'Title': f'Quiz {quiz_id}',
+            'Visibility': 'Public',
+            'Version': 1,
+            'EnableTimer': False,
+            'Questions': [{'QuestionText': 'Q1', 'Options': ['A. 1', 'B. 2'], 'CorrectAnswer': 'A. 1'}],
+        })
+    return storage
+
+
+def create_tournament(handler, **fields):
+    body = {'Title': 'Finals', 'QuizIDs': ['q1', 'q2'], **fields}
+    response = handler.lambda_handler({'body': json.dumps(body)}, None)
+    return response['statusCode'], json.loads(response['body'])
+
+
+def get_leaderboard(handler, tournament_id):
+    response = handler.lambda_handler({'queryStringParameters': {'tournament_id': tournament_id}}, None)
+    return response['statusCode'], json.loads(response['body'])
+
+
+def test_create_tournament_checks_quizzes(storage):
+    handler = load_handler('create_tournament')
+    assert create_tournament(handler, QuizIDs=['q1', 'missing'])[0] == 400
+    assert create_tournament(handler, QuizIDs=['q1', 'q1'])[0] == 400
+    assert create_tournament(handler, Rule='average')[0] == 400
+
+    status, body = create_tournament(handler, Rule='best')
+    assert status == 200
+    tournament = storage.tournaments.get_tournament(body['TournamentID'])
+    assert (tournament['Rule'], tournament['Aggregated']) == ('best', False)
+
+
+@pytest.mark.parametrize('aggregated', [False, True])
+def test_tournament_leaderboard_sums_best_scores(storage, aggregated):
+    _, body = create_tournament(load_handler('create_tournament'), Aggregated=aggregated)
+    scoring = load_handler('scoring')
+    answers = {'right': {'0': {'Answer': 'A. 1', 'TimeTaken': 1}}, 'wrong': {'0': {'Answer': 'B. 2', 'TimeTaken': 1}}}
+    for submission_id, username, quiz_id, answer in [
+        ('s1', 'ann', 'q1', 'right'), ('s2', 'ann', 'q1', 'wrong'), ('s3', 'ann', 'q2', 'right'),
+        ('s4', 'bob', 'q1', 'right'), ('s5', 'cid', 'q2', 'wrong'),
+    ]:
+        message = {'SubmissionID': submission_id, 'Username': username, 'QuizID': quiz_id, 'Answers': answers[answer]}
+        scoring.lambda_handler({'Records': [sqs_record(message)]}, None)
+
+    status, leaderboard = get_leaderboard(load_handler('get_tournament_leaderboard'), body['TournamentID'])
+    assert status == 200
+    assert leaderboard['Leaderboard'] == [
+        {'Username': 'ann', 'Score': 200.0},
+        {'Username': 'bob', 'Score': 100.0},
+        {'Username': 'cid', 'Score': 0.0},
+    ]
+    assert get_leaderboard(load_handler('get_tournament_leaderboard'), 'missing')[0] == 404
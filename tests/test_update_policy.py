@@ -0,0 +1,52 @@
+from quiz_common.storage import dynamodb
+
+from tests.conftest import load_script
+
+update_policy = load_script('update_policy')
+
+STORAGE_TABLES = {value for name, value in vars(dynamodb).items() if name.endswith('_TABLE')}
+
+
+def test_enabled_policy_covers_every_table_of_the_storage_layer():
+    policy = update_policy.updated_policy({'Version': '2012-10-17', 'Statement': []}, allow=True)
+    resources = {arn for statement in policy['Statement'] for arn in statement['Resource']}
+    for table in STORAGE_TABLES:
+        assert f'arn:aws:dynamodb:us-east-1:000000000000:table/{table}' in resources
+        assert f'arn:aws:dynamodb:us-east-1:000000000000:table/{table}/index/*' in resources
+
+
+def test_disabled_policy_keeps_a_placeholder_statement():
+    policy = update_policy.updated_policy({'Statement': [update_policy.DYNAMODB_ACCESS_STATEMENT]}, allow=False)
+    assert policy['Statement'] == [update_policy.PLACEHOLDER_STATEMENT]
+
+
+class FakeIAM:
+    def __init__(self, policy_doc):
+        self.policy_doc = policy_doc
+        self.put = []
+
+    def get_paginator(self, operation):
+        return self
+
+    def paginate(self, RoleName):
+        return [{'PolicyNames': ['access']}]
+
+    def get_role_policy(self, RoleName, PolicyName):
+        return {'PolicyDocument': self.policy_doc}
+
+    def put_role_policy(self, **kwargs):
+        self.put.append(kwargs)
+
+
+def test_policy_returned_with_single_values_in_another_order_is_left_untouched():
+    statement = update_policy.DYNAMODB_ACCESS_STATEMENT
+    iam = FakeIAM({
+        'Version': '2012-10-17',
+        'Statement': [{**statement, 'Action': statement['Action'][::-1], 'Resource': statement['Resource'][::-1]}],
+    })
+    assert update_policy.update_role(iam, 'QuizAppStack-Role', allow=True) == (1, 0)
+
+    iam = FakeIAM({'Version': '2012-10-17', 'Statement': {**update_policy.PLACEHOLDER_STATEMENT, 'Action': 'dynamodb:ConditionCheckItem'}})
+    assert update_policy.update_role(iam, 'QuizAppStack-Role', allow=False) == (1, 0)
+    assert update_policy.update_role(iam, 'QuizAppStack-Role', allow=True) == (1, 1)
+    assert iam.put[0]['PolicyName'] == 'access'
@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from quiz_common.validation import (
+    ValidationError,
+    validate_quiz,
+    validate_quiz_update,
+    validate_submission,
+)
+
+from tests.conftest import load_handler
+
+
+def question(**overrides):
+    return dict({'QuestionText': 'Q?', 'Options': ['A. 1', 'B. 2'], 'CorrectAnswer': 'A. 1', 'Trivia': ''}, **overrides)
+
+
+def test_quiz_defaults_and_normalization():
+    quiz = validate_quiz({'Title': 'T', 'Questions': [question()], 'TimerSeconds': '10', 'Extra': 1})
+    assert quiz == {'Title': 'T', 'Questions': [question()], 'Visibility': 'Private', 'EnableTimer': False}
+
+    quiz = validate_quiz({'Title': 'T', 'Questions': [question()], 'EnableTimer': True, 'TimerSeconds': '10'})
+    assert quiz['TimerSeconds'] == 10
+
+
+@pytest.mark.parametrize('body, error', [
+    ([], 'Request body must be an object'),
+    ({'Questions': [question()]}, 'Title is required'),
+    ({'Title': 'T', 'Questions': []}, 'Questions must have between 1 and 100 entries'),
+    ({'Title': 'T', 'Questions': [question(CorrectAnswer='C. 3')]}, 'Questions[0].CorrectAnswer must be one of the Options'),
+    ({'Title': 'T', 'Questions': [question(Options=['A. 1'])]}, 'Questions[0].Options must have between 2 and 10 entries'),
+    ({'Title': 'T', 'Questions': [question(), question(Hint='x')]}, 'Questions[1] has unknown fields: Hint'),
+    ({'Title': 'T', 'Questions': [question(Trivia=None)]}, 'Questions[0].Trivia must be a string'),
+    ({'Title': 'T', 'Questions': [question()], 'EnableTimer': True}, 'TimerSeconds is required when EnableTimer is true'),
+    ({'Title': 'T', 'Questions': [question()], 'Visibility': 'Hidden'}, "Visibility must be 'Public' or 'Private'"),
+])
+def test_invalid_quizzes(body, error):
+    with pytest.raises(ValidationError) as raised:
+        validate_quiz(body)
+    assert str(raised.value) == error
+
+
+def test_quiz_update_requires_a_field():
+    with pytest.raises(ValidationError, match='At least one of'):
+        validate_quiz_update({'QuizID': 'q', 'ExpectedVersion': 1})
+    assert validate_quiz_update({'QuizID': 'q', 'ExpectedVersion': '2', 'Title': 'T'}) == {
+        'QuizID': 'q', 'ExpectedVersion': 2, 'Title': 'T',
+    }
+
+
+@pytest.mark.parametrize('answers, error', [
+    ({}, 'Answers must have between 1 and 100 entries'),
+    ({'100': {'Answer': 'A', 'TimeTaken': 1}}, "Answers keys must be question indices below 100, got '100'"),
+    ({'01': {'Answer': 'A', 'TimeTaken': 1}}, "Answers keys must be question indices below 100, got '01'"),
+    ({'0': {'Answer': 'A', 'TimeTaken': -1}}, 'Answers.0.TimeTaken must be between 0 and 86400'),
+    ({'0': {'Answer': 'A', 'TimeTaken': 'NaN'}}, 'Answers.0.TimeTaken must be between 0 and 86400'),
+    ({'0': {'Answer': 'A'}}, 'Answers.0.TimeTaken is required'),
+    ({'0': {'Answer': ['A'], 'TimeTaken': 1}}, 'Answers.0.Answer must be a string'),
+])
+def test_invalid_submissions(answers, error):
+    with pytest.raises(ValidationError) as raised:
+        validate_submission({'Username': 'u', 'QuizID': 'q', 'Answers': answers})
+    assert str(raised.value) == error
+
+
+def test_submit_rejects_answers_beyond_the_quiz(storage):
+    create_quiz = load_handler('create_quiz')
+    submit_quiz = load_handler('submit_quiz')
+    body = {'Title': 'T', 'Questions': [question(), question()]}
+    quiz_id = json.loads(create_quiz.lambda_handler({'body': json.dumps(body)}, None)['body'])['QuizID']
+    assert storage.quizzes.get_quiz(quiz_id)['QuestionCount'] == 2
+
+    def submit(answers):
+        body = {'Username': 'u', 'QuizID': quiz_id, 'Answers': answers}
+        return submit_quiz.lambda_handler({'body': json.dumps(body)}, None)
+
+    response = submit({'2': {'Answer': 'A. 1', 'TimeTaken': 1}})
+    assert response['statusCode'] == 400
+    assert json.loads(response['body'])['error'] == 'Answers.2 does not match a question; the quiz has 2'
+    assert storage.publisher.drain_submissions() == []
+
+    assert submit({'1': {'Answer': '', 'TimeTaken': 1}})['statusCode'] == 200
+    assert len(storage.publisher.drain_submissions()) == 1
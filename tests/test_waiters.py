@@ -0,0 +1,34 @@
+import pytest
+
+from tests.waiters import WaitTimeout, wait_until
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_polls_with_backoff_until_the_condition_holds():
+    clock = FakeClock()
+    results = iter([None, [], 0, {'Score': 1}])
+    value = wait_until(lambda: next(results), 'a score', delay=0.5, max_delay=1.5, clock=clock, sleep=clock.sleep)
+    assert value == {'Score': 1}
+    assert clock.sleeps == [0.5, 1.0, 1.5]
+
+
+def test_times_out_at_the_deadline_with_the_last_value():
+    clock = FakeClock()
+    with pytest.raises(WaitTimeout) as excinfo:
+        wait_until(lambda: [], 'an email', timeout=5, delay=1, max_delay=2, clock=clock, sleep=clock.sleep)
+    # the last sleep is cut short so that the final poll happens at the deadline
+    assert clock.sleeps == [1, 2, 2]
+    assert excinfo.value.last == []
+    assert 'an email' in str(excinfo.value)
@@ -0,0 +1,101 @@
+"""Waiters for the integration suites.
+
+Scoring, retries and pipes run asynchronously after the API call that starts
+them returns. Instead of sleeping for a fixed time, the suites poll for the
+condition they need with `wait_until`: the first poll is immediate, the delay
+between polls doubles up to `max_delay`, and `WaitTimeout` is raised with the
+last observed value once the deadline has passed.
+"""
+
+import time
+
+import requests
+
+LOCALSTACK_ENDPOINT = "http://localhost:4566"
+
+
+class WaitTimeout(AssertionError):
+    def __init__(self, description, timeout, last):
+        super().__init__(f"Timed out after {timeout}s waiting for {description}; last saw: {last!r}")
+        self.last = last
+
+
+def wait_until(probe, description, timeout=30, delay=0.2, max_delay=2, clock=time.monotonic, sleep=time.sleep):
+    """Call `probe` until it returns a truthy value, and return that value.
+
+    Exceptions raised by `probe` propagate; a probe that may fail transiently
+    should catch the error and return a falsy value instead.
+    """
+    deadline = clock() + timeout
+    while True:
+        last = probe()
+        if last:
+            return last
+        remaining = deadline - clock()
+        if remaining <= 0:
+            raise WaitTimeout(description, timeout, last)
+        sleep(min(delay, remaining))
+        delay = min(delay * 2, max_delay)
+
+
+def api_ready(api_endpoint, timeout=30):
+    """Wait until the API answers, e.g. while its functions are still being created."""
+    def probe():
+        try:
+            return requests.get(f"{api_endpoint}/listquizzes").status_code == 200
+        except requests.ConnectionError:
+            return False
+    wait_until(probe, f"{api_endpoint} to answer", timeout)
+
+
+def submission_scored(api_endpoint, submission_id, timeout=30):
+    """Wait until a submission has a Score and return it from /getsubmission."""
+    def probe():
+        response = requests.get(f"{api_endpoint}/getsubmission", params={"submission_id": submission_id})
+        if response.status_code == 200 and "Score" in response.json():
+            return response.json()
+        return None
+    return wait_until(probe, f"submission {submission_id} to be scored", timeout)
+
+
+def leaderboard_filled(api_endpoint, quiz_id, size, timeout=30):
+    """Wait until a quiz's leaderboard has `size` entries and return them."""
+    def probe():
+        response = requests.get(f"{api_endpoint}/getleaderboard", params={"quiz_id": quiz_id, "top": size})
+        assert response.status_code == 200
+        leaderboard = response.json()
+        return leaderboard if len(leaderboard) >= size else None
+    return wait_until(probe, f"{size} leaderboard entries for {quiz_id}", timeout)
+
+
+def quiz_in_catalog(api_endpoint, title, timeout=30):
+    """Wait until a public quiz with `title` is listed and return its catalog entry."""
+    def probe():
+        response = requests.get(f"{api_endpoint}/listquizzes")
+        if response.status_code != 200:
+            return None
+        return next((quiz for quiz in response.json().get("Quizzes", []) if quiz["Title"] == title), None)
+    return wait_until(probe, f"quiz '{title}' in the catalog", timeout)
+
+
+def ses_messages(source, match=None, endpoint=LOCALSTACK_ENDPOINT, timeout=30):
+    """Wait until LocalStack has captured emails sent from `source` (and
+    accepted by `match`, if given) and return them."""
+    def probe():
+        response = requests.get(f"{endpoint}/_aws/ses", params={"email": source})
+        response.raise_for_status()
+        return [
+            message for message in response.json().get("messages", [])
+            if message["Source"] == source and (match is None or match(message))
+        ]
+    return wait_until(probe, f"an email from {source}", timeout)
+
+
+def queue_drained(sqs_client, queue_url, timeout=60):
+    """Wait until a queue holds no messages, including in-flight ones."""
+    attribute_names = ["ApproximateNumberOfMessages", "ApproximateNumberOfMessagesNotVisible"]
+
+    def probe():
+        attributes = sqs_client.get_queue_attributes(QueueUrl=queue_url, AttributeNames=attribute_names)["Attributes"]
+        return all(attributes[name] == "0" for name in attribute_names)
+    wait_until(probe, f"{queue_url} to drain", timeout)